@@ -0,0 +1,156 @@
+# ========================================
+# FILE: benchmarks/bench_asgi.py
+# ========================================
+"""
+Concurrent throughput under ASGI: the sync views against the native async
+views (TODO_ASYNC_VIEWS), at 100, 500 and 1000 concurrent clients.
+
+Requests go straight into Django's ASGI application in this process,
+with no server or sockets in between, so the figures compare request
+handling alone: thread hops, the async ORM and the views themselves.
+
+    python -m benchmarks.bench_asgi [--clients 100,500,1000] [--requests 2000] [--rows 10000]
+"""
+
+import argparse
+import asyncio
+import itertools
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.common import benchmark_database, bootstrap, seed_todos, summarize
+
+URLCONFS = {
+    'sync': 'todos.urls',
+    'async': 'todos.async_urls',
+}
+
+# name -> (method, path)
+SCENARIOS = {
+    'list': ('GET', lambda pks, i: '/'),
+    'edit': ('GET', lambda pks, i: f'/edit/{pks[i % len(pks)]}/'),
+    'toggle': ('POST', lambda pks, i: f'/toggle/{pks[i % len(pks)]}/'),
+}
+
+# Sent as both the CSRF cookie and header, as the list page's script would.
+CSRF_TOKEN = 'benchmarkbenchmarkbenchmarkbench'
+
+
+async def request(app, method, path):
+    """Send one bodiless request through ``app``; return its status code"""
+    headers = [(b'host', b'testserver')]
+    if method == 'POST':
+        headers += [(b'cookie', f'csrftoken={CSRF_TOKEN}'.encode()), (b'x-csrftoken', CSRF_TOKEN.encode())]
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': b'',
+        'root_path': '',
+        'headers': headers,
+        'client': ('127.0.0.1', 50000),
+        'server': ('testserver', 80),
+    }
+    finished = asyncio.Event()
+    received = False
+    status = None
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        # Django listens for a disconnect while the view runs; only
+        # report one once the response is complete.
+        await finished.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+        elif message['type'] == 'http.response.body' and not message.get('more_body'):
+            finished.set()
+
+    try:
+        await app(scope, receive, send)
+    finally:
+        finished.set()
+    return status
+
+
+async def load(app, method, path, clients, total):
+    """``total`` requests from ``clients`` concurrent clients"""
+    counter = itertools.count()
+    latencies, errors = [], 0
+
+    async def client():
+        nonlocal errors
+        while (i := next(counter)) < total:
+            started = time.perf_counter()
+            try:
+                status = await request(app, method, path(i))
+            except Exception:
+                status = None
+            if status is None or status >= 400:
+                errors += 1
+            else:
+                latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    return time.perf_counter() - started, latencies, errors
+
+
+def run(mode, scenario, clients, args, pks):
+    from django.core.handlers.asgi import ASGIHandler
+    from django.db import connections
+    from django.test import override_settings
+
+    with override_settings(ROOT_URLCONF=URLCONFS[mode]):
+        app = ASGIHandler()
+        method, path = SCENARIOS[scenario]
+        elapsed, latencies, errors = asyncio.run(
+            load(app, method, lambda i: path(pks, i), clients, args.requests)
+        )
+    connections.close_all()
+
+    line = f"  {mode:<6} {scenario:<7} {clients:>5} clients: {len(latencies) / elapsed:8.1f} req/s  errors: {errors:<5}"
+    if latencies:
+        stats = summarize(latencies)
+        line += f" p50={stats['p50']:.1f}ms p95={stats['p95']:.1f}ms max={stats['max']:.1f}ms"
+    print(line, flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--clients', default='100,500,1000', help='Comma-separated concurrency levels.')
+    parser.add_argument('--requests', type=int, default=2000, help='Requests per run.')
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--scenario', choices=sorted(SCENARIOS), action='append')
+    parser.add_argument('--mode', choices=sorted(URLCONFS), action='append')
+    args = parser.parse_args()
+
+    bootstrap()
+    from django.test import override_settings
+    from todos.models import Todo
+
+    with tempfile.TemporaryDirectory() as workdir, override_settings(
+        # Production-like: no DEBUG query log or query budget middleware.
+        DEBUG=False, ALLOWED_HOSTS=['testserver'], TODO_METRICS_DIR=Path(workdir) / 'metrics',
+    ), benchmark_database(Path(workdir) / 'asgi.sqlite3'):
+        seed_todos(args.rows)
+        pks = list(Todo.objects.values_list('pk', flat=True)[:1000])
+        for scenario in args.scenario or list(SCENARIOS):
+            for clients in [int(value) for value in args.clients.split(',')]:
+                for mode in args.mode or list(URLCONFS):
+                    run(mode, scenario, clients, args, pks)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+# ========================================
+# FILE: benchmarks/bench_conn_reuse.py
+# ========================================
+"""
+Per-request latency of the todo list with and without persistent
+database connections (CONN_MAX_AGE).
+
+Requests go through the real WSGI handler so the request_started /
+request_finished signals open and close connections as in production.
+
+    python -m benchmarks.bench_conn_reuse [--requests 500]
+"""
+
+import argparse
+import tempfile
+from pathlib import Path
+
+from benchmarks.common import benchmark_database, bootstrap, measure, report, seed_todos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--rows', type=int, default=1000)
+    args = parser.parse_args()
+
+    bootstrap()
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.db import connection
+    from django.db.backends.signals import connection_created
+    from django.test import RequestFactory
+
+    handler = WSGIHandler()
+    environ = RequestFactory(HTTP_HOST='localhost')._base_environ(PATH_INFO='/', REQUEST_METHOD='GET')
+    opened = []
+    connection_created.connect(lambda **kwargs: opened.append(1), weak=False)
+
+    def request():
+        response = handler(dict(environ), lambda status, headers: None)
+        b''.join(response)
+        response.close()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        with benchmark_database(Path(workdir) / 'conn.sqlite3'):
+            seed_todos(args.rows)
+            for max_age in (0, 60):
+                connection.close()
+                connection.settings_dict['CONN_MAX_AGE'] = max_age
+                opened.clear()
+                stats = measure(request, repeat=args.requests)
+                report(f'CONN_MAX_AGE={max_age}', stats)
+                print(f'{"":<32} connections opened: {len(opened)}')
+            connection.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+# ========================================
+# FILE: benchmarks/bench_row_cache.py
+# ========================================
+"""
+Cold vs warm render of a 2,000-row todo list with per-row fragment caching.
+
+    python -m benchmarks.bench_row_cache [--rows 2000] [--repeat 10]
+"""
+
+import argparse
+
+from benchmarks.common import benchmark_database, bootstrap, measure, report, seed_todos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    bootstrap()
+    from django.core.cache import caches
+    from django.template.loader import render_to_string
+    from django.test import RequestFactory
+    from django.utils import timezone
+    from todos.forms import TodoBulkForm
+    from todos.models import Todo
+
+    with benchmark_database():
+        seed_todos(args.rows)
+        today = timezone.now().date()
+        todos = list(Todo.objects.with_overdue(today=today))
+        request = RequestFactory().get('/')
+        context = {
+            'todos': todos,
+            'bulk_form': TodoBulkForm(),
+            'today': today.isoformat(),
+            'row_cache_timeout': 3600,
+        }
+        fragments = caches['template_fragments']
+
+        def render():
+            return render_to_string('todos/todo_list.html', context, request=request)
+
+        def cold():
+            fragments.clear()
+            render()
+
+        print(f"Rendering {len(todos)} rows")
+        report('cold (empty fragment cache)', measure(cold, repeat=args.repeat))
+        fragments.clear()
+        render()
+        report('warm (all rows cached)', measure(render, repeat=args.repeat))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+# ========================================
+# FILE: benchmarks/bench_sqlite_contention.py
+# ========================================
+"""
+Multi-process write/read contention on a file-backed SQLite database,
+comparing the stock connection setup with the tuned SQLITE_PRAGMAS profile.
+
+    python -m benchmarks.bench_sqlite_contention [--writers 4] [--readers 4] [--seconds 5]
+"""
+
+import argparse
+import multiprocessing
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.common import benchmark_database, bootstrap, seed_todos, summarize
+
+PROFILES = {
+    # Rollback journal, full sync, deferred transactions.
+    'stock': ({}, {}),
+    'tuned': (None, {'transaction_mode': 'IMMEDIATE'}),
+}
+
+
+def worker(role, seconds, results):
+    from django.db import OperationalError, connection, transaction
+    from django.db.models import Case, Value, When
+    from django.utils import timezone
+    from todos.models import Todo
+
+    max_pk = Todo.objects.order_by('-pk').values_list('pk', flat=True).first()
+    ok, locked, latencies = 0, 0, []
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        try:
+            if role == 'writer':
+                with transaction.atomic():
+                    Todo.objects.filter(pk=random.randint(1, max_pk)).update(
+                        is_resolved=Case(When(is_resolved=True, then=Value(False)), default=Value(True)),
+                        updated_at=timezone.now(),
+                    )
+                    Todo.objects.create(title='Contention write')
+            else:
+                list(Todo.objects.with_overdue()[:50])
+            ok += 1
+            latencies.append((time.perf_counter() - start) * 1000)
+        except OperationalError:
+            locked += 1
+    connection.close()
+    results.put((role, ok, locked, latencies))
+
+
+def run_profile(name, args, workdir):
+    from django.conf import settings
+    from django.db import connections
+
+    pragmas, options = PROFILES[name]
+    if pragmas is None:
+        pragmas = settings.SQLITE_PRAGMAS
+    settings.SQLITE_PRAGMAS = pragmas
+    settings.DATABASES['default']['OPTIONS'] = options
+
+    with benchmark_database(Path(workdir) / f'{name}.sqlite3'):
+        seed_todos(args.rows)
+        connections.close_all()
+
+        ctx = multiprocessing.get_context('fork')
+        results = ctx.Queue()
+        roles = ['writer'] * args.writers + ['reader'] * args.readers
+        procs = [ctx.Process(target=worker, args=(role, args.seconds, results)) for role in roles]
+        for proc in procs:
+            proc.start()
+        collected = [results.get() for _ in procs]
+        for proc in procs:
+            proc.join()
+
+    print(f"\n[{name}]")
+    for role in ('writer', 'reader'):
+        rows = [r for r in collected if r[0] == role]
+        ok = sum(r[1] for r in rows)
+        locked = sum(r[2] for r in rows)
+        latencies = [lat for r in rows for lat in r[3]]
+        line = f"  {role}s: {ok / args.seconds:9.1f} ops/s  locked errors: {locked:<6}"
+        if latencies:
+            stats = summarize(latencies)
+            line += f" p50={stats['p50']:.2f}ms p95={stats['p95']:.2f}ms max={stats['max']:.2f}ms"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--profile', choices=sorted(PROFILES), action='append')
+    args = parser.parse_args()
+
+    bootstrap()
+    with tempfile.TemporaryDirectory() as workdir:
+        for name in args.profile or ['stock', 'tuned']:
+            run_profile(name, args, workdir)
+
+
+if __name__ == '__main__':
+    main()
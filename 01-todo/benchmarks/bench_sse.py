@@ -0,0 +1,115 @@
+# ========================================
+# FILE: benchmarks/bench_sse.py
+# ========================================
+"""
+Cost of open live-update streams (/events/) under ASGI: CPU used while
+N tabs sit idle, and how long one write takes to reach all of them.
+
+Streams are opened straight against Django's ASGI application in this
+process, as in bench_asgi.
+
+    python -m benchmarks.bench_sse [--streams 1000,5000] [--idle 5]
+"""
+
+import argparse
+import asyncio
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from benchmarks.common import benchmark_database, bootstrap
+
+
+class Stream:
+    """One open /events/ request and the messages it has received"""
+
+    def __init__(self, app):
+        self.app = app
+        self.body = b''
+        self.opened = asyncio.Event()
+        self.closed = asyncio.Event()
+        self.changed = asyncio.Event()
+
+    async def run(self):
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+            'method': 'GET', 'scheme': 'http', 'path': '/events/', 'raw_path': b'/events/',
+            'query_string': b'', 'root_path': '', 'headers': [(b'host', b'testserver')],
+            'client': ('127.0.0.1', 50000), 'server': ('testserver', 80),
+        }
+        requested = False
+
+        async def receive():
+            nonlocal requested
+            if not requested:
+                requested = True
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            await self.closed.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.body':
+                self.body += message.get('body', b'')
+                self.opened.set()
+                self.changed.set()
+
+        await self.app(scope, receive, send)
+
+    async def wait_for(self, needle):
+        while needle not in self.body:
+            self.changed.clear()
+            await self.changed.wait()
+
+
+async def measure(app, count, idle):
+    from asgiref.sync import sync_to_async
+    from todos.models import Todo
+
+    streams = [Stream(app) for _ in range(count)]
+    started = time.perf_counter()
+    tasks = [asyncio.create_task(stream.run()) for stream in streams]
+    await asyncio.gather(*(stream.opened.wait() for stream in streams))
+    opened = time.perf_counter() - started
+    threads = threading.active_count()
+
+    cpu = time.process_time()
+    await asyncio.sleep(idle)
+    cpu = time.process_time() - cpu
+
+    started = time.perf_counter()
+    await sync_to_async(Todo.objects.create)(title='Fan-out probe')
+    await asyncio.gather(*(stream.wait_for(b'event: created') for stream in streams))
+    fan_out = time.perf_counter() - started
+
+    for stream in streams:
+        stream.closed.set()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    print(
+        f'  {count:>6} streams: opened in {opened:6.2f}s, {threads} threads, '
+        f'idle CPU {cpu / idle * 100:5.1f}% of one core, '
+        f'one write reached all in {fan_out * 1000:7.1f}ms',
+        flush=True,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--streams', default='1000,5000', help='Comma-separated numbers of open tabs.')
+    parser.add_argument('--idle', type=float, default=5, help='Seconds to measure idle CPU over.')
+    args = parser.parse_args()
+
+    bootstrap()
+    from django.core.handlers.asgi import ASGIHandler
+    from django.test import override_settings
+
+    with tempfile.TemporaryDirectory() as workdir, override_settings(
+        DEBUG=False, ALLOWED_HOSTS=['testserver'], TODO_METRICS_DIR=Path(workdir) / 'metrics',
+        TODO_EVENTS_BACKEND='memory',
+    ), benchmark_database(Path(workdir) / 'sse.sqlite3'):
+        for count in [int(value) for value in args.streams.split(',')]:
+            asyncio.run(measure(ASGIHandler(), count, args.idle))
+
+
+if __name__ == '__main__':
+    main()
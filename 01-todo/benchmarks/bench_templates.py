@@ -0,0 +1,88 @@
+# ========================================
+# FILE: benchmarks/bench_templates.py
+# ========================================
+"""
+Render cost of one todo list page by how its templates are loaded.
+
+- uncached: no cached loader, so every render parses base.html,
+  todo_list.html and the row partials again
+- cold: the cached loader on a worker's first request
+- warm: the cached loader once the templates are compiled, which is
+  every request after precompile (TODO_PRELOAD_TEMPLATES)
+
+Each runs with template debug info on (the DEBUG default) and off (the
+production profile). Rows come from a warm fragment cache throughout,
+so only template loading differs.
+
+    python -m benchmarks.bench_templates [--rows 50] [--repeat 200]
+"""
+
+import argparse
+
+from benchmarks.common import benchmark_database, bootstrap, measure, report, seed_todos
+
+LIST_TEMPLATE = 'todos/todo_list.html'
+
+SOURCE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    bootstrap()
+    from django.conf import settings
+    from django.template.backends.django import DjangoTemplates
+    from django.test import RequestFactory
+    from django.utils import timezone
+    from todos.forms import TodoBulkForm
+    from todos.fragments import row_context
+    from todos.models import Todo
+    from todos.precompile import compile_templates
+
+    def backend(loaders, debug):
+        options = {**settings.TEMPLATES[0]['OPTIONS'], 'loaders': loaders, 'debug': debug}
+        return DjangoTemplates({'NAME': 'bench', 'DIRS': [], 'APP_DIRS': False, 'OPTIONS': options})
+
+    with benchmark_database():
+        seed_todos(args.rows)
+        today = timezone.now().date()
+        context = {
+            'todos': list(Todo.objects.with_overdue(today=today)),
+            'bulk_form': TodoBulkForm(),
+            'search_query': '',
+            'archived': False,
+            **row_context(today),
+        }
+        request = RequestFactory().get('/')
+
+        print(f"Rendering {LIST_TEMPLATE} with {args.rows} rows")
+        for debug in (True, False):
+            label = 'debug' if debug else 'no debug'
+            uncached = backend(SOURCE_LOADERS, debug)
+            cached = backend([('django.template.loaders.cached.Loader', SOURCE_LOADERS)], debug)
+            cache = cached.engine.template_loaders[0]
+
+            def render(engine):
+                return engine.get_template(LIST_TEMPLATE).render(context, request)
+
+            def cold():
+                cache.reset()
+                render(cached)
+
+            # Fill the row fragment cache.
+            render(uncached)
+            report(f'uncached ({label})', measure(lambda: render(uncached), repeat=args.repeat))
+            report(f'cold cached ({label})', measure(cold, repeat=args.repeat))
+            cache.reset()
+            report(f'precompile ({label})', measure(lambda: compile_templates(engine=cached), repeat=1, warmup=0))
+            report(f'warm cached ({label})', measure(lambda: render(cached), repeat=args.repeat))
+
+
+if __name__ == '__main__':
+    main()
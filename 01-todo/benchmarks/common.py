@@ -0,0 +1,101 @@
+# ========================================
+# FILE: benchmarks/common.py
+# ========================================
+"""
+Shared helpers for the standalone benchmark scripts.
+
+Run any benchmark from the project directory, e.g.::
+
+    python -m benchmarks.bench_row_cache
+"""
+
+import os
+import statistics
+import sys
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import islice
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+
+
+def bootstrap(settings_module='todoproject.settings'):
+    """Configure Django for a benchmark run"""
+    if str(PROJECT_DIR) not in sys.path:
+        sys.path.insert(0, str(PROJECT_DIR))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+
+
+@contextmanager
+def benchmark_database(path=None):
+    """
+    Create a throwaway, migrated database and drop it afterwards.
+
+    ``path`` puts it in a file (needed when several processes share it);
+    by default it lives in memory like the test database.
+    """
+    from django.conf import settings
+    from django.db import connection
+
+    if path is not None:
+        settings.DATABASES['default'].setdefault('TEST', {})['NAME'] = str(path)
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield connection.settings_dict['NAME']
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def seed_todos(count, batch_size=5000):
+    """Insert ``count`` synthetic todos with a realistic mix of states"""
+    from django.db import transaction
+    from django.utils import timezone
+    from todos.db import deferred_search_index, insert_todos
+
+    today = timezone.now().date()
+    rows = (
+        (
+            f"Synthetic todo {i}",
+            "" if i % 3 else f"Details for todo {i}",
+            None if i % 5 == 0 else today + timedelta(days=(i % 60) - 30),
+            i % 4 == 0,
+        )
+        for i in range(count)
+    )
+    with transaction.atomic(), deferred_search_index():
+        while batch := list(islice(rows, batch_size)):
+            insert_todos(batch)
+
+
+def measure(func, repeat=20, warmup=1):
+    """Call ``func`` repeatedly and return timing stats in milliseconds"""
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return summarize(samples)
+
+
+def summarize(samples):
+    samples = sorted(samples)
+    return {
+        'n': len(samples),
+        'min': samples[0],
+        'p50': statistics.median(samples),
+        'p95': samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        'max': samples[-1],
+    }
+
+
+def report(label, stats):
+    print(
+        f"{label:<32} n={stats['n']:<5} min={stats['min']:8.2f}ms "
+        f"p50={stats['p50']:8.2f}ms p95={stats['p95']:8.2f}ms max={stats['max']:8.2f}ms"
+    )
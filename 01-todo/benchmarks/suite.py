@@ -0,0 +1,278 @@
+# ========================================
+# FILE: benchmarks/suite.py
+# ========================================
+"""
+Request-level benchmark suite for every URL in ``todos/urls.py`` and the
+admin changelist, run by ``manage.py benchmark``.
+
+Each scenario is timed through the test client against a freshly seeded,
+file-backed database per dataset size. For every scenario the suite
+records latency percentiles, the number of queries one request runs and
+the peak memory Python allocates while serving it.
+"""
+
+import json
+import platform
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+from datetime import timedelta
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection, reset_queries
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from benchmarks.common import benchmark_database, seed_todos, summarize
+
+DEFAULT_SIZES = [1000, 100000, 1000000]
+
+# Rows read or written by one request in the bulk and batch scenarios.
+BULK_ROWS = 50
+BATCH_ROWS = 10
+
+
+class Scenario:
+    """
+    One request shape. ``path`` and ``data`` are called with the run
+    context and the iteration number so writes can target fresh rows.
+    """
+
+    def __init__(self, name, url_name, path, method='get', data=None,
+                 content_type=None, headers=None, max_repeat=None):
+        self.name = name
+        self.url_name = url_name
+        self.path = path
+        self.method = method
+        self.data = data
+        self.content_type = content_type
+        self.headers = headers or {}
+        self.max_repeat = max_repeat
+
+    def request(self, client, context, iteration):
+        kwargs = dict(self.headers)
+        if self.data is not None:
+            kwargs['data'] = self.data(context, iteration)
+        if self.content_type is not None:
+            kwargs['content_type'] = self.content_type
+        response = getattr(client, self.method)(self.path(context, iteration), **kwargs)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        if response.status_code >= 400:
+            raise AssertionError(f'{self.name}: HTTP {response.status_code}')
+        return response
+
+
+def _todo_form(context, iteration):
+    return {
+        'title': f'Benchmark todo {iteration}',
+        'description': 'Written by the benchmark suite',
+        'due_date': context['today'].isoformat(),
+    }
+
+
+def _json(payload):
+    return lambda context, iteration: json.dumps(payload(context, iteration))
+
+
+SCENARIOS = [
+    Scenario('todo_list', 'todo_list', lambda c, i: reverse('todo_list')),
+    Scenario('todo_list:deep_page', 'todo_list',
+             lambda c, i: f"{reverse('todo_list')}?cursor={c['deep_cursor']}"),
+    Scenario('todo_list:search', 'todo_list', lambda c, i: f"{reverse('todo_list')}?q=synthetic+{i}"),
+    Scenario('todo_create:form', 'todo_create', lambda c, i: reverse('todo_create')),
+    Scenario('todo_create:submit', 'todo_create', lambda c, i: reverse('todo_create'),
+             method='post', data=_todo_form),
+    Scenario('todo_update:form', 'todo_update',
+             lambda c, i: reverse('todo_update', args=[c['pick'](i)])),
+    Scenario('todo_update:submit', 'todo_update',
+             lambda c, i: reverse('todo_update', args=[c['pick'](i)]), method='post', data=_todo_form),
+    Scenario('todo_delete:confirm', 'todo_delete',
+             lambda c, i: reverse('todo_delete', args=[c['pick'](i)])),
+    Scenario('todo_delete:submit', 'todo_delete',
+             lambda c, i: reverse('todo_delete', args=[c['victims'].pop()]), method='post'),
+    Scenario('todo_toggle', 'todo_toggle', lambda c, i: reverse('todo_toggle', args=[c['pick'](i)]),
+             method='post'),
+    # What the list page's script sends: one UPDATE, one SELECT, one row.
+    Scenario('todo_toggle:fragment', 'todo_toggle', lambda c, i: reverse('todo_toggle', args=[c['pick'](i)]),
+             method='post', headers={'HTTP_X_FRAGMENT': '1'}),
+    Scenario('todo_toggle:no_content', 'todo_toggle', lambda c, i: reverse('todo_toggle', args=[c['pick'](i)]),
+             method='post', headers={'HTTP_PREFER': 'return=minimal'}),
+    Scenario('todo_bulk:resolve', 'todo_bulk', lambda c, i: reverse('todo_bulk'), method='post',
+             data=lambda c, i: {'action': 'resolve', 'pks': [c['pick'](i * BULK_ROWS + n) for n in range(BULK_ROWS)]},
+             headers={'HTTP_ACCEPT': 'application/json'}),
+    Scenario('todo_export:csv', 'todo_export',
+             lambda c, i: f"{reverse('todo_export')}?due_from={c['today']}&due_to={c['today']}",
+             max_repeat=10),
+    Scenario('metrics', 'metrics', lambda c, i: reverse('metrics')),
+    # The test client speaks WSGI, so this is the 204 fallback; streaming
+    # under ASGI is measured by benchmarks/bench_sse.py.
+    Scenario('todo_events', 'todo_events', lambda c, i: reverse('todo_events')),
+    Scenario('api_todo_list', 'api_todo_list', lambda c, i: reverse('api_todo_list')),
+    Scenario('api_todo_batch', 'api_todo_batch', lambda c, i: reverse('api_todo_batch'), method='post',
+             data=_json(lambda c, i: {
+                 'create': [{'title': f'Batch {i}.{n}'} for n in range(BATCH_ROWS)],
+                 'update': [{'id': c['pick'](i * BATCH_ROWS + n), 'is_resolved': True} for n in range(BATCH_ROWS)],
+             }),
+             content_type='application/json'),
+    Scenario('api_todo_sync:recent', 'api_todo_sync',
+             lambda c, i: f"{reverse('api_todo_sync')}?cursor={c['sync_cursor']}"),
+    Scenario('api_todo_detail', 'api_todo_detail',
+             lambda c, i: reverse('api_todo_detail', args=[c['pick'](i)])),
+    Scenario('api_todo_detail:patch', 'api_todo_detail',
+             lambda c, i: reverse('api_todo_detail', args=[c['pick'](i)]), method='patch',
+             data=_json(lambda c, i: {'title': f'Patched {i}'}), content_type='application/json'),
+    Scenario('admin:changelist', 'admin:todos_todo_changelist',
+             lambda c, i: reverse('admin:todos_todo_changelist')),
+    Scenario('admin:changelist:search', 'admin:todos_todo_changelist',
+             lambda c, i: f"{reverse('admin:todos_todo_changelist')}?q=synthetic+{i}"),
+]
+
+
+def build_context(client, victims=1000):
+    """
+    Log ``client`` in as a superuser and pick the rows scenarios work on.
+
+    Reads and updates spread over ``pick(i)``, a stride through existing
+    ids; deletes pop from ``victims`` so every request removes a real row.
+    """
+    from todos.models import Todo
+    from todos.pagination import FORWARD_ORDERING, NEXT, encode_cursor
+    from todos.sync import encode_sync_cursor
+
+    user = get_user_model().objects.create_superuser('benchmark', 'benchmark@example.com', 'benchmark')
+    client.force_login(user)
+
+    ids = list(Todo.objects.order_by('id').values_list('id', flat=True))
+    victims = ids[-victims:]
+    ids = ids[:-len(victims)] or ids
+    stride = max(1, len(ids) // 997)
+
+    middle = Todo.objects.order_by(*FORWARD_ORDERING)[len(ids) // 2:len(ids) // 2 + 1].first()
+    return {
+        'today': timezone.localdate(),
+        'pick': lambda i: ids[(i * stride) % len(ids)],
+        'victims': victims,
+        'deep_cursor': encode_cursor(NEXT, middle) if middle else '',
+        'sync_cursor': encode_sync_cursor((timezone.now() - timedelta(minutes=5), 0), None),
+    }
+
+
+def run_scenario(client, scenario, context, repeat, warmup):
+    """Return latency, query and allocation figures for one scenario"""
+    if scenario.max_repeat is not None:
+        repeat = min(repeat, scenario.max_repeat)
+    iteration = 0
+    for _ in range(warmup):
+        scenario.request(client, context, iteration)
+        iteration += 1
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        scenario.request(client, context, iteration)
+        samples.append((time.perf_counter() - start) * 1000)
+        iteration += 1
+
+    # With DEBUG on, queries_log is a bounded deque that is full by now,
+    # and a full deque would make the capture below count zero.
+    reset_queries()
+    with CaptureQueriesContext(connection) as queries:
+        scenario.request(client, context, iteration)
+    query_count = len(queries)
+    iteration += 1
+
+    # Traced separately: tracemalloc slows every allocation down, so it
+    # would distort the latency samples above.
+    tracemalloc.start()
+    try:
+        scenario.request(client, context, iteration)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    stats = summarize(samples)
+    stats['p99'] = sorted(samples)[min(len(samples) - 1, int(len(samples) * 0.99))]
+    stats['mean'] = sum(samples) / len(samples)
+    stats['queries'] = query_count
+    stats['alloc_peak_kib'] = round(peak / 1024, 1)
+    return stats
+
+
+def run_suite(sizes, repeat=50, warmup=5, only=None, log=print):
+    """Seed each dataset size in turn and run every selected scenario on it"""
+    scenarios = [s for s in SCENARIOS if not only or s.name in only or s.url_name in only]
+    results = {}
+    hosts = [*settings.ALLOWED_HOSTS, 'testserver']
+    with tempfile.TemporaryDirectory() as workdir, override_settings(ALLOWED_HOSTS=hosts):
+        for size in sizes:
+            # A metrics directory per dataset, so the cached todo gauges
+            # are computed against the database being measured.
+            metrics_dir = Path(workdir) / f'metrics_{size}'
+            with benchmark_database(Path(workdir) / f'bench_{size}.sqlite3'), \
+                    override_settings(TODO_METRICS_DIR=metrics_dir):
+                started = time.perf_counter()
+                seed_todos(size)
+                log(f'Seeded {size} todos in {time.perf_counter() - started:.1f}s')
+                for cache in caches.all():
+                    cache.clear()
+                client = Client()
+                context = build_context(client, victims=min(size // 2, repeat + warmup + 2))
+                results[str(size)] = {}
+                for scenario in scenarios:
+                    stats = run_scenario(client, scenario, context, repeat, warmup)
+                    results[str(size)][scenario.name] = stats
+                    log(
+                        f"  {scenario.name:<28} p50={stats['p50']:8.2f}ms p95={stats['p95']:8.2f}ms "
+                        f"p99={stats['p99']:8.2f}ms queries={stats['queries']:<3} "
+                        f"alloc={stats['alloc_peak_kib']:.0f}KiB"
+                    )
+                connection.close()
+    return {
+        'meta': {
+            'created': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'settings': settings.SETTINGS_MODULE,
+            'debug': settings.DEBUG,
+            'repeat': repeat,
+            'warmup': warmup,
+        },
+        'results': results,
+    }
+
+
+def compare(baseline, current, threshold, min_delta_ms=0.5):
+    """
+    List regressions of ``current`` against ``baseline``.
+
+    A scenario regresses when its p50 grows by more than ``threshold``
+    (a fraction) and by more than ``min_delta_ms``, when its peak
+    allocation grows by more than ``threshold``, or when it runs more
+    queries than before. Scenarios missing from either run are skipped.
+    """
+    regressions = []
+    for size, scenarios in current['results'].items():
+        for name, stats in scenarios.items():
+            before = baseline.get('results', {}).get(size, {}).get(name)
+            if before is None:
+                continue
+            label = f'{name} @ {size} rows'
+            if (stats['p50'] > before['p50'] * (1 + threshold)
+                    and stats['p50'] - before['p50'] > min_delta_ms):
+                regressions.append(f"{label}: p50 {before['p50']:.2f}ms -> {stats['p50']:.2f}ms")
+            if stats['alloc_peak_kib'] > before['alloc_peak_kib'] * (1 + threshold):
+                regressions.append(
+                    f"{label}: peak allocation {before['alloc_peak_kib']}KiB -> {stats['alloc_peak_kib']}KiB"
+                )
+            if stats['queries'] > before['queries']:
+                regressions.append(f"{label}: queries {before['queries']} -> {stats['queries']}")
+    return regressions
@@ -9,8 +9,21 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
+from todos.precompile import preload_templates
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'todoproject.settings')
 
+# Every ASGI request runs its sync code in a new thread-sensitive context,
+# i.e. a new thread with its own connection, so a persistent connection
+# would never be reused and only stays open until CONN_MAX_AGE expires.
+for database in settings.DATABASES.values():
+    database['CONN_MAX_AGE'] = 0
+
 application = get_asgi_application()
+
+# Compile templates now rather than on the first requests
+# (TODO_PRELOAD_TEMPLATES).
+preload_templates()
@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -41,6 +43,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Outermost so their totals cover every other middleware; metrics
+    # reads the DB figures ServerTimingMiddleware records.
+    'todos.middleware.MetricsMiddleware',
+    'todos.middleware.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -48,6 +54,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Only active with DEBUG on; see TODO_QUERY_BUDGET_ACTION.
+    'todos.middleware.QueryBudgetMiddleware',
 ]
 
 ROOT_URLCONF = 'todoproject.urls'
@@ -77,9 +85,56 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Persistent connections: seconds a connection is kept open across
+        # requests (0 closes it after every request). Connections are per
+        # thread, so this pays off with WSGI workers, whose threads serve
+        # request after request. Under ASGI each request runs in a new thread
+        # with a new connection, so todoproject/asgi.py forces 0.
+        'CONN_MAX_AGE': int(os.environ.get('DJANGO_CONN_MAX_AGE', 60)),
+        # Re-check a reused connection at the start of each request.
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # Take the write lock at BEGIN so concurrent writers queue on
+            # busy_timeout instead of failing on a lock upgrade.
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
 }
 
+# Applied in this order to every new SQLite connection by
+# todos.db.configure_sqlite_connection. journal_mode=WAL is only set in
+# settings_production.py: it is persistent, and here it would convert the
+# development db.sqlite3 on the first manage.py command.
+# https://www.sqlite.org/pragma.html
+
+SQLITE_PRAGMAS = {
+    'busy_timeout': 5000,
+    'synchronous': 'NORMAL',
+    'cache_size': -20000,
+    'mmap_size': 134217728,
+    'temp_store': 'MEMORY',
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# The cache template tag uses the 'template_fragments' alias when present.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'todoproject-default',
+    },
+    'template_fragments': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'todoproject-fragments',
+        'TIMEOUT': None,
+        'OPTIONS': {
+            'MAX_ENTRIES': 20000,
+        },
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -121,3 +176,60 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Todo list pagination (keyset/cursor based, see todos/pagination.py)
+
+TODO_PAGE_SIZE = 50
+
+TODO_MAX_PAGE_SIZE = 500
+
+# Maximum number of writes accepted by one /api/todos/batch/ call
+TODO_API_MAX_BATCH = 10000
+
+# Delta sync cursors stay this many seconds behind "now" so rows from
+# still-committing writes are not skipped
+TODO_SYNC_SETTLE_SECONDS = 2
+
+# Seconds a rendered todo row stays in the fragment cache
+TODO_ROW_CACHE_TIMEOUT = 86400
+
+# What QueryBudgetMiddleware does when a request exceeds its view's query
+# budget or repeats a statement: 'log' a warning or 'raise'
+TODO_QUERY_BUDGET_ACTION = 'log'
+
+# Profile one request in every N with cProfile (0 disables sampling) and
+# write the pstats dumps to TODO_PROFILE_DIR
+TODO_PROFILE_SAMPLE_RATE = int(os.environ.get('TODO_PROFILE_SAMPLE_RATE', 0))
+TODO_PROFILE_DIR = BASE_DIR / 'profiles'
+
+# Per-process metric files for /metrics, shared by all workers of this
+# deployment; files of exited workers are folded into one when a worker
+# starts (todos/metrics.py). Runtime state, so outside the source tree by
+# default; point it at e.g. /run/todoproject in a deployment.
+TODO_METRICS_DIR = Path(os.environ.get('TODO_METRICS_DIR', Path(tempfile.gettempdir()) / 'todoproject-metrics'))
+
+# Seconds between refreshes of the open/resolved/overdue gauges
+TODO_METRICS_STATS_INTERVAL = 15
+
+# Serve the todo list, create, update, delete and toggle pages with the
+# native async views (todos/async_views.py). Only worth it under ASGI, e.g.
+# uvicorn todoproject.asgi:application; under WSGI each request would
+# start an event loop instead.
+TODO_ASYNC_VIEWS = os.environ.get('TODO_ASYNC_VIEWS') == '1'
+
+# Live list updates over Server-Sent Events (todos/events.py): 'memory'
+# relays writes made in the same process; 'sqlite' needs no extra table,
+# it polls the sync change feed (updated_at and tombstones) every
+# TODO_EVENTS_POLL_INTERVAL seconds so every worker process sees every
+# write. Each open stream holds one server thread while it is open.
+TODO_EVENTS_BACKEND = os.environ.get('TODO_EVENTS_BACKEND', 'memory')
+TODO_EVENTS_POLL_INTERVAL = 1
+
+# Seconds between keep-alive comments on an idle event stream
+TODO_EVENTS_HEARTBEAT = 30
+
+# Compile the todos templates when a WSGI/ASGI worker starts instead of on
+# the first requests that render them (todos/precompile.py); management
+# commands skip it. On in settings_production
+TODO_PRELOAD_TEMPLATES = False
@@ -0,0 +1,50 @@
+# ========================================
+# FILE: todoproject/settings_production.py
+# ========================================
+"""
+Production settings for todoproject: everything in settings.py with
+DEBUG off, secrets from the environment and templates compiled once per
+process.
+
+    DJANGO_SETTINGS_MODULE=todoproject.settings_production
+
+Run ``manage.py precompile_templates`` as a deploy step; it fails on a
+template that would break at request time.
+"""
+
+import os
+
+from .settings import *  # noqa: F401,F403
+from .settings import SQLITE_PRAGMAS, TEMPLATES
+
+DEBUG = False
+
+SECRET_KEY = os.environ['DJANGO_SECRET_KEY']
+
+ALLOWED_HOSTS = [host for host in os.environ.get('DJANGO_ALLOWED_HOSTS', '').split(',') if host]
+
+# The cached loader is Django's default only while OPTIONS has no
+# 'loaders'; spell it out so adding a loader cannot silently drop it.
+# Template debug info (source positions for error pages) is off as well.
+TEMPLATES = [{
+    **TEMPLATES[0],
+    'APP_DIRS': False,
+    'OPTIONS': {
+        **TEMPLATES[0]['OPTIONS'],
+        'debug': False,
+        'loaders': [
+            ('django.template.loaders.cached.Loader', [
+                'django.template.loaders.filesystem.Loader',
+                'django.template.loaders.app_directories.Loader',
+            ]),
+        ],
+    },
+}]
+
+# WAL lets readers run alongside the writer. busy_timeout stays first so
+# switching journal_mode waits for other writers instead of failing.
+SQLITE_PRAGMAS = {'busy_timeout': SQLITE_PRAGMAS['busy_timeout'], 'journal_mode': 'WAL', **SQLITE_PRAGMAS}
+
+# Compile the todos templates when each worker starts, not on its first
+# requests (todos/precompile.py)
+TODO_PRELOAD_TEMPLATES = True
@@ -2,10 +2,11 @@
 # FILE: todoproject/urls.py (main urls)
 # ========================================
 
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('', include('todos.urls')),
+    path('', include('todos.async_urls' if settings.TODO_ASYNC_VIEWS else 'todos.urls')),
 ]
\ No newline at end of file
@@ -11,6 +11,12 @@ import os
 
 from django.core.wsgi import get_wsgi_application
 
+from todos.precompile import preload_templates
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'todoproject.settings')
 
 application = get_wsgi_application()
+
+# Compile templates now rather than on the first requests
+# (TODO_PRELOAD_TEMPLATES).
+preload_templates()
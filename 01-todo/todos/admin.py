@@ -3,10 +3,48 @@
 # ========================================
 
 from django.contrib import admin
-from .models import Todo
+from .models import ArchivedTodo, Todo
+from .signals import todos_changed
 
 @admin.register(Todo)
 class TodoAdmin(admin.ModelAdmin):
     list_display = ['title', 'due_date', 'is_resolved', 'created_at']
     list_filter = ['is_resolved', 'due_date']
     search_fields = ['title', 'description']
+    # Skip the second, unfiltered COUNT(*) the changelist runs by default.
+    show_full_result_count = False
+
+    def get_search_results(self, request, queryset, search_term):
+        # Served by the FTS5 index instead of LIKE '%term%' on both columns.
+        if not search_term:
+            return queryset, False
+        return queryset.search(search_term), False
+
+    def delete_model(self, request, obj):
+        pk = obj.pk
+        super().delete_model(request, obj)
+        todos_changed.send(sender=Todo, action='deleted', pks=[pk])
+
+    def delete_queryset(self, request, queryset):
+        pks = list(queryset.values_list('pk', flat=True))
+        super().delete_queryset(request, queryset)
+        todos_changed.send(sender=Todo, action='deleted', pks=pks)
+
+
+@admin.register(ArchivedTodo)
+class ArchivedTodoAdmin(admin.ModelAdmin):
+    """Read-only view of the archive; rows get here via ``archive_todos``"""
+    list_display = ['title', 'due_date', 'created_at', 'archived_at']
+    list_filter = ['archived_at', 'due_date']
+    # No FTS index over the archive, so this is a LIKE scan of cold rows.
+    search_fields = ['title', 'description']
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,288 @@
+# ========================================
+# FILE: todos/api.py
+# ========================================
+"""
+JSON API for Todo.
+
+Reads serialize straight from ``.values()`` dicts; writes go through
+``TodoForm`` so the API and the HTML views share one set of rules.
+"""
+
+import json
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.forms.models import model_to_dict
+from django.http import HttpResponse, JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+
+from .forms import TodoForm
+from .models import Todo
+from .pagination import InvalidCursor, KeysetPaginator
+from .signals import todos_changed
+from .sync import InvalidSyncCursor, changes_since
+
+FIELDS = ['id', 'title', 'description', 'due_date', 'is_resolved', 'created_at', 'updated_at']
+
+# Columns the keyset cursor is built from; always selected, only returned
+# when asked for.
+CURSOR_FIELDS = ['id', 'is_resolved', 'due_date', 'created_at']
+
+# JSON types each writable field accepts. The form would otherwise str() a
+# list, read a number as an attribute-less date or take any truthy value
+# as true.
+FIELD_TYPES = {
+    'title': ((str, type(None)), 'Expected a string.'),
+    'description': ((str, type(None)), 'Expected a string.'),
+    'due_date': ((str, type(None)), 'Expected a date string or null.'),
+    'is_resolved': ((bool,), 'Expected true or false.'),
+}
+
+
+class BadRequest(Exception):
+    def __init__(self, errors, status=400):
+        self.errors = errors
+        self.status = status
+
+
+def error_response(errors, status=400):
+    return JsonResponse({'errors': errors}, status=status)
+
+
+def not_found():
+    return error_response({'__all__': ['No Todo matches the given query.']}, status=404)
+
+
+def parse_json(request):
+    # A cross-site HTML form can only send form or text/plain bodies; JSON
+    # needs a CORS preflight, which this API never grants.
+    if request.content_type != 'application/json':
+        raise BadRequest({'__all__': ['Content-Type must be application/json.']}, status=415)
+    try:
+        return json.loads(request.body or b'null')
+    except ValueError:
+        raise BadRequest({'__all__': ['Request body is not valid JSON.']})
+
+
+def parse_fields(request):
+    raw = request.GET.get('fields')
+    if not raw:
+        return FIELDS
+    fields = [name.strip() for name in raw.split(',') if name.strip()]
+    unknown = sorted(set(fields) - set(FIELDS))
+    if unknown:
+        raise BadRequest({'fields': [f'Unknown field(s): {", ".join(unknown)}.']})
+    return fields
+
+
+def is_id(value):
+    # bool is a subclass of int, but true is not an id.
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def serialize(todo):
+    return {name: getattr(todo, name) for name in FIELDS}
+
+
+def form_data(payload, instance=None, partial=False):
+    """Form data for ``TodoForm``; a partial update keeps missing fields as they are"""
+    if not isinstance(payload, dict):
+        raise BadRequest({'__all__': ['Expected a JSON object.']})
+    errors = {
+        name: [message] for name, (types, message) in FIELD_TYPES.items()
+        if name in payload and not isinstance(payload[name], types)
+    }
+    if errors:
+        raise BadRequest(errors)
+    data = model_to_dict(instance, fields=TodoForm._meta.fields) if partial else {}
+    data.update(payload)
+    return data
+
+
+def validate(payload, instance=None, partial=False):
+    form = TodoForm(form_data(payload, instance, partial), instance=instance)
+    if not form.is_valid():
+        raise BadRequest(form.errors)
+    return form
+
+
+def api_view(view_class):
+    """
+    Session-less JSON clients cannot send CSRF tokens. Writes are safe
+    without one because ``parse_json`` only accepts JSON bodies, and
+    DELETE, PUT and PATCH cannot be sent cross-site without a preflight.
+    """
+    return method_decorator(csrf_exempt, name='dispatch')(view_class)
+
+
+class TodoAPIView(View):
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        except BadRequest as exc:
+            return error_response(exc.errors, exc.status)
+
+    def page_size(self):
+        page_size = getattr(settings, 'TODO_PAGE_SIZE', 50)
+        max_page_size = getattr(settings, 'TODO_MAX_PAGE_SIZE', 500)
+        try:
+            page_size = int(self.request.GET.get('page_size', page_size))
+        except ValueError:
+            raise BadRequest({'page_size': ['Enter a whole number.']})
+        return max(1, min(page_size, max_page_size))
+
+
+@api_view
+class TodoCollectionAPIView(TodoAPIView):
+    def get(self, request):
+        fields = parse_fields(request)
+        select = fields + [name for name in CURSOR_FIELDS if name not in fields]
+        paginator = KeysetPaginator(Todo.objects.values(*select), self.page_size())
+        try:
+            page = paginator.page(request.GET.get('cursor'))
+        except InvalidCursor:
+            raise BadRequest({'cursor': ['Invalid cursor.']})
+        return JsonResponse({
+            'results': [{name: row[name] for name in fields} for row in page],
+            'next': page.next_cursor,
+            'previous': page.previous_cursor,
+        })
+
+    def post(self, request):
+        todo = validate(parse_json(request)).save()
+        return JsonResponse(serialize(todo), status=201)
+
+
+@api_view
+class TodoDetailAPIView(TodoAPIView):
+    http_method_names = ['get', 'put', 'patch', 'delete', 'head', 'options']
+
+    def get(self, request, pk):
+        todo = Todo.objects.filter(pk=pk).values(*parse_fields(request)).first()
+        if todo is None:
+            return not_found()
+        return JsonResponse(todo)
+
+    def put(self, request, pk):
+        return self.update(request, pk, partial=False)
+
+    def patch(self, request, pk):
+        return self.update(request, pk, partial=True)
+
+    def update(self, request, pk, partial):
+        todo = Todo.objects.filter(pk=pk).first()
+        if todo is None:
+            return not_found()
+        todo = validate(parse_json(request), instance=todo, partial=partial).save()
+        return JsonResponse(serialize(todo))
+
+    def delete(self, request, pk):
+        deleted, _ = Todo.objects.filter(pk=pk).delete()
+        if not deleted:
+            return not_found()
+        todos_changed.send(sender=Todo, action='deleted', pks=[pk])
+        return HttpResponse(status=204)
+
+
+@api_view
+class TodoSyncAPIView(TodoAPIView):
+    """
+    Todos changed and deleted since ``?cursor=``; omit it for a full sync.
+
+    Keep calling with the returned cursor while ``has_more`` is true.
+    """
+
+    def get(self, request):
+        try:
+            changed, deleted, cursor, has_more = changes_since(
+                request.GET.get('cursor'), parse_fields(request), self.page_size(),
+            )
+        except InvalidSyncCursor:
+            raise BadRequest({'cursor': ['Invalid cursor.']})
+        return JsonResponse({
+            'changed': changed,
+            'deleted': deleted,
+            'cursor': cursor,
+            'has_more': has_more,
+        })
+
+
+@api_view
+class TodoBatchAPIView(TodoAPIView):
+    """
+    Apply many writes in one transaction::
+
+        {"create": [{...}, ...], "update": [{"id": 1, ...}, ...], "delete": [3, 4]}
+
+    Every item is validated with ``TodoForm`` first; if any fails nothing
+    is written and the errors come back keyed by operation and index.
+    """
+
+    def post(self, request):
+        payload = parse_json(request)
+        if not isinstance(payload, dict):
+            raise BadRequest({'__all__': ['Expected a JSON object.']})
+        creates, updates, deletes = (payload.get(key) or [] for key in ('create', 'update', 'delete'))
+        if not all(isinstance(items, list) for items in (creates, updates, deletes)):
+            raise BadRequest({'__all__': ['"create", "update" and "delete" must be lists.']})
+        max_items = getattr(settings, 'TODO_API_MAX_BATCH', 10000)
+        if len(creates) + len(updates) + len(deletes) > max_items:
+            raise BadRequest({'__all__': [f'At most {max_items} items per batch.']})
+
+        errors = {}
+        new_todos = self.validate_items('create', creates, errors)
+        changed_todos = self.validate_updates(updates, errors)
+        if all(is_id(pk) for pk in deletes):
+            delete_pks = deletes
+        else:
+            errors['delete'] = ['Expected a list of ids.']
+        if errors:
+            raise BadRequest(errors)
+
+        with transaction.atomic():
+            created = Todo.objects.bulk_create(new_todos)
+            updated = Todo.objects.bulk_update(changed_todos, TodoForm._meta.fields + ['updated_at'])
+            deleted = Todo.objects.filter(pk__in=delete_pks).delete_returning_pks()
+            for action, pks in (('created', [todo.pk for todo in created]),
+                                ('updated', [todo.pk for todo in changed_todos]),
+                                ('deleted', deleted)):
+                if pks:
+                    todos_changed.send(sender=Todo, action=action, pks=pks)
+        return JsonResponse({
+            'created': [todo.pk for todo in created],
+            'updated': updated,
+            'deleted': len(deleted),
+        })
+
+    def validate_items(self, operation, items, errors, instances=None):
+        todos = []
+        for index, item in enumerate(items):
+            instance = instances[item['id']] if instances is not None else None
+            try:
+                todos.append(validate(item, instance=instance, partial=instance is not None).save(commit=False))
+            except BadRequest as exc:
+                errors.setdefault(operation, {})[index] = exc.errors
+        return todos
+
+    def validate_updates(self, items, errors):
+        if not all(isinstance(item, dict) and is_id(item.get('id')) for item in items):
+            errors['update'] = ['Every update needs an integer "id".']
+            return []
+        ids = [item['id'] for item in items]
+        duplicates = sorted(pk for pk, count in Counter(ids).items() if count > 1)
+        if duplicates:
+            errors['update'] = [f'Duplicate id(s): {", ".join(map(str, duplicates))}.']
+            return []
+        instances = Todo.objects.in_bulk(ids)
+        missing = [item['id'] for item in items if item['id'] not in instances]
+        if missing:
+            errors['update'] = [f'No Todo with id(s): {", ".join(map(str, missing))}.']
+            return []
+        todos = self.validate_items('update', items, errors, instances=instances)
+        # bulk_update() skips pre_save(), so auto_now has to be applied here.
+        for todo in todos:
+            Todo._meta.get_field('updated_at').pre_save(todo, add=False)
+        return todos
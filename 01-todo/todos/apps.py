@@ -1,6 +1,19 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save
 
 
 class TodosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'todos'
+
+    def ready(self):
+        from .db import configure_sqlite_connection, install_query_observers
+        connection_created.connect(configure_sqlite_connection, dispatch_uid='todos.sqlite_pragmas')
+        connection_created.connect(install_query_observers, dispatch_uid='todos.query_observers')
+
+        from . import events
+        from .models import Todo
+        from .signals import todos_changed
+        post_save.connect(events.todo_saved, sender=Todo, dispatch_uid='todos.events.saved')
+        todos_changed.connect(events.todos_changed, sender=Todo, dispatch_uid='todos.events.changed')
@@ -0,0 +1,90 @@
+# ========================================
+# FILE: todos/archive.py
+# ========================================
+"""
+Moving resolved todos from the hot table into ``ArchivedTodo``.
+
+Rows move in small batches, each in its own short transaction: SQLite
+has one writer at a time, so a single ``INSERT ... SELECT`` over every
+candidate would hold the write lock for as long as the whole move takes.
+Between batches other writers get their turn; readers are never blocked
+(WAL).
+
+Deleting from ``todos_todo`` fires the usual triggers: archived rows
+drop out of the search index and get a tombstone, so sync clients treat
+them as deleted. The sync API covers the hot table only.
+"""
+
+import time
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import ArchivedTodo, Todo
+from .signals import todos_changed
+
+# Copied as is; archived_at is added on the way.
+COLUMNS = ['id', 'title', 'description', 'due_date', 'created_at', 'updated_at']
+
+
+def archivable(older_than, now=None):
+    """Resolved todos untouched for ``older_than`` (a timedelta), in ``(updated_at, id)`` order"""
+    cutoff = (now or timezone.now()) - older_than
+    # ``updated_at`` doubles as the resolution time: resolving bumps it.
+    return Todo.objects.filter(is_resolved=True, updated_at__lt=cutoff).order_by('updated_at', 'id')
+
+
+def archive_batch(pks, cutoff):
+    """
+    Move the todos among ``pks`` that are still archivable; return how many.
+
+    The candidates are re-checked inside the transaction, so a todo
+    reopened or edited since it was selected stays where it is. The
+    insert takes the write lock, so the delete sees the same rows.
+    """
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(name) for name in COLUMNS)
+    sql = (
+        f'INSERT INTO {quote(ArchivedTodo._meta.db_table)} ({columns}, {quote("archived_at")}) '
+        f'SELECT {columns}, %s FROM {quote(Todo._meta.db_table)} '
+        f'WHERE {quote("id")} IN ({", ".join(["%s"] * len(pks))}) '
+        f'AND {quote("is_resolved")} AND {quote("updated_at")} < %s'
+    )
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [now, *pks, connection.ops.adapt_datetimefield_value(cutoff)])
+            moved = cursor.rowcount
+        deleted = Todo.objects.filter(pk__in=pks, is_resolved=True, updated_at__lt=cutoff).delete_returning_pks()
+        if deleted:
+            todos_changed.send(sender=Todo, action='deleted', pks=deleted)
+    return moved
+
+
+def archive_todos(older_than, batch_size=500, pause=0.0):
+    """
+    Archive every archivable todo, ``batch_size`` per transaction.
+
+    Yields the running total after each batch. ``pause`` seconds are
+    slept between batches so waiting writers can take the lock.
+    """
+    now = timezone.now()
+    cutoff = now - older_than
+    candidates = archivable(older_than, now=now)
+    total = 0
+    last = None
+    while True:
+        # Keyset over (updated_at, id): rows left behind (reopened
+        # meanwhile) are not rescanned by every later batch.
+        batch = candidates if last is None else candidates.filter(updated_at__gte=last[0]).exclude(
+            updated_at=last[0], id__lte=last[1],
+        )
+        rows = list(batch.values_list('id', 'updated_at')[:batch_size])
+        if not rows:
+            return
+        total += archive_batch([pk for pk, _ in rows], cutoff)
+        pk, updated_at = rows[-1]
+        last = updated_at, pk
+        yield total
+        if pause:
+            time.sleep(pause)
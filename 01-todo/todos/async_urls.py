@@ -0,0 +1,23 @@
+# ========================================
+# FILE: todos/async_urls.py
+# ========================================
+"""
+``todos/urls.py`` with the async views swapped in; included instead of it
+when ``TODO_ASYNC_VIEWS`` is on. URL names and paths are unchanged.
+"""
+
+from django.urls import path
+from . import async_views, urls
+
+ASYNC_VIEWS = {
+    'todo_list': async_views.todo_list,
+    'todo_create': async_views.todo_create,
+    'todo_update': async_views.todo_update,
+    'todo_delete': async_views.todo_delete,
+    'todo_toggle': async_views.toggle_resolve,
+}
+
+urlpatterns = [
+    path(str(pattern.pattern), ASYNC_VIEWS.get(pattern.name, pattern.callback), name=pattern.name)
+    for pattern in urls.urlpatterns
+]
@@ -0,0 +1,152 @@
+# ========================================
+# FILE: todos/async_views.py
+# ========================================
+"""
+Native ``async def`` versions of the list, create, update, delete and
+toggle views, served instead of the ones in ``views.py`` when
+``TODO_ASYNC_VIEWS`` is on (see ``async_urls.py``).
+
+Under ASGI a sync view is run on a worker thread per request; these run
+on the event loop and only leave it for the queries the async ORM makes.
+Query budgets, URLs, templates and behaviour match the sync views.
+
+Templates are rendered on the event loop as well: rendering is CPU-bound
+and holds the GIL either way, so a thread would add a hop and no
+parallelism. Nothing a template reads may query the database, so the
+session (read by the messages context processor) is loaded up front.
+"""
+
+from functools import wraps
+
+from django.db.models import Case, Value, When
+from django.http import Http404
+from django.shortcuts import redirect, render
+from django.utils import timezone
+from django.views.decorators.http import require_POST
+from django.views.decorators.vary import vary_on_headers
+
+from .budgets import query_budget
+from . import fragments
+from .conditional import acondition, aget_todo, alist_etag, atodo_etag, atodo_last_modified
+from .forms import TodoForm
+from .fragments import is_fragment, render_row, toggled_response, wants_no_content
+from .models import Todo
+from .pagination import InvalidCursor
+from .signals import todos_changed
+from .views import TodoListView
+
+
+def preload_session(view):
+    """Load the session with the async API before ``view`` runs"""
+    @wraps(view)
+    async def inner(request, *args, **kwargs):
+        session = getattr(request, 'session', None)
+        if session is not None:
+            await session.aitems()
+        return await view(request, *args, **kwargs)
+    return inner
+
+
+def render_form(request, form, context=None):
+    if not is_fragment(request):
+        return render(request, 'todos/todo_form.html', {'form': form, **(context or {})})
+    return render(request, fragments.FORM_TEMPLATE, {'form': form}, status=400 if form.errors else 200)
+
+
+async def get_todo_or_404(request, pk):
+    todo = await aget_todo(request, pk)
+    if todo is None:
+        raise Http404('No Todo matches the given query.')
+    return todo
+
+
+@query_budget(queries=4)
+@preload_session
+@acondition(etag_func=alist_etag)
+async def todo_list(request):
+    # The sync view decides what to list and how to page it; only the
+    # reads differ.
+    view = TodoListView()
+    view.setup(request)
+    queryset = view.get_queryset()
+    page_size = view.get_paginate_by(queryset)
+    if page_size is None:
+        todos, paginator, page = [todo async for todo in queryset], None, None
+    else:
+        paginator = view.get_paginator(queryset, page_size)
+        try:
+            page = await paginator.apage(request.GET.get(view.page_kwarg))
+        except InvalidCursor:
+            raise Http404('Invalid cursor.')
+        todos = page.object_list
+    return render(request, view.template_name, {
+        'paginator': paginator,
+        'page_obj': page,
+        'is_paginated': page is not None and page.has_other_pages(),
+        'object_list': todos,
+        'todos': todos,
+        **view.get_list_context(),
+    })
+
+
+@query_budget(queries=1, writes=1)
+@vary_on_headers(fragments.HEADER)
+@preload_session
+async def todo_create(request):
+    if request.method == 'POST':
+        form = TodoForm(request.POST)
+        if form.is_valid():
+            await form.instance.asave()
+            if is_fragment(request):
+                return render_row(request, form.instance, status=201)
+            return redirect('todo_list')
+    else:
+        form = TodoForm()
+    return render_form(request, form)
+
+
+@query_budget(queries=2, writes=1)
+@vary_on_headers(fragments.HEADER)
+@preload_session
+@acondition(etag_func=atodo_etag, last_modified_func=atodo_last_modified)
+async def todo_update(request, pk):
+    todo = await get_todo_or_404(request, pk)
+    if request.method == 'POST':
+        form = TodoForm(request.POST, instance=todo)
+        if form.is_valid():
+            await form.instance.asave()
+            if is_fragment(request):
+                return render_row(request, todo)
+            return redirect('todo_list')
+    else:
+        form = TodoForm(instance=todo)
+    return render_form(request, form, {'object': todo, 'todo': todo})
+
+
+@query_budget(queries=2, writes=1)
+@preload_session
+async def todo_delete(request, pk):
+    if request.method == 'POST':
+        deleted, _ = await Todo.objects.filter(pk=pk).adelete()
+        if not deleted:
+            raise Http404('No Todo matches the given query.')
+        todos_changed.send(sender=Todo, action='deleted', pks=[pk])
+        return redirect('todo_list')
+    todo = await get_todo_or_404(request, pk)
+    return render(request, 'todos/todo_confirm_delete.html', {'object': todo, 'todo': todo})
+
+
+@query_budget(queries=2, writes=1)
+@vary_on_headers(fragments.HEADER)
+@require_POST
+async def toggle_resolve(request, pk):
+    updated = await Todo.objects.filter(pk=pk).aupdate(
+        is_resolved=Case(When(is_resolved=True, then=Value(False)), default=Value(True)),
+        updated_at=timezone.now(),
+    )
+    if not updated:
+        raise Http404('No Todo matches the given query.')
+    todos_changed.send(sender=Todo, action='toggled', pks=[pk])
+    if is_fragment(request) or wants_no_content(request):
+        return toggled_response(request, await Todo.objects.with_overdue().aget(pk=pk))
+    return redirect('todo_list')
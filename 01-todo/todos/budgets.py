@@ -0,0 +1,116 @@
+# ========================================
+# FILE: todos/budgets.py
+# ========================================
+"""
+Query budgets: how many SQL statements a view may run.
+
+Views declare a budget with ``@query_budget(...)``; tests enforce it with
+``assert_query_budget`` and, in development, ``QueryBudgetMiddleware``
+checks every request against its view's budget. Statements are counted
+through an execute wrapper so this works with ``DEBUG`` off as well, and
+for async views whose queries run on a worker thread.
+"""
+
+import re
+from collections import Counter
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS
+
+from .db import observe_queries
+
+# Transaction control is bookkeeping, not work the view asked for.
+_TRANSACTION_CONTROL = re.compile(r'^\s*(SAVEPOINT|RELEASE|ROLLBACK|BEGIN|COMMIT)\b', re.IGNORECASE)
+_WRITE = re.compile(r'^\s*(INSERT|UPDATE|DELETE|REPLACE)\b', re.IGNORECASE)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryRecorder:
+    """``execute_wrapper`` that keeps the SQL of every statement run"""
+
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        if not _TRANSACTION_CONTROL.match(sql):
+            self.statements.append(sql)
+        return execute(sql, params, many, context)
+
+    def __len__(self):
+        return len(self.statements)
+
+    @property
+    def writes(self):
+        return [sql for sql in self.statements if _WRITE.match(sql)]
+
+    def duplicates(self):
+        """Statements run more than once, as ``{sql: count}``"""
+        # Parameters are left out on purpose: the same statement run once
+        # per row with a different id is exactly the N+1 pattern.
+        return {sql: count for sql, count in Counter(self.statements).items() if count > 1}
+
+
+class QueryBudget:
+    """
+    At most ``queries`` statements and ``writes`` of them writing, and no
+    statement repeated unless ``allow_duplicates``. ``None`` means no limit.
+    """
+
+    def __init__(self, queries=None, writes=None, allow_duplicates=False):
+        self.queries = queries
+        self.writes = writes
+        self.allow_duplicates = allow_duplicates
+
+    def __repr__(self):
+        return f'QueryBudget(queries={self.queries}, writes={self.writes})'
+
+    def violations(self, recorder):
+        problems = []
+        if self.queries is not None and len(recorder) > self.queries:
+            problems.append(f'{len(recorder)} queries, budget is {self.queries}')
+        if self.writes is not None and len(recorder.writes) > self.writes:
+            problems.append(f'{len(recorder.writes)} writes, budget is {self.writes}')
+        if not self.allow_duplicates:
+            for sql, count in recorder.duplicates().items():
+                problems.append(f'ran {count} times: {sql}')
+        return problems
+
+
+def query_budget(queries=None, writes=None, allow_duplicates=False):
+    """Declare the budget of a view function or class-based view"""
+    def decorator(view):
+        view.query_budget = QueryBudget(queries, writes, allow_duplicates)
+        return view
+    return decorator
+
+
+def view_budget(view_func):
+    """The budget declared for a resolved view callable, if any"""
+    budget = getattr(view_func, 'query_budget', None)
+    if budget is None and hasattr(view_func, 'view_class'):
+        budget = getattr(view_func.view_class, 'query_budget', None)
+    return budget
+
+
+@contextmanager
+def record_queries(using=DEFAULT_DB_ALIAS):
+    with observe_queries(QueryRecorder(), using) as recorder:
+        yield recorder
+
+
+@contextmanager
+def assert_query_budget(queries=None, writes=None, allow_duplicates=False, using=DEFAULT_DB_ALIAS):
+    """
+    Fail if the block exceeds the budget::
+
+        with assert_query_budget(queries=1, writes=1):
+            client.post(...)
+    """
+    with record_queries(using) as recorder:
+        yield recorder
+    problems = QueryBudget(queries, writes, allow_duplicates).violations(recorder)
+    if problems:
+        raise QueryBudgetExceeded('Query budget exceeded: ' + '; '.join(problems))
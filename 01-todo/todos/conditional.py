@@ -0,0 +1,118 @@
+# ========================================
+# FILE: todos/conditional.py
+# ========================================
+"""
+Validators for conditional GETs (``django.views.decorators.http.condition``).
+
+They are computed from cheap aggregates so an unchanged page can answer
+``304 Not Modified`` without loading or rendering any Todo rows.
+"""
+
+import datetime
+import hashlib
+from functools import wraps
+
+from django.contrib.messages import get_messages
+from django.db.models import Count, Max
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .fragments import is_fragment
+from .models import Todo
+
+
+def _etag(*parts):
+    return hashlib.md5('|'.join(str(part) for part in parts).encode(), usedforsecurity=False).hexdigest()
+
+
+def list_etag(request, *args, **kwargs):
+    # A pending flash message is part of the page but not of the data.
+    if len(get_messages(request)):
+        return None
+    return _list_etag(request, Todo.objects.aggregate(latest=Max('updated_at'), count=Count('*')))
+
+
+async def alist_etag(request, *args, **kwargs):
+    """``list_etag`` for async views; the session must already be loaded"""
+    if len(get_messages(request)):
+        return None
+    return _list_etag(request, await Todo.objects.aaggregate(latest=Max('updated_at'), count=Count('*')))
+
+
+def _list_etag(request, stats):
+    return _etag(
+        stats['latest'].isoformat() if stats['latest'] else '',
+        stats['count'],
+        # Overdue markers change at midnight even when no row does.
+        timezone.now().date().isoformat(),
+        request.get_full_path(),
+    )
+
+
+def get_todo(request, pk):
+    """Load the Todo once per request; the view reuses it after the validators"""
+    if not hasattr(request, '_todo'):
+        request._todo = Todo.objects.filter(pk=pk).first()
+    return request._todo
+
+
+async def aget_todo(request, pk):
+    if not hasattr(request, '_todo'):
+        request._todo = await Todo.objects.filter(pk=pk).afirst()
+    return request._todo
+
+
+def todo_last_modified(request, pk, *args, **kwargs):
+    todo = get_todo(request, pk)
+    return todo.updated_at if todo else None
+
+
+def todo_etag(request, pk, *args, **kwargs):
+    updated_at = todo_last_modified(request, pk)
+    if updated_at is None:
+        return None
+    # The edit page and its bare form fragment share a URL.
+    return _etag(pk, updated_at.isoformat(), request.get_full_path(), is_fragment(request))
+
+
+async def atodo_last_modified(request, pk, *args, **kwargs):
+    todo = await aget_todo(request, pk)
+    return todo.updated_at if todo else None
+
+
+async def atodo_etag(request, pk, *args, **kwargs):
+    updated_at = await atodo_last_modified(request, pk)
+    if updated_at is None:
+        return None
+    # The edit page and its bare form fragment share a URL.
+    return _etag(pk, updated_at.isoformat(), request.get_full_path(), is_fragment(request))
+
+
+def acondition(etag_func=None, last_modified_func=None):
+    """
+    ``django.views.decorators.http.condition`` for async views with async
+    validators. Django's own decorator accepts async views but calls the
+    validators synchronously, so they could not use the async ORM.
+    """
+    def decorator(view):
+        @wraps(view)
+        async def inner(request, *args, **kwargs):
+            last_modified = None
+            if last_modified_func and (dt := await last_modified_func(request, *args, **kwargs)):
+                if not timezone.is_aware(dt):
+                    dt = timezone.make_aware(dt, datetime.timezone.utc)
+                last_modified = int(dt.timestamp())
+            etag = await etag_func(request, *args, **kwargs) if etag_func else None
+            etag = quote_etag(etag) if etag is not None else None
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = await view(request, *args, **kwargs)
+            if request.method in ('GET', 'HEAD'):
+                if last_modified and not response.has_header('Last-Modified'):
+                    response.headers['Last-Modified'] = http_date(last_modified)
+                if etag:
+                    response.headers.setdefault('ETag', etag)
+            return response
+        return inner
+    return decorator
@@ -0,0 +1,127 @@
+# ========================================
+# FILE: todos/db.py
+# ========================================
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connection, transaction
+from django.utils import timezone
+
+from .models import Todo
+
+# Columns written by insert_todos(), in INSERT order.
+COLUMNS = ['title', 'description', 'due_date', 'is_resolved', 'created_at', 'updated_at']
+
+
+def configure_sqlite_connection(sender, connection, **kwargs):
+    """``connection_created`` receiver applying ``SQLITE_PRAGMAS``"""
+    if connection.vendor != 'sqlite':
+        return
+    # Straight on the DB-API connection: through connection.cursor() the
+    # PRAGMAs would pass the execute wrappers and count as queries of the
+    # request that happened to open the connection.
+    for name, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+        connection.connection.execute(f'PRAGMA {name} = {value}')
+
+
+# (alias, wrapper) pairs registered by observe_queries() in this context.
+_query_observers = ContextVar('todo_query_observers', default=())
+
+
+def _call_observers(observers, execute, sql, params, many, context):
+    if not observers:
+        return execute(sql, params, many, context)
+    rest = partial(_call_observers, observers[1:], execute)
+    return observers[0](rest, sql, params, many, context)
+
+
+def dispatch_query_observers(execute, sql, params, many, context):
+    """Permanent execute wrapper handing each statement to the observers in context"""
+    alias = context['connection'].alias
+    observers = [wrapper for using, wrapper in _query_observers.get() if using == alias]
+    return _call_observers(observers, execute, sql, params, many, context)
+
+
+def install_query_observers(sender, connection, **kwargs):
+    """``connection_created`` receiver adding ``dispatch_query_observers``"""
+    if dispatch_query_observers not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, dispatch_query_observers)
+
+
+@contextmanager
+def observe_queries(wrapper, using=DEFAULT_DB_ALIAS):
+    """
+    Like ``connection.execute_wrapper(wrapper)``, but scoped to the current
+    context rather than to this thread's connection.
+
+    The async ORM runs queries on a worker thread with its own connection,
+    where an ``execute_wrapper`` installed by async code never sees them;
+    context variables are carried over to that thread, so an observer
+    registered here does.
+    """
+    token = _query_observers.set(_query_observers.get() + ((using, wrapper),))
+    try:
+        yield wrapper
+    finally:
+        _query_observers.reset(token)
+
+
+@contextmanager
+def deferred_search_index():
+    """
+    Index rows inserted inside the block with one set-based FTS5 insert.
+
+    The per-row ``todos_todo_fts_ai`` trigger costs about 4x the insert
+    itself, so bulk loaders drop it for the duration of the block and
+    recreate it from its stored definition afterwards. SQLite DDL is
+    transactional and the block is one transaction (a savepoint when
+    nested), so the drop is rolled back with everything else if the block
+    fails or the process dies before commit, and no other connection ever
+    inserts while the trigger is missing: the write lock is held
+    throughout.
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = 'todos_todo_fts_ai'"
+        )
+        row = cursor.fetchone()
+        if row is None:
+            yield
+            return
+        cursor.execute('SELECT COALESCE(MAX(id), 0) FROM todos_todo')
+        last_id = cursor.fetchone()[0]
+        cursor.execute('DROP TRIGGER todos_todo_fts_ai')
+        yield
+        cursor.execute(
+            'INSERT INTO todos_todo_fts(rowid, title, description) '
+            'SELECT id, title, description FROM todos_todo WHERE id > %s',
+            [last_id],
+        )
+        cursor.execute(row[0])
+
+
+def insert_todos(rows):
+    """
+    Insert validated ``(title, description, due_date, is_resolved)`` tuples.
+
+    This is ``bulk_create`` without the per-value compilation: on SQLite
+    Django splits a bulk_create into 166-row statements and prepares every
+    value through the field API, which caps imports at roughly 20k rows/s.
+    One prepared INSERT run through ``executemany`` keeps the same
+    semantics (auto_now/auto_now_add set once per batch) at several times
+    that rate.
+    """
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        connection.ops.quote_name(Todo._meta.db_table),
+        ', '.join(connection.ops.quote_name(Todo._meta.get_field(name).column) for name in COLUMNS),
+        ', '.join(['%s'] * len(COLUMNS)),
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, [
+            (title, description, due_date.isoformat() if due_date else None, is_resolved, now, now)
+            for title, description, due_date, is_resolved in rows
+        ])
@@ -0,0 +1,214 @@
+# ========================================
+# FILE: todos/events.py
+# ========================================
+"""
+Live updates for the todo list, pushed to open pages as Server-Sent Events.
+
+Writes announce themselves through ``post_save`` and ``todos_changed``
+(``signals.py``) once their transaction commits. The process-wide
+``broadcaster`` renders each event's rows once and hands the message to
+every open stream; an idle stream is a coroutine waiting on its queue,
+plus a keep-alive comment every ``TODO_EVENTS_HEARTBEAT`` seconds.
+
+With ``TODO_EVENTS_BACKEND = 'sqlite'`` signals are ignored and events
+come from the database instead: while a process has open streams it polls
+the sync change feed (``updated_at`` and tombstones, see ``sync.py``)
+every ``TODO_EVENTS_POLL_INTERVAL`` seconds, so every worker sees writes
+made by any other worker or management command. The feed cannot tell a
+toggle from an edit; both arrive as ``updated``.
+
+An open stream still costs one OS thread: ASGIHandler runs each request
+in its own thread-sensitive context, and the thread that ran the
+request's sync middleware stays reserved for that context until the
+stream closes. Size the server's thread limits for the number of pages
+expected to be open at once.
+"""
+
+import asyncio
+import json
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .models import Todo
+from .sync import changes_since, encode_sync_cursor
+
+ROW_TEMPLATE = 'todos/_todo_item.html'
+
+# Messages queued for one stream before it counts as stalled.
+QUEUE_SIZE = 100
+
+# Columns needed to render a row from the change feed.
+FEED_FIELDS = ['id', 'title', 'description', 'due_date', 'is_resolved', 'created_at']
+
+
+def backend():
+    return getattr(settings, 'TODO_EVENTS_BACKEND', 'memory')
+
+
+def message(action, payload):
+    """One SSE message; JSON keeps the data on a single line"""
+    return f'event: {action}\ndata: {json.dumps(payload)}\n\n'
+
+
+def render_rows(todos):
+    return [{'id': todo.pk, 'html': render_to_string(ROW_TEMPLATE, {'todo': todo})} for todo in todos]
+
+
+async def build_message(action, pks):
+    if action == 'deleted':
+        return message(action, {'ids': pks})
+    todos = [todo async for todo in Todo.objects.with_overdue().filter(pk__in=pks)]
+    if not todos:
+        return None
+    return message(action, {'rows': render_rows(todos)})
+
+
+class Broadcaster:
+    """
+    Fan-out from writers on any thread to the streams of one event loop.
+
+    A pump task on that loop turns published events into messages; it
+    runs only while at least one stream is subscribed.
+    """
+
+    def __init__(self):
+        self.subscribers = set()
+        self.loop = None
+        self.pending = None
+        self.task = None
+
+    def subscribe(self):
+        loop = asyncio.get_running_loop()
+        if self.loop is not loop:
+            if self.subscribers and not self.loop.is_closed():
+                raise RuntimeError('The broadcaster is serving streams on another event loop.')
+            self.loop, self.pending, self.subscribers = loop, asyncio.Queue(), set()
+            self.task = None
+        queue = asyncio.Queue(QUEUE_SIZE)
+        self.subscribers.add(queue)
+        if self.task is None or self.task.done():
+            self.task = loop.create_task(self.run_feed() if backend() == 'sqlite' else self.run())
+        return queue
+
+    def unsubscribe(self, queue):
+        self.subscribers.discard(queue)
+        if not self.subscribers and self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    def publish(self, action, pks):
+        """Queue an event for the pump; safe from any thread, free without listeners"""
+        loop = self.loop
+        if not self.subscribers or loop is None or loop.is_closed():
+            return
+        loop.call_soon_threadsafe(self.pending.put_nowait, (action, list(pks)))
+
+    def send(self, text):
+        for queue in list(self.subscribers):
+            try:
+                queue.put_nowait(text)
+            except asyncio.QueueFull:
+                # The client stopped reading; tell it to reload instead of
+                # buffering for it without bound.
+                self.subscribers.discard(queue)
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+
+    async def run(self):
+        while True:
+            action, pks = await self.pending.get()
+            text = await build_message(action, pks)
+            if text is not None:
+                self.send(text)
+
+    async def run_feed(self):
+        interval = getattr(settings, 'TODO_EVENTS_POLL_INTERVAL', 1)
+        now = timezone.now()
+        cursor = encode_sync_cursor((now, 0), (now, 0))
+        since = now
+        # The feed re-reads its last few seconds (see sync._settled);
+        # remember what was already sent so each change goes out once.
+        sent = {}
+        while True:
+            await asyncio.sleep(interval)
+            has_more = True
+            while has_more:
+                changed, deleted, cursor, has_more = await sync_to_async(changes_since)(
+                    cursor, FEED_FIELDS + ['updated_at'], 500,
+                )
+                self.send_feed(changed, deleted, since, sent)
+            since = timezone.now()
+            horizon = since - 2 * timedelta(seconds=getattr(settings, 'TODO_SYNC_SETTLE_SECONDS', 2))
+            sent = {key: moment for key, moment in sent.items() if moment >= horizon}
+
+    def send_feed(self, changed, deleted, since, sent):
+        fresh = [row for row in changed if sent.get(('changed', row['id'])) != row['updated_at']]
+        for row in fresh:
+            sent[('changed', row['id'])] = row['updated_at']
+        for action, rows in (('created', [r for r in fresh if r['created_at'] >= since]),
+                             ('updated', [r for r in fresh if r['created_at'] < since])):
+            if rows:
+                todos = [Todo(**{name: row[name] for name in FEED_FIELDS}) for row in rows]
+                for todo in todos:
+                    todo.overdue = todo.is_overdue()
+                self.send(message(action, {'rows': render_rows(todos)}))
+        now = timezone.now()
+        deleted = [pk for pk in deleted if ('deleted', pk) not in sent]
+        for pk in deleted:
+            sent[('deleted', pk)] = now
+        if deleted:
+            self.send(message('deleted', {'ids': deleted}))
+
+
+broadcaster = Broadcaster()
+
+
+def publish(action, pks):
+    """Announce a change once the current transaction commits"""
+    if backend() != 'memory' or not broadcaster.subscribers:
+        return
+    pks = list(pks)
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        transaction.on_commit(lambda: broadcaster.publish(action, pks))
+    else:
+        # Sent from an async view: the async ORM has already committed on
+        # its worker thread, and this thread's connection must not be used.
+        broadcaster.publish(action, pks)
+
+
+def todo_saved(sender, instance, created, **kwargs):
+    """``post_save`` receiver"""
+    publish('created' if created else 'updated', [instance.pk])
+
+
+def todos_changed(sender, action, pks, **kwargs):
+    """``todos_changed`` receiver"""
+    publish(action, pks)
+
+
+async def stream():
+    """The body of one event stream"""
+    heartbeat = getattr(settings, 'TODO_EVENTS_HEARTBEAT', 30)
+    queue = broadcaster.subscribe()
+    try:
+        # Reconnect after 5s if the connection drops.
+        yield 'retry: 5000\n\n'
+        while True:
+            try:
+                text = await asyncio.wait_for(queue.get(), heartbeat)
+            except asyncio.TimeoutError:
+                text = ': keep-alive\n\n'
+            if text is None:
+                yield message('reload', {})
+                return
+            yield text
+    finally:
+        broadcaster.unsubscribe(queue)
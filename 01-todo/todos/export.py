@@ -0,0 +1,89 @@
+# ========================================
+# FILE: todos/export.py
+# ========================================
+"""
+Streaming CSV / NDJSON export of todos.
+
+Rows are read with ``.iterator(chunk_size=...)`` and written out one chunk
+at a time, so memory stays flat no matter how many rows are exported.
+Under ASGI a sync iterator would be read to the end before the first byte
+is sent, so ASGI responses stream ``aiter_export`` instead.
+"""
+
+import csv
+import io
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Todo
+
+FIELDS = ['id', 'title', 'description', 'due_date', 'is_resolved', 'created_at', 'updated_at']
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+DEFAULT_CHUNK_SIZE = 2000
+
+
+def export_queryset(is_resolved=None, due_from=None, due_to=None):
+    queryset = Todo.objects.order_by('id')
+    if is_resolved is not None:
+        queryset = queryset.filter(is_resolved=is_resolved)
+    if due_from is not None:
+        queryset = queryset.filter(due_date__gte=due_from)
+    if due_to is not None:
+        queryset = queryset.filter(due_date__lte=due_to)
+    return queryset
+
+
+def _chunks(queryset, chunk_size):
+    chunk = []
+    for row in queryset.values_list(*FIELDS).iterator(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_csv(queryset, chunk_size=DEFAULT_CHUNK_SIZE):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(FIELDS)
+    for chunk in _chunks(queryset, chunk_size):
+        writer.writerows(chunk)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def iter_ndjson(queryset, chunk_size=DEFAULT_CHUNK_SIZE):
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+    for chunk in _chunks(queryset, chunk_size):
+        yield ''.join(encoder.encode(dict(zip(FIELDS, row))) + '\n' for row in chunk)
+
+
+def iter_export(queryset, export_format, chunk_size=DEFAULT_CHUNK_SIZE):
+    if export_format == 'ndjson':
+        return iter_ndjson(queryset, chunk_size)
+    return iter_csv(queryset, chunk_size)
+
+
+async def aiter_export(queryset, export_format, chunk_size=DEFAULT_CHUNK_SIZE):
+    """``iter_export`` one chunk at a time for ASGI responses"""
+    chunks = iter_export(queryset, export_format, chunk_size)
+    # Thread-sensitive, so every chunk is read on the request's thread,
+    # where the database cursor behind the iterator lives.
+    next_chunk = sync_to_async(next)
+    try:
+        while (chunk := await next_chunk(chunks, None)) is not None:
+            yield chunk
+    finally:
+        await sync_to_async(chunks.close)()
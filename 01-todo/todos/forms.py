@@ -2,6 +2,8 @@
 # FILE: todos/forms.py
 # ========================================
 
+from datetime import date
+
 from django import forms
 from .models import Todo
 
@@ -14,3 +16,79 @@ class TodoForm(forms.ModelForm):
             'description': forms.Textarea(attrs={'class': 'form-input', 'rows': 3}),
             'due_date': forms.DateInput(attrs={'class': 'form-input', 'type': 'date'}),
         }
+
+
+class TodoRowValidator:
+    """
+    Validate plain dict rows with ``TodoForm``'s own fields.
+
+    Building a ModelForm per row dominates bulk imports; this runs the same
+    field ``clean()`` rules (required, max_length, date parsing, boolean
+    coercion) against one shared set of fields instead.
+    """
+
+    def __init__(self):
+        self.fields = TodoForm.base_fields
+
+    def clean(self, row):
+        """Return ``(cleaned_data, errors)``; ``errors`` is empty when valid"""
+        cleaned_data, errors = {}, {}
+        for name, field in self.fields.items():
+            value = row.get(name)
+            if not isinstance(value, (str, bool) if isinstance(field, forms.BooleanField) else str) and value is not None:
+                # An NDJSON number, list or object: clean() would str() it
+                # or fail with something other than a ValidationError.
+                errors[name] = ['Expected a string.']
+                continue
+            try:
+                if isinstance(field, forms.DateField) and _is_iso_date(value):
+                    # Same result as the '%Y-%m-%d' input format, without
+                    # the per-call locale lookup and strptime.
+                    cleaned_data[name] = date.fromisoformat(value)
+                else:
+                    cleaned_data[name] = field.clean(value)
+            except forms.ValidationError as exc:
+                errors[name] = exc.messages
+            except ValueError:
+                # fromisoformat() on an impossible date such as 2025-02-30
+                errors[name] = [str(field.error_messages['invalid'])]
+        return cleaned_data, errors
+
+
+def _is_iso_date(value):
+    return isinstance(value, str) and len(value) == 10 and value[4] == '-' and value[7] == '-'
+
+
+class TodoBulkForm(forms.Form):
+    ACTION_CHOICES = [
+        ('resolve', 'Mark resolved'),
+        ('unresolve', 'Mark pending'),
+        ('set_due_date', 'Set due date'),
+        ('delete', 'Delete'),
+    ]
+
+    pks = forms.Field(widget=forms.MultipleHiddenInput)
+    action = forms.ChoiceField(choices=ACTION_CHOICES)
+    due_date = forms.DateField(
+        required=False,
+        widget=forms.DateInput(attrs={'class': 'form-input', 'type': 'date'}),
+    )
+
+    def clean_pks(self):
+        try:
+            return sorted({int(pk) for pk in self.cleaned_data['pks']})
+        except (TypeError, ValueError):
+            raise forms.ValidationError('Select valid TODOs.')
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('action') == 'set_due_date' and not cleaned_data.get('due_date'):
+            self.add_error('due_date', 'A due date is required for this action.')
+        return cleaned_data
+
+
+class TodoExportForm(forms.Form):
+    format = forms.ChoiceField(choices=[('csv', 'CSV'), ('ndjson', 'NDJSON')], required=False)
+    is_resolved = forms.NullBooleanField(required=False)
+    due_from = forms.DateField(required=False)
+    due_to = forms.DateField(required=False)
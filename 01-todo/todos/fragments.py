@@ -0,0 +1,58 @@
+# ========================================
+# FILE: todos/fragments.py
+# ========================================
+"""
+HTML fragments for changing the list page in place.
+
+A request asks for a fragment with an ``X-Fragment`` header (the list
+page's script sends one) or ``?fragment=1``. Toggle, create and update
+then answer with the affected row or form alone instead of redirecting
+to, and re-rendering, the whole list; toggle answers ``Prefer:
+return=minimal`` with an empty 204 instead. Without any of these the
+views behave as before, so the page keeps working without JavaScript.
+"""
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.shortcuts import render
+from django.utils import timezone
+
+HEADER = 'X-Fragment'
+
+ROW_TEMPLATE = 'todos/_todo_row.html'
+FORM_TEMPLATE = 'todos/_todo_form.html'
+
+
+def is_fragment(request):
+    return bool(request.headers.get(HEADER)) or request.GET.get('fragment') == '1'
+
+
+def wants_no_content(request):
+    """The caller sent ``Prefer: return=minimal`` (RFC 7240)"""
+    return 'return=minimal' in request.headers.get('Prefer', '').replace(' ', '').split(',')
+
+
+def row_context(today=None):
+    """What ``_todo_row.html`` needs besides the todo"""
+    # Row fragments are cached per (pk, updated_at, today); every write
+    # path bumps updated_at and the date rolls overdue markers at midnight.
+    return {
+        'today': (today or timezone.now().date()).isoformat(),
+        'row_cache_timeout': getattr(settings, 'TODO_ROW_CACHE_TIMEOUT', 86400),
+    }
+
+
+def render_row(request, todo, status=200):
+    """One row; rendering it also fills the list's cached copy"""
+    if not hasattr(todo, 'overdue'):
+        todo.overdue = todo.is_overdue()
+    return render(request, ROW_TEMPLATE, {'todo': todo, **row_context()}, status=status)
+
+
+def toggled_response(request, todo):
+    """The JavaScript answer to a toggle: the new row, or 204 with the new state"""
+    if is_fragment(request):
+        return render_row(request, todo)
+    response = HttpResponse(status=204)
+    response['X-Todo-Resolved'] = 'true' if todo.is_resolved else 'false'
+    return response
@@ -0,0 +1,49 @@
+# ========================================
+# FILE: todos/management/commands/archive_todos.py
+# ========================================
+
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from todos.archive import archivable, archive_todos
+
+
+class Command(BaseCommand):
+    help = (
+        'Move resolved todos not updated for --older-than days into the '
+        'archive, in short batched transactions.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than', type=int, required=True, metavar='DAYS',
+            help='Archive todos resolved (last updated) at least this many days ago.',
+        )
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows moved per transaction.')
+        parser.add_argument(
+            '--pause', type=float, default=0.05,
+            help='Seconds to sleep between batches so other writers get the lock.',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Only count the todos that would move.')
+
+    def handle(self, *args, **options):
+        if options['older_than'] < 0:
+            raise CommandError('--older-than must not be negative.')
+        if options['batch_size'] < 1 or options['pause'] < 0:
+            raise CommandError('--batch-size must be positive and --pause not negative.')
+        older_than = timedelta(days=options['older_than'])
+
+        if options['dry_run']:
+            self.stdout.write(f'{archivable(older_than).count()} todos would be archived.')
+            return
+
+        started = time.perf_counter()
+        archived = 0
+        for archived in archive_todos(older_than, options['batch_size'], options['pause']):
+            if options['verbosity'] > 1:
+                self.stdout.write(f'{archived} archived')
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {archived} todos in {time.perf_counter() - started:.1f}s.'
+        ))
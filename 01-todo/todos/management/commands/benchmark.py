@@ -0,0 +1,84 @@
+# ========================================
+# FILE: todos/management/commands/benchmark.py
+# ========================================
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.suite import DEFAULT_SIZES, SCENARIOS, compare, run_suite
+
+
+def parse_size(value):
+    """Accept plain row counts as well as ``1k`` / ``1m`` shorthands"""
+    multipliers = {'k': 1000, 'm': 1000000}
+    value = value.strip().lower()
+    try:
+        if value[-1:] in multipliers:
+            return int(float(value[:-1]) * multipliers[value[-1]])
+        return int(value)
+    except ValueError:
+        raise CommandError(f'Invalid dataset size: {value!r}')
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark every todos URL and the admin changelist against seeded '
+        'datasets, reporting latency percentiles, queries and allocations.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', default=','.join(str(size) for size in DEFAULT_SIZES),
+            help='Comma-separated dataset sizes, e.g. 1k,100k,1m.',
+        )
+        parser.add_argument('--repeat', type=int, default=50, help='Timed requests per scenario.')
+        parser.add_argument('--warmup', type=int, default=5, help='Untimed requests per scenario.')
+        parser.add_argument(
+            '--only', action='append', default=[],
+            help='Run only this scenario or URL name; may be repeated.',
+        )
+        parser.add_argument('--output', '-o', help='Write the results to this JSON file.')
+        parser.add_argument('--compare', help='Baseline JSON file from an earlier run.')
+        parser.add_argument(
+            '--threshold', type=float, default=0.2,
+            help='Allowed slowdown against --compare as a fraction (default 0.2 = 20%%).',
+        )
+        parser.add_argument('--list', action='store_true', help='List the scenarios and exit.')
+
+    def handle(self, *args, **options):
+        if options['list']:
+            for scenario in SCENARIOS:
+                self.stdout.write(f'{scenario.name:<28} {scenario.method.upper():<6} {scenario.url_name}')
+            return
+
+        known = {s.name for s in SCENARIOS} | {s.url_name for s in SCENARIOS}
+        unknown = sorted(set(options['only']) - known)
+        if unknown:
+            raise CommandError(f'Unknown scenario(s): {", ".join(unknown)}. See --list.')
+        if options['repeat'] < 1 or options['warmup'] < 0:
+            raise CommandError('--repeat must be positive and --warmup not negative.')
+
+        baseline = None
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as stream:
+                baseline = json.load(stream)
+
+        sizes = [parse_size(size) for size in options['sizes'].split(',') if size.strip()]
+        results = run_suite(
+            sizes, repeat=options['repeat'], warmup=options['warmup'],
+            only=set(options['only']), log=self.stdout.write,
+        )
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as stream:
+                json.dump(results, stream, indent=2)
+            self.stdout.write(f"Results written to {options['output']}.")
+
+        if baseline is None:
+            return
+        regressions = compare(baseline, results, options['threshold'])
+        if regressions:
+            for regression in regressions:
+                self.stderr.write(regression)
+            raise CommandError(f'{len(regressions)} regression(s) against {options["compare"]}.')
+        self.stdout.write(self.style.SUCCESS(f'No regressions against {options["compare"]}.'))
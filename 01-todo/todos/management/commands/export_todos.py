@@ -0,0 +1,36 @@
+# ========================================
+# FILE: todos/management/commands/export_todos.py
+# ========================================
+
+import sys
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from todos.export import DEFAULT_CHUNK_SIZE, FORMATS, export_queryset, iter_export
+
+
+class Command(BaseCommand):
+    help = 'Stream todos to a CSV or NDJSON file (or stdout) with flat memory use.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(FORMATS), default='csv')
+        parser.add_argument('--output', '-o', help='File to write; defaults to stdout.')
+        state = parser.add_mutually_exclusive_group()
+        state.add_argument('--resolved', dest='is_resolved', action='store_true', default=None)
+        state.add_argument('--unresolved', dest='is_resolved', action='store_false')
+        parser.add_argument('--due-from', type=date.fromisoformat, help='YYYY-MM-DD, inclusive.')
+        parser.add_argument('--due-to', type=date.fromisoformat, help='YYYY-MM-DD, inclusive.')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be positive.')
+        queryset = export_queryset(options['is_resolved'], options['due_from'], options['due_to'])
+        chunks = iter_export(queryset, options['format'], options['chunk_size'])
+
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as output:
+                output.writelines(chunks)
+        else:
+            sys.stdout.writelines(chunks)
@@ -0,0 +1,364 @@
+# ========================================
+# FILE: todos/metrics.py
+# ========================================
+"""
+Prometheus text-format metrics that add up across worker processes.
+
+Every process writes its samples into its own memory-mapped file in
+``TODO_METRICS_DIR`` (an update is a lock plus a ``struct.pack_into``);
+``/metrics`` reads all the files and sums them, so a scrape that lands on
+any worker sees the totals of all of them. When a process opens its file
+it folds the files of processes that have exited (including an earlier
+one with the same pid) into ``process_exited.db``: totals never go
+backwards and the directory does not grow with every worker restart.
+
+The todo gauges come from one aggregate query cached in a JSON file and
+refreshed at most every ``TODO_METRICS_STATS_INTERVAL`` seconds, by one
+process at a time, in the background.
+"""
+
+import json
+import math
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, Q
+
+from .models import Todo
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_HEADER = struct.Struct('<i4x')
+_LENGTH = struct.Struct('<i')
+_VALUE = struct.Struct('<d')
+
+
+class MmapedDict:
+    """
+    A ``str -> float`` map kept in a memory-mapped file.
+
+    Layout: an 8-byte header holding the number of bytes used, then one
+    entry per key: a 4-byte key length, the UTF-8 key padded so the value
+    is 8-byte aligned, and the value as a double. Entries are written
+    before the header is bumped, so a reader in another process never sees
+    a half-written entry.
+    """
+
+    def __init__(self, path, initial_size=1 << 16):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, 'a+b')
+        size = os.fstat(self._file.fileno()).st_size
+        if size == 0:
+            self._file.truncate(initial_size)
+            size = initial_size
+        self._capacity = size
+        self._map = mmap.mmap(self._file.fileno(), self._capacity)
+        self._used = _HEADER.unpack_from(self._map, 0)[0] or _HEADER.size
+        self._positions = {key: position for key, _, position in _entries(self._map, self._used)}
+
+    def increment(self, key, amount=1.0):
+        with self._lock:
+            position = self._positions.get(key)
+            if position is None:
+                position = self._append(key)
+            value = _VALUE.unpack_from(self._map, position)[0]
+            _VALUE.pack_into(self._map, position, value + amount)
+
+    def _append(self, key):
+        encoded = key.encode()
+        padding = -(_LENGTH.size + len(encoded)) % 8
+        entry = _LENGTH.pack(len(encoded)) + encoded + b' ' * padding + _VALUE.pack(0.0)
+        while self._used + len(entry) > self._capacity:
+            self._capacity *= 2
+            # Windows cannot resize a file while it is mapped.
+            self._map.close()
+            self._file.truncate(self._capacity)
+            self._map = mmap.mmap(self._file.fileno(), self._capacity)
+        self._map[self._used:self._used + len(entry)] = entry
+        self._used += len(entry)
+        _HEADER.pack_into(self._map, 0, self._used)
+        self._positions[key] = self._used - _VALUE.size
+        return self._positions[key]
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+def _entries(data, used=None):
+    """Yield ``(key, value, value_position)`` from a store's bytes"""
+    if used is None:
+        used = _HEADER.unpack_from(data, 0)[0] if len(data) >= _HEADER.size else 0
+    position = _HEADER.size
+    while position < used:
+        length = _LENGTH.unpack_from(data, position)[0]
+        key = bytes(data[position + _LENGTH.size:position + _LENGTH.size + length]).decode()
+        position += _LENGTH.size + length + (-(_LENGTH.size + length) % 8)
+        yield key, _VALUE.unpack_from(data, position)[0], position
+        position += _VALUE.size
+
+
+def metrics_dir():
+    return Path(getattr(settings, 'TODO_METRICS_DIR', Path(tempfile.gettempdir()) / 'todoproject-metrics'))
+
+
+@contextmanager
+def _locked(path, blocking=True):
+    """Hold an exclusive lock on ``path``; yields whether it was acquired"""
+    with open(path, 'a+b') as file:
+        try:
+            if fcntl is not None:
+                fcntl.flock(file, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            else:
+                file.seek(0)
+                msvcrt.locking(file.fileno(), msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+        except OSError:
+            yield False
+        else:
+            yield True
+
+
+def _running(pid):
+    if os.name == 'nt':
+        # os.kill() would terminate it; leave other processes' files alone.
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+EXITED_FILE = 'process_exited.db'
+
+_store = None
+_store_lock = threading.Lock()
+# Store files this process has opened; any other file with its pid is a
+# leftover of an earlier process.
+_opened = set()
+
+
+def fold_exited(directory):
+    """Add the samples of processes that are gone to ``EXITED_FILE`` and drop their files"""
+    with _locked(directory / 'fold.lock') as acquired:
+        if not acquired:
+            return
+        exited = None
+        for path in directory.glob('process_*.db'):
+            pid = path.stem.removeprefix('process_')
+            if not pid.isdigit():
+                continue
+            live = path in _opened if int(pid) == os.getpid() else _running(int(pid))
+            if live:
+                continue
+            exited = exited or MmapedDict(directory / EXITED_FILE)
+            for key, value, _ in _entries(path.read_bytes()):
+                exited.increment(key, value)
+            path.unlink()
+        if exited is not None:
+            exited.close()
+
+
+def process_store():
+    """This process's store; reopened after a fork or a settings change"""
+    global _store
+    path = metrics_dir() / f'process_{os.getpid()}.db'
+    if _store is None or _store.path != path:
+        with _store_lock:
+            if _store is None or _store.path != path:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                fold_exited(path.parent)
+                _opened.add(path)
+                _store = MmapedDict(path)
+    return _store
+
+
+def collect():
+    """Sum every process's samples into ``{key: value}``"""
+    totals = defaultdict(float)
+    for path in metrics_dir().glob('process_*.db'):
+        data = path.read_bytes()
+        for key, value, _ in _entries(data):
+            totals[key] += value
+    return totals
+
+
+def _key(name, labels):
+    return json.dumps([name, sorted(labels.items())], separators=(',', ':'))
+
+
+class Histogram:
+    def __init__(self, name, documentation, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = sorted(buckets) + [math.inf]
+
+    def observe(self, value, **labels):
+        # Buckets are stored non-cumulatively (one write per observation)
+        # and accumulated when rendered.
+        store = process_store()
+        bucket = next(bound for bound in self.buckets if value <= bound)
+        store.increment(_key(f'{self.name}_bucket', {**labels, 'le': _format(bucket)}))
+        store.increment(_key(f'{self.name}_sum', labels), value)
+        store.increment(_key(f'{self.name}_count', labels))
+
+    def render(self, samples):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        series = defaultdict(dict)
+        for key, value in samples.items():
+            name, labels = json.loads(key)
+            if name.rsplit('_', 1)[0] != self.name:
+                continue
+            labels = dict(labels)
+            le = labels.pop('le', None)
+            series[tuple(sorted(labels.items()))][(name, le)] = value
+        for labels, values in sorted(series.items()):
+            cumulative = 0.0
+            for bound in self.buckets:
+                cumulative += values.get((f'{self.name}_bucket', _format(bound)), 0.0)
+                lines.append(_sample(f'{self.name}_bucket', dict(labels, le=_format(bound)), cumulative))
+            lines.append(_sample(f'{self.name}_sum', dict(labels), values.get((f'{self.name}_sum', None), 0.0)))
+            lines.append(_sample(f'{self.name}_count', dict(labels), values.get((f'{self.name}_count', None), 0.0)))
+        return lines
+
+
+def _format(value):
+    return '+Inf' if value == math.inf else repr(float(value))
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+def _sample(name, labels, value):
+    if labels:
+        rendered = ','.join(f'{key}="{_escape(labels[key])}"' for key in sorted(labels))
+        name = f'{name}{{{rendered}}}'
+    return f'{name} {_format(value)}'
+
+
+REQUEST_DURATION = Histogram(
+    'todo_http_request_duration_seconds', 'Time to produce a response, by URL name.',
+    [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10],
+)
+DB_QUERIES = Histogram(
+    'todo_db_queries_per_request', 'SQL statements run per request, by URL name.',
+    [0, 1, 2, 3, 5, 8, 13, 21, 50, 100],
+)
+DB_DURATION = Histogram(
+    'todo_db_duration_seconds', 'Time spent in SQL per request, by URL name.',
+    [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1],
+)
+HISTOGRAMS = [REQUEST_DURATION, DB_QUERIES, DB_DURATION]
+
+
+def observe_request(view, method, duration, queries=None, db_duration=None):
+    labels = {'view': view, 'method': method}
+    REQUEST_DURATION.observe(duration, **labels)
+    if queries is not None:
+        DB_QUERIES.observe(queries, **labels)
+        DB_DURATION.observe(db_duration, **labels)
+
+
+# ----------------------------------------
+# Todo gauges
+# ----------------------------------------
+
+_refreshing = threading.Lock()
+
+
+def _stats_path():
+    return metrics_dir() / 'todo_stats.json'
+
+
+def compute_todo_stats():
+    stats = Todo.objects.aggregate(
+        open=Count('pk', filter=Q(is_resolved=False)),
+        resolved=Count('pk', filter=Q(is_resolved=True)),
+    )
+    # A range count on todo_open_due_idx.
+    stats['overdue'] = Todo.objects.overdue().count()
+    return stats
+
+
+def refresh_todo_stats():
+    """
+    Recompute the gauges unless another process is already doing it.
+
+    The lock file makes concurrent refreshes from several workers skip
+    rather than queue, and the result replaces the cache file atomically.
+    """
+    path = _stats_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with _locked(path.with_suffix('.lock'), blocking=False) as acquired:
+        if not acquired:
+            return
+        stats = compute_todo_stats()
+        stats['refreshed_at'] = time.time()
+        temporary = path.with_suffix(f'.{os.getpid()}.tmp')
+        temporary.write_text(json.dumps(stats))
+        os.replace(temporary, path)
+
+
+def _refresh_in_background():
+    try:
+        refresh_todo_stats()
+    finally:
+        connection.close()
+        _refreshing.release()
+
+
+def todo_stats():
+    """
+    The cached gauges. A missing cache is filled synchronously (the first
+    scrape after a deploy); a stale one is served as is while a background
+    thread refreshes it.
+    """
+    path = _stats_path()
+    try:
+        stats = json.loads(path.read_text())
+    except (FileNotFoundError, ValueError):
+        refresh_todo_stats()
+        try:
+            return json.loads(path.read_text())
+        except (FileNotFoundError, ValueError):
+            return None
+    interval = getattr(settings, 'TODO_METRICS_STATS_INTERVAL', 15)
+    if time.time() - stats['refreshed_at'] > interval and _refreshing.acquire(blocking=False):
+        threading.Thread(target=_refresh_in_background, daemon=True).start()
+    return stats
+
+
+def render():
+    """The full exposition text"""
+    samples = collect()
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines += histogram.render(samples)
+    stats = todo_stats()
+    if stats is not None:
+        lines += ['# HELP todo_todos Todos by state, from a periodically refreshed aggregate.',
+                  '# TYPE todo_todos gauge']
+        lines += [_sample('todo_todos', {'state': state}, stats[state]) for state in ('open', 'resolved', 'overdue')]
+        lines += ['# HELP todo_todos_refreshed_timestamp_seconds When the todo gauges were computed.',
+                  '# TYPE todo_todos_refreshed_timestamp_seconds gauge',
+                  _sample('todo_todos_refreshed_timestamp_seconds', {}, stats['refreshed_at'])]
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,243 @@
+# ========================================
+# FILE: todos/middleware.py
+# ========================================
+
+import cProfile
+import itertools
+import logging
+import re
+import time
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from . import metrics
+from .budgets import QueryBudget, QueryBudgetExceeded, record_queries, view_budget
+from .db import observe_queries
+
+logger = logging.getLogger(__name__)
+timing_logger = logging.getLogger('todos.timing')
+
+
+class QueryBudgetMiddleware:
+    """
+    Development aid: check every request against its view's
+    ``@query_budget`` and report statements run more than once.
+
+    ``TODO_QUERY_BUDGET_ACTION`` is ``'log'`` (a warning on the
+    ``todos.middleware`` logger) or ``'raise'``. Views without a declared
+    budget are still checked for duplicates. Queries run while a streaming
+    response is consumed happen after this middleware returns and are not
+    counted. Disabled unless ``DEBUG`` is on.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.DEBUG:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.action = getattr(settings, 'TODO_QUERY_BUDGET_ACTION', 'log')
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with record_queries() as recorder:
+            response = self.get_response(request)
+        self.check(request, recorder)
+        return response
+
+    async def __acall__(self, request):
+        with record_queries() as recorder:
+            response = await self.get_response(request)
+        self.check(request, recorder)
+        return response
+
+    def check(self, request, recorder):
+        budget = getattr(request, '_query_budget', None) or QueryBudget()
+        problems = budget.violations(recorder)
+        if problems:
+            message = f'{request.method} {request.path}: ' + '; '.join(problems)
+            if self.action == 'raise':
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._query_budget = view_budget(view_func)
+
+
+class DatabaseTimer:
+    """``execute_wrapper`` adding up the time and number of statements"""
+
+    def __init__(self):
+        self.duration = 0.0
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+
+
+class ServerTimingMiddleware:
+    """
+    Report where a request spent its time as a ``Server-Timing`` header
+    (``db``, ``template``, ``total``) and an INFO line on the
+    ``todos.timing`` logger.
+
+    Template time covers ``TemplateResponse`` rendering, which is how the
+    class-based views and the admin render; queries a template triggers
+    count towards both ``db`` and ``template``. For streaming responses
+    only the time until the first byte is measured.
+
+    With ``TODO_PROFILE_SAMPLE_RATE = N`` every Nth request also runs under
+    cProfile and its stats are dumped to ``TODO_PROFILE_DIR``. Under ASGI
+    the profile covers the event loop thread, so it also catches other
+    requests' coroutines that ran in the meantime.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'TODO_PROFILE_SAMPLE_RATE', 0)
+        self.profile_dir = Path(getattr(settings, 'TODO_PROFILE_DIR', 'profiles'))
+        self.requests = itertools.count(1)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        request._template_duration = 0.0
+        profiler = self.start_profiler()
+        db = DatabaseTimer()
+        started = time.perf_counter()
+        try:
+            with observe_queries(db):
+                response = self.get_response(request)
+        finally:
+            total = time.perf_counter() - started
+            if profiler is not None:
+                profiler.disable()
+        return self.finish(request, response, profiler, db, total)
+
+    async def __acall__(self, request):
+        request._template_duration = 0.0
+        profiler = self.start_profiler()
+        db = DatabaseTimer()
+        started = time.perf_counter()
+        try:
+            with observe_queries(db):
+                response = await self.get_response(request)
+        finally:
+            total = time.perf_counter() - started
+            if profiler is not None:
+                profiler.disable()
+        return self.finish(request, response, profiler, db, total)
+
+    def finish(self, request, response, profiler, db, total):
+        if profiler is not None:
+            self.dump_profile(profiler, request)
+
+        template = request._template_duration
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={db.duration * 1000:.2f};desc="{db.count} queries"',
+            f'template;dur={template * 1000:.2f}',
+            f'total;dur={total * 1000:.2f}',
+        ])
+        match = getattr(request, 'resolver_match', None)
+        fields = {
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 2),
+            'db_ms': round(db.duration * 1000, 2),
+            'queries': db.count,
+            'template_ms': round(template * 1000, 2),
+        }
+        request.timing = fields
+        timing_logger.info(
+            ' '.join(f'{key}={value}' for key, value in fields.items()),
+            extra={'timing': fields},
+        )
+        return response
+
+    def process_template_response(self, request, response):
+        started = time.perf_counter()
+
+        def rendered(response):
+            request._template_duration += time.perf_counter() - started
+
+        response.add_post_render_callback(rendered)
+        return response
+
+    def start_profiler(self):
+        if not self.sample_rate or next(self.requests) % self.sample_rate:
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another request on this thread is being profiled (ASGI).
+            return None
+        return profiler
+
+    def dump_profile(self, profiler, request):
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+        slug = re.sub(r'[^A-Za-z0-9]+', '-', request.path).strip('-') or 'root'
+        path = self.profile_dir / f'{time.time_ns()}-{request.method}-{slug}.prof'
+        profiler.dump_stats(path)
+        timing_logger.info('profile written to %s', path)
+
+
+class MetricsMiddleware:
+    """
+    Feed request latency and per-request query figures to ``/metrics``.
+
+    List it before ``ServerTimingMiddleware``: the query count and DB time
+    are taken from the ``request.timing`` that middleware leaves behind.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        response = self.get_response(request)
+        self.observe(request, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        self.observe(request, time.perf_counter() - started)
+        return response
+
+    def observe(self, request, duration):
+        match = getattr(request, 'resolver_match', None)
+        timing = getattr(request, 'timing', None)
+        metrics.observe_request(
+            match.view_name if match else 'unresolved',
+            request.method,
+            duration,
+            queries=timing['queries'] if timing else None,
+            db_duration=timing['db_ms'] / 1000 if timing else None,
+        )
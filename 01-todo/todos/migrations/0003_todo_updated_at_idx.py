@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-15 22:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todos', '0002_todo_list_ordering_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='todo',
+            index=models.Index(fields=['updated_at'], name='todo_updated_at_idx'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Full-text index over Todo.title and Todo.description (SQLite FTS5).
+
+from django.db import migrations
+
+# External-content FTS5 table: it stores only the index and reads the text
+# back from todos_todo, kept in sync by the triggers below.
+# https://www.sqlite.org/fts5.html#external_content_tables
+FORWARD_SQL = [
+    """
+    CREATE VIRTUAL TABLE todos_todo_fts USING fts5(
+        title, description, content='todos_todo', content_rowid='id'
+    )
+    """,
+    """
+    CREATE TRIGGER todos_todo_fts_ai AFTER INSERT ON todos_todo BEGIN
+        INSERT INTO todos_todo_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER todos_todo_fts_ad AFTER DELETE ON todos_todo BEGIN
+        INSERT INTO todos_todo_fts(todos_todo_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER todos_todo_fts_au AFTER UPDATE OF title, description ON todos_todo BEGIN
+        INSERT INTO todos_todo_fts(todos_todo_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO todos_todo_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    "INSERT INTO todos_todo_fts(todos_todo_fts) VALUES ('rebuild')",
+]
+
+REVERSE_SQL = [
+    "DROP TRIGGER IF EXISTS todos_todo_fts_au",
+    "DROP TRIGGER IF EXISTS todos_todo_fts_ad",
+    "DROP TRIGGER IF EXISTS todos_todo_fts_ai",
+    "DROP TABLE IF EXISTS todos_todo_fts",
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todos', '0003_todo_updated_at_idx'),
+    ]
+
+    operations = [
+        migrations.RunSQL(FORWARD_SQL, REVERSE_SQL),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-15 22:04
+
+from django.db import migrations, models
+
+# Record a tombstone for every deleted Todo, whichever code path deletes it.
+# The timestamp is padded to microseconds so it compares and round-trips
+# like the values Django writes for DateTimeField.
+TOMBSTONE_TRIGGER_SQL = """
+CREATE TRIGGER todos_todo_tombstone_ad AFTER DELETE ON todos_todo BEGIN
+    INSERT OR REPLACE INTO todos_todotombstone(todo_id, deleted_at)
+    VALUES (old.id, strftime('%Y-%m-%d %H:%M:%f', 'now') || '000');
+END
+"""
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todos', '0004_todo_fts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TodoTombstone',
+            fields=[
+                ('todo_id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('deleted_at', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['deleted_at', 'todo_id'], name='todo_tombstone_deleted_idx')],
+            },
+        ),
+        migrations.RunSQL(
+            TOMBSTONE_TRIGGER_SQL,
+            "DROP TRIGGER IF EXISTS todos_todo_tombstone_ad",
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-15 22:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todos', '0005_todo_tombstone'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='todo',
+            index=models.Index(condition=models.Q(('is_resolved', False)), fields=['due_date', '-created_at'], name='todo_open_due_idx'),
+        ),
+    ]
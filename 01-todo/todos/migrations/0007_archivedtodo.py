@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-15 22:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todos', '0006_todo_open_due_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedTodo',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=200)),
+                ('description', models.TextField(blank=True)),
+                ('due_date', models.DateField(blank=True, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField()),
+            ],
+            options={
+                'ordering': ['due_date', '-created_at'],
+                'indexes': [models.Index(fields=['due_date', '-created_at'], name='archived_todo_ordering_idx')],
+            },
+        ),
+    ]
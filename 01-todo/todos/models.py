@@ -2,9 +2,107 @@
 # FILE: todos/models.py
 # ========================================
 
-from django.db import models
+from django.core.exceptions import EmptyResultSet
+from django.db import connections, models, transaction
+from django.db.models import sql
+from django.db.models.expressions import RawSQL
 from django.utils import timezone
 
+
+def fts5_query(text):
+    """
+    Turn free user input into a safe FTS5 MATCH expression.
+
+    Every whitespace-separated term becomes a quoted prefix query, so
+    ``"buy mil"`` matches rows containing both "buy" and "milk" and FTS5
+    operators typed by the user are treated as plain text.
+    """
+    terms = [term.replace('"', '""') for term in text.split()]
+    return ' '.join(f'"{term}"*' for term in terms if term.strip('"'))
+
+
+class TodoQuerySet(models.QuerySet):
+    def with_overdue(self, today=None):
+        """Annotate ``overdue`` in SQL against a single ``today`` value"""
+        if today is None:
+            today = timezone.now().date()
+        return self.annotate(
+            overdue=models.Case(
+                models.When(is_resolved=False, due_date__lt=today, then=models.Value(True)),
+                default=models.Value(False),
+                output_field=models.BooleanField(),
+            )
+        )
+
+    def open(self):
+        """Unresolved todos; the filter lets SQLite use ``todo_open_due_idx``"""
+        return self.filter(is_resolved=False)
+
+    def overdue(self, today=None):
+        """Open todos due before ``today``, a range scan on ``todo_open_due_idx``"""
+        if today is None:
+            today = timezone.now().date()
+        # Ordered like the index; the default ordering leads with
+        # is_resolved, which would make SQLite prefer the full index.
+        return self.open().filter(due_date__lt=today).order_by('due_date', '-created_at', 'id')
+
+    def search(self, query):
+        """Filter to todos whose title or description match ``query``"""
+        match = fts5_query(query)
+        if not match:
+            return self.none()
+        return self.filter(id__in=RawSQL(
+            'SELECT rowid FROM todos_todo_fts WHERE todos_todo_fts MATCH %s', [match],
+        ))
+
+    def ranked_search(self, query):
+        """
+        Like ``search`` but annotated with ``search_rank`` and best match first.
+
+        The ranked hits are materialized once per query and looked up by
+        rowid: ``rank`` read straight from the FTS table in a correlated
+        subquery re-runs the whole MATCH for every hit, which is quadratic
+        for common terms.
+        """
+        match = fts5_query(query)
+        return self.search(query).annotate(search_rank=RawSQL(
+            'WITH hits AS MATERIALIZED ('
+            'SELECT rowid, rank FROM todos_todo_fts WHERE todos_todo_fts MATCH %s'
+            ') SELECT rank FROM hits WHERE hits.rowid = todos_todo.id', [match],
+        )).order_by('search_rank', 'id')
+
+    def update_returning_pks(self, **values):
+        """
+        ``update(**values)``, returning the ids of the rows it changed.
+
+        Still one statement (``UPDATE ... RETURNING``); reading the ids
+        first would add a SELECT to every bulk write.
+        """
+        query = self.query.chain(sql.UpdateQuery)
+        query.add_update_values(values)
+        return self._returning_pks(query)
+
+    def delete_returning_pks(self):
+        """
+        ``delete()`` as one ``DELETE ... RETURNING``, returning the deleted ids.
+
+        Skips the deletion collector, which the ``delete()`` fast path does
+        too while Todo has no cascades and no delete signal receivers.
+        """
+        return self._returning_pks(self.query.chain(sql.DeleteQuery))
+
+    def _returning_pks(self, query):
+        connection = connections[self.db]
+        try:
+            statement, params = query.get_compiler(self.db).as_sql()
+        except EmptyResultSet:
+            return []
+        pk = connection.ops.quote_name(self.model._meta.pk.column)
+        with transaction.mark_for_rollback_on_error(using=self.db), connection.cursor() as cursor:
+            cursor.execute(f'{statement} RETURNING {pk}', params)
+            return [row[0] for row in cursor.fetchall()]
+
+
 class Todo(models.Model):
     title = models.CharField(max_length=200)
     description = models.TextField(blank=True)
@@ -13,8 +111,28 @@ class Todo(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = TodoQuerySet.as_manager()
+
     class Meta:
         ordering = ['is_resolved', 'due_date', '-created_at']
+        indexes = [
+            # Mirrors ``ordering`` column-for-column so the default list
+            # query walks the index instead of sorting the whole table.
+            models.Index(
+                fields=['is_resolved', 'due_date', '-created_at'],
+                name='todo_list_ordering_idx',
+            ),
+            # Backs MAX(updated_at) for conditional GETs.
+            models.Index(fields=['updated_at'], name='todo_updated_at_idx'),
+            # Open todos only, in list order: the working set stays small
+            # however many resolved rows pile up. A query must filter on
+            # ``is_resolved=False`` (see ``TodoQuerySet.open``) to use it.
+            models.Index(
+                fields=['due_date', '-created_at'],
+                condition=models.Q(is_resolved=False),
+                name='todo_open_due_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.title
@@ -23,3 +141,53 @@ class Todo(models.Model):
         if self.due_date and not self.is_resolved:
             return self.due_date < timezone.now().date()
         return False
+
+
+class ArchivedTodo(models.Model):
+    """
+    A resolved Todo moved out of the hot table by ``manage.py archive_todos``.
+
+    Rows keep their Todo id and timestamps. Every row is resolved, so
+    there is no ``is_resolved`` column and the ordering index is Todo's
+    without it; ``ArchiveKeysetPaginator`` pages through it in one segment.
+    """
+    # Always copied from the Todo. An auto field makes it SQLite's rowid,
+    # which every index ends with, so ``id`` tie-breaks need no sort.
+    id = models.BigAutoField(primary_key=True)
+    title = models.CharField(max_length=200)
+    description = models.TextField(blank=True)
+    due_date = models.DateField(null=True, blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['due_date', '-created_at']
+        indexes = [
+            models.Index(
+                fields=['due_date', '-created_at'],
+                name='archived_todo_ordering_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return self.title
+
+
+class TodoTombstone(models.Model):
+    """
+    Marker left behind when a Todo is deleted, so sync clients can drop it.
+
+    Rows are written by a database trigger (migration 0005), which covers
+    every delete path including bulk and queryset deletes.
+    """
+    todo_id = models.BigIntegerField(primary_key=True)
+    deleted_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['deleted_at', 'todo_id'], name='todo_tombstone_deleted_idx'),
+        ]
+
+    def __str__(self):
+        return f'Todo {self.todo_id} deleted at {self.deleted_at}'
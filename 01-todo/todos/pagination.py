@@ -0,0 +1,237 @@
+# ========================================
+# FILE: todos/pagination.py
+# ========================================
+
+import base64
+import json
+from datetime import date, datetime
+
+from django.db.models import Q
+
+# The full ordering tuple. ``id`` is the tie-breaker that makes every key
+# unique; it is the rowid, so the ordering index already ends with it.
+FORWARD_ORDERING = ['is_resolved', 'due_date', '-created_at', 'id']
+BACKWARD_ORDERING = ['-is_resolved', '-due_date', 'created_at', '-id']
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _value(obj, name):
+    if isinstance(obj, dict):
+        return obj[name]
+    return getattr(obj, name)
+
+
+def encode_cursor(direction, obj):
+    """Build an opaque cursor pointing just past ``obj`` in ``direction``"""
+    due_date = _value(obj, 'due_date')
+    payload = [
+        direction,
+        int(_value(obj, 'is_resolved')),
+        due_date.isoformat() if due_date else None,
+        _value(obj, 'created_at').isoformat(),
+        _value(obj, 'id'),
+    ]
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Return ``(direction, (is_resolved, due_date, created_at, id))``"""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        direction, is_resolved, due_date, created_at, pk = json.loads(raw)
+        if direction not in (NEXT, PREVIOUS):
+            raise ValueError(direction)
+        key = (
+            bool(is_resolved),
+            date.fromisoformat(due_date) if due_date else None,
+            datetime.fromisoformat(created_at),
+            int(pk),
+        )
+    except (TypeError, ValueError) as exc:
+        raise InvalidCursor(token) from exc
+    return direction, key
+
+
+def _resolved(value):
+    if value:
+        # Django renders ``is_resolved=True`` as a bare column test, which
+        # SQLite will not use as an index equality; ``is_resolved IN (1)``
+        # it will.
+        return Q(is_resolved__in=[True])
+    # ``NOT is_resolved`` is the condition of the partial index over open
+    # todos, and SQLite only considers that index when the query repeats it.
+    return Q(is_resolved=False)
+
+
+def _first_page_queryset(queryset, per_page):
+    """
+    The first page plus one row, in a single query.
+
+    Open todos sort first, so walking the full ordering index reads them
+    and then, only if they do not fill the page, the first resolved ones.
+    Splitting it into an open and a resolved segment would let the open
+    part use the smaller partial index, but cost a second query on every
+    list whose open todos fit on one page.
+    """
+    return queryset.order_by(*FORWARD_ORDERING)[:per_page + 1]
+
+
+def _segment_queryset(queryset, segment, direction):
+    """
+    ``queryset`` narrowed to one segment, in page order.
+
+    Every segment pins ``is_resolved``, so it is left out of ORDER BY:
+    sorting on it would steer SQLite to the full ordering index even for
+    open todos, where the much smaller partial index serves the rest of
+    the ordering.
+    """
+    ordering = FORWARD_ORDERING if direction == NEXT else BACKWARD_ORDERING
+    return queryset.filter(segment).order_by(*ordering[1:])
+
+
+def _date_segments(key, direction):
+    """The rows after ``key`` that share its ``is_resolved``, as index ranges"""
+    _, due_date, created_at, pk = key
+    same_day = Q(due_date__isnull=True) if due_date is None else Q(due_date=due_date)
+    if direction == NEXT:
+        return [
+            same_day & Q(created_at__lte=created_at)
+            & (Q(created_at__lt=created_at) | Q(id__gt=pk)),
+            Q(due_date__isnull=False) if due_date is None else Q(due_date__gt=due_date),
+        ]
+    segments = [
+        same_day & Q(created_at__gte=created_at)
+        & (Q(created_at__gt=created_at) | Q(id__lt=pk)),
+    ]
+    if due_date is not None:
+        # NULL sorts before every date in SQLite, so it comes last when
+        # walking backwards.
+        segments += [Q(due_date__lt=due_date), Q(due_date__isnull=True)]
+    return segments
+
+
+def _seek_segments(key, direction):
+    """
+    Split "rows after ``key``" into index range scans.
+
+    A single OR-ed keyset predicate cannot be turned into one index seek
+    because the ordering mixes ASC and DESC columns (and ``due_date`` is
+    nullable), so SQLite would scan from the start of the index. Each
+    segment below is a plain range on an index prefix instead; they are
+    returned in ordering order and queried until the page is full.
+    """
+    is_resolved = key[0]
+    segments = [_resolved(is_resolved) & segment for segment in _date_segments(key, direction)]
+    if direction == NEXT and not is_resolved:
+        segments.append(_resolved(True))
+    elif direction == PREVIOUS and is_resolved:
+        segments.append(_resolved(False))
+    return segments
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    Cursor paginator over the Todo ordering tuple
+    ``(is_resolved, due_date, -created_at, id)``.
+
+    Every page is read with bounded index seeks, so page N costs the same
+    as page 1 no matter how deep the cursor is.
+    """
+
+    def __init__(self, queryset, per_page):
+        self.queryset = queryset
+        self.per_page = per_page
+
+    def page(self, cursor=None):
+        if not cursor:
+            rows = list(self.first_page_queryset())
+            return self._build(rows, NEXT, has_cursor=False)
+        direction, key = decode_cursor(cursor)
+        rows = []
+        for segment in self.seek_segments(key, direction):
+            wanted = self.per_page + 1 - len(rows)
+            rows += _segment_queryset(self.queryset, segment, direction)[:wanted]
+            if len(rows) > self.per_page:
+                break
+        return self._build(rows, direction, has_cursor=True)
+
+    async def apage(self, cursor=None):
+        """``page`` for async views"""
+        if not cursor:
+            rows = [row async for row in self.first_page_queryset()]
+            return self._build(rows, NEXT, has_cursor=False)
+        direction, key = decode_cursor(cursor)
+        rows = []
+        for segment in self.seek_segments(key, direction):
+            wanted = self.per_page + 1 - len(rows)
+            rows += [row async for row in _segment_queryset(self.queryset, segment, direction)[:wanted]]
+            if len(rows) > self.per_page:
+                break
+        return self._build(rows, direction, has_cursor=True)
+
+    def first_page_queryset(self):
+        return _first_page_queryset(self.queryset, self.per_page)
+
+    def seek_segments(self, key, direction):
+        return _seek_segments(key, direction)
+
+    def _build(self, rows, direction, has_cursor):
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction == PREVIOUS:
+            rows.reverse()
+            has_next, has_previous = has_cursor, has_more
+        else:
+            has_next, has_previous = has_more, has_cursor
+        if not rows:
+            return KeysetPage(rows)
+        return KeysetPage(
+            rows,
+            next_cursor=encode_cursor(NEXT, rows[-1]) if has_next else None,
+            previous_cursor=encode_cursor(PREVIOUS, rows[0]) if has_previous else None,
+        )
+
+
+class ArchiveKeysetPaginator(KeysetPaginator):
+    """
+    ``KeysetPaginator`` over ``ArchivedTodo``.
+
+    Every archived todo is resolved, so the archive is a single segment
+    ordered by ``(due_date, -created_at, id)``, its ordering index; rows
+    need an ``is_resolved`` attribute (annotation) for the cursors only.
+    """
+
+    def first_page_queryset(self):
+        return self.queryset.order_by(*FORWARD_ORDERING[1:])[:self.per_page + 1]
+
+    def seek_segments(self, key, direction):
+        return _date_segments(key, direction)
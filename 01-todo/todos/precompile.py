@@ -0,0 +1,74 @@
+# ========================================
+# FILE: todos/precompile.py
+# ========================================
+"""
+Compile the app's templates before the first request needs them.
+
+The cached template loader keeps each compiled template for the life of
+the process, but only fills up as pages are rendered, so every new worker
+parses base.html, todo_list.html and the row partials on its first
+requests. ``compile_templates`` loads them all up front:
+``manage.py precompile_templates`` runs it at deploy time so a broken
+template fails the deploy, and with ``TODO_PRELOAD_TEMPLATES`` each
+worker runs it on startup through ``preload_templates``, called from the
+WSGI and ASGI entry points so management commands skip it. Compiled
+templates are Python objects, so there is no bundle to ship; each
+process compiles its own.
+"""
+
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.template import TemplateDoesNotExist, TemplateSyntaxError, engines
+from django.template.loader_tags import ExtendsNode, IncludeNode
+
+
+def template_names(app_label='todos'):
+    """Names of the templates in ``app_label``'s templates directory"""
+    root = Path(apps.get_app_config(app_label).path) / 'templates'
+    return sorted(path.relative_to(root).as_posix() for path in root.rglob('*.html'))
+
+
+def referenced_names(template):
+    """Templates that ``template`` extends or includes by a constant name"""
+    names = []
+    for node in template.nodelist.get_nodes_by_type((ExtendsNode, IncludeNode)):
+        expression = node.parent_name if isinstance(node, ExtendsNode) else node.template
+        if isinstance(expression.var, str) and not expression.filters:
+            names.append(str(expression.var))
+    return names
+
+
+def compile_templates(names=None, engine=None):
+    """
+    Load ``names`` (default: all of the app's templates) through
+    ``engine``'s loaders, the project's Django engine unless given.
+
+    Returns ``(name, error)`` for each template that fails to compile or
+    extends or includes one that does not exist.
+    """
+    engine = engine or engines['django']
+    names = template_names() if names is None else names
+    problems = []
+    for name in names:
+        try:
+            template = engine.get_template(name).template
+        except (TemplateDoesNotExist, TemplateSyntaxError) as exc:
+            problems.append((name, exc))
+            continue
+        for reference in referenced_names(template):
+            if reference in names:
+                continue
+            try:
+                engine.get_template(reference)
+            except (TemplateDoesNotExist, TemplateSyntaxError) as exc:
+                problems.append((name, f'{reference}: {exc}'))
+    return problems
+
+
+def preload_templates():
+    """``compile_templates`` if ``TODO_PRELOAD_TEMPLATES`` is on"""
+    if getattr(settings, 'TODO_PRELOAD_TEMPLATES', False):
+        # Problems are left for precompile_templates to report.
+        compile_templates()
@@ -0,0 +1,12 @@
+# ========================================
+# FILE: todos/signals.py
+# ========================================
+
+from django.dispatch import Signal
+
+# Sent with ``action`` ('created', 'updated', 'toggled' or 'deleted') and
+# ``pks`` after writes that bypass ``post_save``: queryset ``update()``,
+# ``bulk_create``/``bulk_update`` and deletes. Todo deliberately has no
+# ``post_delete`` receivers, which would turn every queryset delete from
+# one DELETE into a SELECT plus a signal per row.
+todos_changed = Signal()
@@ -0,0 +1,116 @@
+# ========================================
+# FILE: todos/sync.py
+# ========================================
+"""
+Delta sync: "what changed since this cursor".
+
+A cursor holds two keyset positions, one over ``(Todo.updated_at, id)``
+and one over ``(TodoTombstone.deleted_at, todo_id)``. Both are backed by
+an index, so a sync costs time proportional to the number of changes.
+"""
+
+import base64
+import json
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Todo, TodoTombstone
+
+
+class InvalidSyncCursor(ValueError):
+    pass
+
+
+def encode_sync_cursor(changed, deleted):
+    payload = [
+        [changed[0].isoformat(), changed[1]] if changed else None,
+        [deleted[0].isoformat(), deleted[1]] if deleted else None,
+    ]
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_sync_cursor(token):
+    """Return ``(changed_position, deleted_position)``; either may be None"""
+    if not token:
+        return None, None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        positions = json.loads(raw)
+        if not isinstance(positions, list) or len(positions) != 2:
+            raise ValueError('Expected two positions.')
+        return tuple(_decode_position(position) for position in positions)
+    except (TypeError, ValueError) as exc:
+        raise InvalidSyncCursor(token) from exc
+
+
+def _decode_position(position):
+    if position is None:
+        return None
+    if not (
+        isinstance(position, list) and len(position) == 2
+        and isinstance(position[0], str)
+        and isinstance(position[1], int) and not isinstance(position[1], bool)
+    ):
+        raise ValueError('Expected a [timestamp, id] position.')
+    return datetime.fromisoformat(position[0]), position[1]
+
+
+def _after(queryset, field, pk_field, position):
+    if position is None:
+        return queryset
+    moment, pk = position
+    return queryset.filter(
+        Q(**{f'{field}__gte': moment})
+        & (Q(**{f'{field}__gt': moment}) | Q(**{f'{pk_field}__gt': pk}))
+    )
+
+
+def _settled(position, settle_before):
+    # Writes that started before ``settle_before`` may still be committing
+    # with an older timestamp, so the cursor never moves past that point;
+    # those few rows are sent again and clients apply them idempotently.
+    if position is None or position[0] <= settle_before:
+        return position
+    return (settle_before, 0)
+
+
+def changes_since(cursor, fields, limit):
+    """
+    Return ``(changed_rows, deleted_ids, next_cursor, has_more)``.
+
+    ``changed_rows`` are ``.values(*fields)`` dicts ordered by
+    ``(updated_at, id)``; at most ``limit`` of each kind come back per call.
+    """
+    changed_position, deleted_position = decode_sync_cursor(cursor)
+    select = list(dict.fromkeys(list(fields) + ['updated_at', 'id']))
+
+    changed = list(
+        _after(Todo.objects.values(*select), 'updated_at', 'id', changed_position)
+        .order_by('updated_at', 'id')[:limit + 1]
+    )
+    deleted = list(
+        _after(TodoTombstone.objects.values('todo_id', 'deleted_at'), 'deleted_at', 'todo_id', deleted_position)
+        .order_by('deleted_at', 'todo_id')[:limit + 1]
+    )
+    has_more = len(changed) > limit or len(deleted) > limit
+    changed, deleted = changed[:limit], deleted[:limit]
+
+    if changed:
+        changed_position = (changed[-1]['updated_at'], changed[-1]['id'])
+    if deleted:
+        deleted_position = (deleted[-1]['deleted_at'], deleted[-1]['todo_id'])
+    if not has_more:
+        settle_before = timezone.now() - timedelta(seconds=getattr(settings, 'TODO_SYNC_SETTLE_SECONDS', 2))
+        changed_position = _settled(changed_position, settle_before)
+        deleted_position = _settled(deleted_position, settle_before)
+
+    return (
+        [{name: row[name] for name in fields} for row in changed],
+        [row['todo_id'] for row in deleted],
+        encode_sync_cursor(changed_position, deleted_position),
+        has_more,
+    )
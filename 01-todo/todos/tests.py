@@ -1,9 +1,48 @@
-from django.test import TestCase, Client
-from django.urls import reverse
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.test import TestCase, TransactionTestCase, Client, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
 from django.utils import timezone
 from datetime import timedelta
-from .models import Todo
-from .forms import TodoForm
+import asyncio
+import base64
+import csv
+import io
+import json
+import os
+import re
+import tempfile
+import tracemalloc
+import unittest
+from unittest import mock
+import threading
+from . import events
+from .models import ArchivedTodo, Todo, TodoTombstone, fts5_query
+from .archive import archive_batch, archive_todos
+from .budgets import QueryBudgetExceeded, assert_query_budget, query_budget, view_budget
+from .db import configure_sqlite_connection, deferred_search_index
+from .forms import TodoForm, TodoBulkForm, TodoRowValidator
+from .pagination import (
+    BACKWARD_ORDERING, FORWARD_ORDERING, NEXT, PREVIOUS, ArchiveKeysetPaginator, KeysetPaginator,
+    _first_page_queryset, _seek_segments, _segment_queryset,
+)
+from .middleware import MetricsMiddleware, QueryBudgetMiddleware, ServerTimingMiddleware
+from .signals import todos_changed
+from .views import TodoListView
+
+
+def setUpModule():
+    """Keep metric files written by the suite out of TODO_METRICS_DIR"""
+    directory = tempfile.TemporaryDirectory()
+    override = override_settings(TODO_METRICS_DIR=directory.name)
+    override.enable()
+    unittest.addModuleCleanup(directory.cleanup)
+    unittest.addModuleCleanup(override.disable)
 
 
 # ========================================
@@ -76,6 +115,31 @@ class TodoModelTest(TestCase):
         )
         self.assertFalse(todo.is_overdue())
 
+    def test_with_overdue_matches_is_overdue(self):
+        """Test that the SQL overdue annotation agrees with is_overdue()"""
+        today = timezone.now().date()
+        for due_date in (today - timedelta(days=1), today, today + timedelta(days=1), None):
+            for is_resolved in (False, True):
+                Todo.objects.create(title="Overdue check", due_date=due_date, is_resolved=is_resolved)
+        for todo in Todo.objects.with_overdue():
+            self.assertEqual(todo.overdue, todo.is_overdue(), (todo.due_date, todo.is_resolved))
+
+    def test_overdue_queryset_matches_is_overdue(self):
+        """Test that overdue() returns exactly the todos is_overdue() flags"""
+        today = timezone.now().date()
+        for due_date in (today - timedelta(days=1), today, None):
+            for is_resolved in (False, True):
+                Todo.objects.create(title="Overdue check", due_date=due_date, is_resolved=is_resolved)
+        expected = {todo.pk for todo in Todo.objects.all() if todo.is_overdue()}
+        self.assertEqual(set(Todo.objects.overdue().values_list('pk', flat=True)), expected)
+        self.assertEqual(Todo.objects.open().count(), Todo.objects.filter(is_resolved=False).count())
+
+    def test_with_overdue_uses_given_today(self):
+        """Test that with_overdue compares against the supplied date"""
+        today = timezone.now().date()
+        todo = Todo.objects.with_overdue(today=today + timedelta(days=2)).get(pk=self.todo.pk)
+        self.assertTrue(todo.overdue)
+
     def test_todo_ordering(self):
         """Test that todos are ordered correctly"""
         # Clear existing todos
@@ -96,6 +160,55 @@ class TodoModelTest(TestCase):
         self.assertIsNotNone(todo.updated_at)
 
 
+class TodoSearchTest(TestCase):
+    """Test cases for FTS5-backed search"""
+
+    def setUp(self):
+        """Create test fixtures"""
+        self.milk = Todo.objects.create(title="Buy milk", description="Semi-skimmed")
+        self.bread = Todo.objects.create(title="Bake bread", description="Remember to buy flour")
+        self.other = Todo.objects.create(title="Call plumber")
+
+    def search(self, query):
+        return set(Todo.objects.search(query).values_list('pk', flat=True))
+
+    def test_search_title_and_description(self):
+        """Test that search matches both title and description"""
+        self.assertEqual(self.search("buy"), {self.milk.pk, self.bread.pk})
+        self.assertEqual(self.search("skimmed"), {self.milk.pk})
+
+    def test_search_prefix_and_all_terms(self):
+        """Test that terms are prefix-matched and all must match"""
+        self.assertEqual(self.search("bre"), {self.bread.pk})
+        self.assertEqual(self.search("buy mil"), {self.milk.pk})
+
+    def test_search_follows_updates_and_deletes(self):
+        """Test that the triggers keep the index in sync"""
+        self.other.title = "Call electrician"
+        self.other.save()
+        self.assertEqual(self.search("plumber"), set())
+        self.assertEqual(self.search("electrician"), {self.other.pk})
+        self.milk.delete()
+        self.assertEqual(self.search("milk"), set())
+
+    def test_search_escapes_fts_syntax(self):
+        """Test that FTS5 operators and quotes in user input are harmless"""
+        self.assertEqual(fts5_query('say "hi" OR'), '"say"* """hi"""* "OR"*')
+        for query in ['"', 'milk"', 'NEAR(', 'title:buy', '*', '-']:
+            self.search(query)
+
+    def test_blank_search_matches_nothing(self):
+        """Test that a blank query returns an empty queryset"""
+        self.assertEqual(self.search("   "), set())
+
+    def test_ranked_search_orders_by_relevance(self):
+        """Test that the best match comes first"""
+        Todo.objects.create(title="Milk milk milk", description="milk")
+        ranked = list(Todo.objects.ranked_search("milk"))
+        self.assertEqual(ranked[0].title, "Milk milk milk")
+        self.assertTrue(all(hasattr(todo, 'search_rank') for todo in ranked))
+
+
 # ========================================
 # FORM TESTS
 # ========================================
@@ -201,12 +314,31 @@ class TodoListViewTest(TestCase):
         self.assertIn(self.todo1, response.context['todos'])
         self.assertIn(self.todo2, response.context['todos'])
 
+    def test_list_view_marks_overdue_without_per_row_calls(self):
+        """Test that the list renders overdue rows from the SQL annotation"""
+        Todo.objects.create(title="Late", due_date=timezone.now().date() - timedelta(days=3))
+        response = self.client.get(self.url)
+        self.assertTrue(all(hasattr(todo, 'overdue') for todo in response.context['todos']))
+        self.assertContains(response, '(OVERDUE)', count=1)
+
     def test_list_view_empty(self):
         """Test that list view works when no todos exist"""
         Todo.objects.all().delete()
         response = self.client.get(self.url)
         self.assertEqual(len(response.context['todos']), 0)
 
+    def test_list_view_search(self):
+        """Test that ?q= limits the list to matching todos"""
+        Todo.objects.create(title="Water plants")
+        response = self.client.get(self.url, {'q': 'water'})
+        self.assertEqual([t.title for t in response.context['todos']], ["Water plants"])
+        self.assertContains(response, 'value="water"')
+
+    def test_list_view_search_no_results(self):
+        """Test the empty state of a search"""
+        response = self.client.get(self.url, {'q': 'nothing-matches'})
+        self.assertContains(response, 'No TODOs match')
+
 
 class TodoCreateViewTest(TestCase):
     """Test cases for the TodoCreateView"""
@@ -375,7 +507,7 @@ class TodoToggleViewTest(TestCase):
     def test_toggle_resolve_unresolved_to_resolved(self):
         """Test toggling unresolved todo to resolved"""
         self.assertFalse(self.todo.is_resolved)
-        response = self.client.get(self.url)
+        response = self.client.post(self.url)
         self.todo.refresh_from_db()
         self.assertTrue(self.todo.is_resolved)
 
@@ -383,17 +515,2044 @@ class TodoToggleViewTest(TestCase):
         """Test toggling resolved todo to unresolved"""
         self.todo.is_resolved = True
         self.todo.save()
-        response = self.client.get(self.url)
+        response = self.client.post(self.url)
         self.todo.refresh_from_db()
         self.assertFalse(self.todo.is_resolved)
 
     def test_toggle_resolve_redirect(self):
         """Test that toggle redirects to todo list"""
-        response = self.client.get(self.url)
+        response = self.client.post(self.url)
         self.assertRedirects(response, reverse('todo_list'))
 
     def test_toggle_nonexistent_todo(self):
         """Test that toggling nonexistent todo returns 404"""
         url = reverse('todo_toggle', args=[9999])
-        response = self.client.get(url)
+        response = self.client.post(url)
         self.assertEqual(response.status_code, 404)
+
+    def test_toggle_is_single_query(self):
+        """Test that a toggle is one UPDATE and nothing else"""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(self.url)
+        self.assertEqual(len(queries), 1)
+        self.assertTrue(queries[0]['sql'].startswith('UPDATE'))
+
+    def test_toggle_bumps_updated_at(self):
+        """Test that toggling refreshes updated_at"""
+        before = self.todo.updated_at
+        self.client.post(self.url)
+        self.todo.refresh_from_db()
+        self.assertGreater(self.todo.updated_at, before)
+
+    def test_toggle_rejects_get(self):
+        """Test that a GET, e.g. from a link prefetcher, changes nothing"""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 405)
+        self.todo.refresh_from_db()
+        self.assertFalse(self.todo.is_resolved)
+
+    def test_toggle_requires_csrf_token(self):
+        """Test that toggle is CSRF protected and the list provides the token"""
+        client = Client(enforce_csrf_checks=True)
+        self.assertEqual(client.post(self.url).status_code, 403)
+        response = client.get(reverse('todo_list'))
+        token = re.search(r'name="csrfmiddlewaretoken" value="([^"]+)"', response.content.decode()).group(1)
+        self.assertRedirects(client.post(self.url, {'csrfmiddlewaretoken': token}), reverse('todo_list'))
+
+    def test_toggle_no_content(self):
+        """Test that Prefer: return=minimal gets a 204 with the new state"""
+        response = self.client.post(self.url, headers={'Prefer': 'return=minimal'})
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(response['X-Todo-Resolved'], 'true')
+        response = self.client.post(self.url, headers={'Prefer': 'return=minimal'})
+        self.assertEqual(response['X-Todo-Resolved'], 'false')
+
+    def test_rows_post_through_the_bulk_form(self):
+        """Test that rows hold a formaction button and no token of their own"""
+        response = self.client.get(reverse('todo_list'))
+        self.assertContains(response, f'form="bulk-form" formaction="{self.url}"')
+        self.assertContains(response, 'name="csrfmiddlewaretoken"', count=1)
+        Todo.objects.all().delete()
+        response = self.client.get(reverse('todo_list'))
+        self.assertContains(response, 'id="bulk-form"')
+
+
+class TodoToggleConcurrencyTest(TransactionTestCase):
+    """Test that concurrent toggles never lose an update"""
+
+    def test_concurrent_toggles_keep_parity(self):
+        """Test that N concurrent toggles leave the flag at N mod 2"""
+        todo = Todo.objects.create(title="Contended", is_resolved=False)
+        url = reverse('todo_toggle', args=[todo.pk])
+        toggles = 20
+        barrier = threading.Barrier(toggles)
+        statuses = []
+
+        def toggle():
+            try:
+                barrier.wait()
+                statuses.append(Client().post(url).status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=toggle) for _ in range(toggles)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(statuses, [302] * toggles)
+        todo.refresh_from_db()
+        self.assertEqual(todo.is_resolved, toggles % 2 == 1)
+
+
+class TodoBulkActionViewTest(TestCase):
+    """Test cases for the bulk_action view"""
+
+    def setUp(self):
+        """Create test fixtures"""
+        self.client = Client()
+        self.url = reverse('todo_bulk')
+        self.todos = [Todo.objects.create(title=f"Todo {i}") for i in range(5)]
+        self.pks = [todo.pk for todo in self.todos]
+
+    def post(self, data, json=False):
+        headers = {'Accept': 'application/json'} if json else {}
+        return self.client.post(self.url, data, headers=headers)
+
+    def test_bulk_resolve(self):
+        """Test that resolve marks every selected todo resolved"""
+        response = self.post({'pks': self.pks[:3], 'action': 'resolve'}, json=True)
+        self.assertEqual(response.json(), {'action': 'resolve', 'count': 3})
+        self.assertEqual(Todo.objects.filter(is_resolved=True).count(), 3)
+
+    def test_bulk_resolve_counts_only_changed_rows(self):
+        """Test that already resolved todos are not counted again"""
+        Todo.objects.filter(pk=self.pks[0]).update(is_resolved=True)
+        response = self.post({'pks': self.pks, 'action': 'resolve'}, json=True)
+        self.assertEqual(response.json()['count'], 4)
+
+    def test_bulk_unresolve(self):
+        """Test that unresolve reopens resolved todos"""
+        Todo.objects.update(is_resolved=True)
+        response = self.post({'pks': self.pks[:2], 'action': 'unresolve'}, json=True)
+        self.assertEqual(response.json()['count'], 2)
+        self.assertEqual(Todo.objects.filter(is_resolved=False).count(), 2)
+
+    def test_bulk_set_due_date(self):
+        """Test that set_due_date updates the due date of selected todos"""
+        response = self.post({'pks': self.pks[:2], 'action': 'set_due_date', 'due_date': '2030-01-01'}, json=True)
+        self.assertEqual(response.json()['count'], 2)
+        self.assertEqual(Todo.objects.filter(due_date='2030-01-01').count(), 2)
+
+    def test_bulk_set_same_due_date_changes_nothing(self):
+        """Test that setting the date todos already have counts 0 and leaves updated_at alone"""
+        self.post({'pks': self.pks[:2], 'action': 'set_due_date', 'due_date': '2030-01-01'}, json=True)
+        updated_at = list(Todo.objects.order_by('pk').values_list('updated_at', flat=True))
+        response = self.post({'pks': self.pks[:2], 'action': 'set_due_date', 'due_date': '2030-01-01'}, json=True)
+        self.assertEqual(response.json()['count'], 0)
+        self.assertEqual(list(Todo.objects.order_by('pk').values_list('updated_at', flat=True)), updated_at)
+
+    def test_bulk_set_due_date_requires_date(self):
+        """Test that set_due_date without a date is rejected"""
+        response = self.post({'pks': self.pks, 'action': 'set_due_date'}, json=True)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('due_date', response.json()['errors'])
+
+    def test_bulk_delete(self):
+        """Test that delete removes selected todos"""
+        response = self.post({'pks': self.pks[:4], 'action': 'delete'}, json=True)
+        self.assertEqual(response.json(), {'action': 'delete', 'count': 4})
+        self.assertEqual(Todo.objects.count(), 1)
+
+    def test_bulk_action_is_set_based(self):
+        """Test that a bulk action runs one statement regardless of selection size"""
+        with CaptureQueriesContext(connection) as queries:
+            self.post({'pks': self.pks, 'action': 'resolve'}, json=True)
+        statements = [q['sql'] for q in queries if q['sql'].startswith(('UPDATE', 'DELETE', 'SELECT'))]
+        self.assertEqual(len(statements), 1)
+
+    def test_bulk_redirects_with_message(self):
+        """Test that the HTML flow redirects back to the list with a message"""
+        response = self.post({'pks': self.pks, 'action': 'resolve'})
+        self.assertRedirects(response, reverse('todo_list'), fetch_redirect_response=False)
+        response = self.client.get(reverse('todo_list'))
+        self.assertContains(response, 'Mark resolved: 5 TODO(s).')
+
+    def test_bulk_requires_selection(self):
+        """Test that an empty selection is rejected"""
+        response = self.post({'action': 'resolve'}, json=True)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('pks', response.json()['errors'])
+
+    def test_bulk_rejects_get(self):
+        """Test that bulk actions only accept POST"""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 405)
+
+    def test_list_view_renders_bulk_checkboxes(self):
+        """Test that every todo row has a checkbox bound to the bulk form"""
+        response = self.client.get(reverse('todo_list'))
+        self.assertContains(response, 'name="pks" value=', count=5)
+
+
+class TodoRowCacheTest(TestCase):
+    """Test cases for per-row fragment caching in the list template"""
+
+    def setUp(self):
+        """Create test fixtures"""
+        caches['template_fragments'].clear()
+        self.url = reverse('todo_list')
+        self.todo = Todo.objects.create(title="Cached", due_date=timezone.now().date())
+
+    def test_unchanged_row_is_served_from_cache(self):
+        """Test that a row is not re-rendered while updated_at is unchanged"""
+        self.client.get(self.url)
+        Todo.objects.filter(pk=self.todo.pk).update(title="Changed behind the cache")
+        response = self.client.get(self.url)
+        self.assertContains(response, "Cached")
+
+    def test_save_invalidates_row(self):
+        """Test that saving a todo bumps updated_at and re-renders its row"""
+        self.client.get(self.url)
+        self.todo.title = "Renamed"
+        self.todo.save()
+        response = self.client.get(self.url)
+        self.assertContains(response, "Renamed")
+
+    def test_toggle_invalidates_row(self):
+        """Test that toggling re-renders the row with the new status"""
+        self.client.get(self.url)
+        self.client.post(reverse('todo_toggle', args=[self.todo.pk]))
+        response = self.client.get(self.url)
+        self.assertContains(response, "Mark Pending")
+
+    def test_overdue_marker_rolls_over_at_midnight(self):
+        """Test that the cache key includes today's date"""
+        response = self.client.get(self.url)
+        self.assertNotContains(response, "(OVERDUE)")
+        tomorrow = timezone.now() + timedelta(days=1)
+        with mock.patch('todos.views.timezone.now', return_value=tomorrow):
+            response = self.client.get(self.url)
+        self.assertContains(response, "(OVERDUE)")
+
+
+class ConditionalGetTest(TestCase):
+    """Test cases for ETag / Last-Modified handling"""
+
+    def setUp(self):
+        """Create test fixtures"""
+        self.todo = Todo.objects.create(title="Polled")
+        self.list_url = reverse('todo_list')
+        self.update_url = reverse('todo_update', args=[self.todo.pk])
+
+    def test_unchanged_list_returns_304_with_one_query(self):
+        """Test that a matching ETag short-circuits the list view"""
+        etag = self.client.get(self.list_url)['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(self.list_url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+    def test_list_etag_changes_on_toggle(self):
+        """Test that a write produces a new list ETag"""
+        etag = self.client.get(self.list_url)['ETag']
+        self.client.post(reverse('todo_toggle', args=[self.todo.pk]))
+        response = self.client.get(self.list_url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+
+    def test_list_etag_changes_on_delete(self):
+        """Test that deleting a todo produces a new list ETag"""
+        Todo.objects.create(title="Other")
+        etag = self.client.get(self.list_url)['ETag']
+        self.client.post(reverse('todo_delete', args=[self.todo.pk]))
+        response = self.client.get(self.list_url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+
+    def test_list_etag_varies_by_query_string(self):
+        """Test that each page of the list has its own ETag"""
+        first = self.client.get(self.list_url)['ETag']
+        second = self.client.get(self.list_url, {'page_size': 1})['ETag']
+        self.assertNotEqual(first, second)
+
+    def test_list_etag_changes_at_midnight(self):
+        """Test that the date is part of the list ETag"""
+        etag = self.client.get(self.list_url)['ETag']
+        tomorrow = timezone.now() + timedelta(days=1)
+        with mock.patch('todos.conditional.timezone.now', return_value=tomorrow):
+            response = self.client.get(self.list_url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+
+    def test_update_view_304(self):
+        """Test that the edit page sends Last-Modified and honours If-None-Match"""
+        response = self.client.get(self.update_url)
+        self.assertIn('Last-Modified', response)
+        response = self.client.get(self.update_url, headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+    def test_update_view_changes_after_save(self):
+        """Test that editing a todo invalidates its ETag"""
+        etag = self.client.get(self.update_url)['ETag']
+        self.todo.title = "Edited"
+        self.todo.save()
+        response = self.client.get(self.update_url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+
+
+class TodoFragmentTest(TestCase):
+    """Test cases for the row and form fragments behind the list's inline actions"""
+
+    def setUp(self):
+        """Create test fixtures"""
+        caches['template_fragments'].clear()
+        self.todo = Todo.objects.create(title="Inline", due_date=timezone.now().date() - timedelta(days=1))
+        self.headers = {'X-Fragment': '1'}
+
+    def test_toggle_returns_only_the_row(self):
+        """Test that a fragment toggle renders one row in two queries"""
+        url = reverse('todo_toggle', args=[self.todo.pk])
+        with self.assertNumQueries(2):
+            response = self.client.post(url, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'todos/_todo_item.html', count=1)
+        self.assertTemplateNotUsed(response, 'todos/todo_list.html')
+        self.assertTrue(response.content.decode().startswith(f'<div id="todo-{self.todo.pk}"'))
+        self.assertContains(response, "Mark Pending")
+        self.assertIn('X-Fragment', response['Vary'])
+
+    def test_query_flag_asks_for_a_fragment(self):
+        """Test that ?fragment=1 works without the header"""
+        response = self.client.post(reverse('todo_toggle', args=[self.todo.pk]) + '?fragment=1')
+        self.assertContains(response, "Mark Pending")
+        response = self.client.post(reverse('todo_toggle', args=[self.todo.pk]))
+        self.assertRedirects(response, reverse('todo_list'))
+
+    def test_toggle_fragment_warms_the_list_row_cache(self):
+        """Test that the list reuses the row the toggle rendered"""
+        self.client.post(reverse('todo_toggle', args=[self.todo.pk]), headers=self.headers)
+        Todo.objects.filter(pk=self.todo.pk).update(title="Changed behind the cache")
+        response = self.client.get(reverse('todo_list'))
+        self.assertContains(response, "Inline")
+
+    def test_toggle_missing_todo(self):
+        """Test that a fragment toggle of a missing todo is a 404"""
+        response = self.client.post(reverse('todo_toggle', args=[9999]), headers=self.headers)
+        self.assertEqual(response.status_code, 404)
+
+    def test_create_form_and_row(self):
+        """Test the bare create form, and the new row it answers with"""
+        response = self.client.get(reverse('todo_create'), headers=self.headers)
+        self.assertTemplateNotUsed(response, 'todos/base.html')
+        self.assertContains(response, f'action="{reverse("todo_create")}"')
+        with self.assertNumQueries(1):
+            response = self.client.post(reverse('todo_create'), {'title': 'Made inline'}, headers=self.headers)
+        self.assertEqual(response.status_code, 201)
+        todo = Todo.objects.get(title='Made inline')
+        self.assertContains(response, f'id="todo-{todo.pk}"', status_code=201)
+
+    def test_invalid_form_comes_back_with_400(self):
+        """Test that an invalid fragment submit returns the form alone"""
+        response = self.client.post(reverse('todo_create'), {'title': ''}, headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+        self.assertTemplateUsed(response, 'todos/_todo_form.html')
+        self.assertTemplateNotUsed(response, 'todos/base.html')
+
+    def test_update_form_and_row(self):
+        """Test the bare edit form, and the re-rendered row after saving"""
+        url = reverse('todo_update', args=[self.todo.pk])
+        response = self.client.get(url, headers=self.headers)
+        self.assertTemplateNotUsed(response, 'todos/base.html')
+        self.assertContains(response, 'value="Inline"')
+        response = self.client.post(url, {'title': 'Edited inline', 'due_date': self.todo.due_date}, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Edited inline")
+        self.assertContains(response, "(OVERDUE)")
+
+    def test_update_etag_differs_for_fragment(self):
+        """Test that the edit page and its form fragment do not share an ETag"""
+        url = reverse('todo_update', args=[self.todo.pk])
+        page = self.client.get(url)
+        fragment = self.client.get(url, headers=self.headers)
+        self.assertNotEqual(page['ETag'], fragment['ETag'])
+        response = self.client.get(url, headers={**self.headers, 'If-None-Match': page['ETag']})
+        self.assertEqual(response.status_code, 200)
+
+    def test_list_links_are_enhanced(self):
+        """Test that the list marks the links its script turns into fragment requests"""
+        response = self.client.get(reverse('todo_list'))
+        self.assertContains(response, 'data-fragment="toggle"')
+        self.assertContains(response, 'data-fragment="edit"')
+        self.assertContains(response, 'data-fragment="create"')
+
+
+# ========================================
+# API TESTS
+# ========================================
+
+class TodoAPITest(TestCase):
+    """Test cases for the JSON API"""
+
+    def setUp(self):
+        """Create test fixtures"""
+        self.list_url = reverse('api_todo_list')
+        self.batch_url = reverse('api_todo_batch')
+        self.todo = Todo.objects.create(title="API todo", description="From fixtures")
+        self.detail_url = reverse('api_todo_detail', args=[self.todo.pk])
+
+    def send(self, method, url, payload):
+        return getattr(self.client, method)(url, json.dumps(payload), content_type='application/json')
+
+    def test_list(self):
+        """Test that the list returns every field by default"""
+        response = self.client.get(self.list_url)
+        self.assertEqual(response.status_code, 200)
+        result = response.json()['results'][0]
+        self.assertEqual(result['title'], "API todo")
+        self.assertEqual(set(result), {'id', 'title', 'description', 'due_date', 'is_resolved', 'created_at', 'updated_at'})
+
+    def test_list_field_selection_restricts_select(self):
+        """Test that ?fields= limits both the output and the SELECT"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.list_url, {'fields': 'title'})
+        self.assertEqual(response.json()['results'], [{'title': "API todo"}])
+        self.assertNotIn('"description"', queries[0]['sql'])
+
+    def test_list_unknown_field(self):
+        """Test that unknown fields are rejected"""
+        response = self.client.get(self.list_url, {'fields': 'title,secret'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_list_keyset_pagination(self):
+        """Test that next cursors walk the whole table"""
+        for i in range(6):
+            Todo.objects.create(title=f"Paged {i}")
+        seen, cursor = [], None
+        while True:
+            params = {'page_size': 3, 'fields': 'id'}
+            if cursor:
+                params['cursor'] = cursor
+            body = self.client.get(self.list_url, params).json()
+            seen += [row['id'] for row in body['results']]
+            cursor = body['next']
+            if not cursor:
+                break
+        self.assertEqual(seen, list(Todo.objects.values_list('id', flat=True)))
+
+    def test_retrieve(self):
+        """Test that a single todo is returned"""
+        response = self.client.get(self.detail_url, {'fields': 'id,is_resolved'})
+        self.assertEqual(response.json(), {'id': self.todo.pk, 'is_resolved': False})
+
+    def test_retrieve_missing(self):
+        """Test that a missing todo returns 404"""
+        response = self.client.get(reverse('api_todo_detail', args=[9999]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_create(self):
+        """Test that POST creates a todo"""
+        response = self.send('post', self.list_url, {'title': "Created", 'due_date': '2030-01-31'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['due_date'], '2030-01-31')
+        self.assertTrue(Todo.objects.filter(title="Created").exists())
+
+    def test_create_uses_form_validation(self):
+        """Test that TodoForm rules apply to the API"""
+        response = self.send('post', self.list_url, {'title': 'x' * 201})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('title', response.json()['errors'])
+
+    def test_create_invalid_json(self):
+        """Test that a malformed body is a 400"""
+        response = self.client.post(self.list_url, '{nope', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_rejects_non_string_field_values(self):
+        """Test that lists, objects, numbers and non-boolean flags get a 400 field error"""
+        cases = [
+            ({'title': ['x']}, 'title'),
+            ({'title': {'x': 1}}, 'title'),
+            ({'title': "x", 'due_date': 20250101}, 'due_date'),
+            ({'title': "x", 'is_resolved': "maybe"}, 'is_resolved'),
+        ]
+        for payload, field in cases:
+            with self.subTest(payload=payload):
+                response = self.send('post', self.list_url, payload)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(field, response.json()['errors'])
+                response = self.send('post', self.batch_url, {'update': [{'id': self.todo.pk, **payload}]})
+                self.assertEqual(response.status_code, 400)
+        self.assertEqual(Todo.objects.get().title, "API todo")
+
+    def test_writes_require_json_content_type(self):
+        """Test that form and text/plain bodies, which any site can post, get a 415"""
+        client = Client(enforce_csrf_checks=True)
+        body = json.dumps({'delete': [self.todo.pk]})
+        response = client.post(self.batch_url, body, content_type='text/plain')
+        self.assertEqual(response.status_code, 415)
+        response = client.post(self.list_url, {'title': 'Forged'})
+        self.assertEqual(response.status_code, 415)
+        response = client.patch(self.detail_url, json.dumps({'title': 'Forged'}), content_type='text/plain')
+        self.assertEqual(response.status_code, 415)
+        self.assertEqual(Todo.objects.get().title, "API todo")
+
+    def test_batch_rejects_bool_and_duplicate_ids(self):
+        """Test that true/false are not ids and an id is updated at most once"""
+        response = self.send('post', self.batch_url, {'update': [{'id': True, 'title': "Bool"}]})
+        self.assertEqual(response.status_code, 400)
+        response = self.send('post', self.batch_url, {'delete': [False]})
+        self.assertEqual(response.status_code, 400)
+        response = self.send('post', self.batch_url, {'update': [
+            {'id': self.todo.pk, 'title': "First"}, {'id': self.todo.pk, 'title': "Second"},
+        ]})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Duplicate', response.json()['errors']['update'][0])
+        self.assertEqual(Todo.objects.get().title, "API todo")
+
+    def test_patch_keeps_other_fields(self):
+        """Test that PATCH only changes the given fields"""
+        response = self.send('patch', self.detail_url, {'is_resolved': True})
+        self.assertEqual(response.status_code, 200)
+        self.todo.refresh_from_db()
+        self.assertTrue(self.todo.is_resolved)
+        self.assertEqual(self.todo.description, "From fixtures")
+
+    def test_put_replaces_fields(self):
+        """Test that PUT validates the full representation"""
+        response = self.send('put', self.detail_url, {'description': "No title"})
+        self.assertEqual(response.status_code, 400)
+        response = self.send('put', self.detail_url, {'title': "Replaced"})
+        self.assertEqual(response.status_code, 200)
+        self.todo.refresh_from_db()
+        self.assertEqual((self.todo.title, self.todo.description), ("Replaced", ""))
+
+    def test_delete(self):
+        """Test that DELETE removes the todo"""
+        response = self.client.delete(self.detail_url)
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Todo.objects.exists())
+        self.assertEqual(self.client.delete(self.detail_url).status_code, 404)
+
+    def test_batch(self):
+        """Test that one batch can create, update and delete"""
+        doomed = Todo.objects.create(title="Doomed")
+        response = self.send('post', self.batch_url, {
+            'create': [{'title': "Batch 1"}, {'title': "Batch 2", 'is_resolved': True}],
+            'update': [{'id': self.todo.pk, 'title': "Batch updated"}],
+            'delete': [doomed.pk],
+        })
+        body = response.json()
+        self.assertEqual(len(body['created']), 2)
+        self.assertEqual((body['updated'], body['deleted']), (1, 1))
+        self.todo.refresh_from_db()
+        self.assertEqual(self.todo.title, "Batch updated")
+        self.assertEqual(self.todo.description, "From fixtures")
+        self.assertFalse(Todo.objects.filter(pk=doomed.pk).exists())
+
+    def test_batch_is_all_or_nothing(self):
+        """Test that one invalid item rejects the whole batch"""
+        response = self.send('post', self.batch_url, {
+            'create': [{'title': "Fine"}, {'title': ''}],
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('1', response.json()['errors']['create'])
+        self.assertEqual(Todo.objects.count(), 1)
+
+    def test_batch_update_missing_id(self):
+        """Test that updating unknown ids is rejected"""
+        response = self.send('post', self.batch_url, {'update': [{'id': 9999, 'title': "Ghost"}]})
+        self.assertEqual(response.status_code, 400)
+
+    def test_batch_create_10k_uses_bulk_insert(self):
+        """Test that a 10k-item create runs as a handful of INSERTs"""
+        items = [{'title': f"Bulk {i}"} for i in range(10000)]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.send('post', self.batch_url, {'create': items})
+        self.assertEqual(len(response.json()['created']), 10000)
+        inserts = [q for q in queries if q['sql'].startswith('INSERT')]
+        self.assertLess(len(inserts), 100)
+        self.assertEqual(Todo.objects.count(), 10001)
+
+
+@override_settings(TODO_SYNC_SETTLE_SECONDS=0)
+class TodoSyncAPITest(TestCase):
+    """Test cases for the delta sync endpoint"""
+
+    def setUp(self):
+        """Create test fixtures"""
+        self.url = reverse('api_todo_sync')
+        self.todos = [Todo.objects.create(title=f"Sync {i}") for i in range(3)]
+
+    def sync(self, cursor=None, **params):
+        if cursor:
+            params['cursor'] = cursor
+        return self.client.get(self.url, params).json()
+
+    def test_initial_sync_returns_everything(self):
+        """Test that no cursor means a full sync"""
+        body = self.sync()
+        self.assertEqual([row['title'] for row in body['changed']], ["Sync 0", "Sync 1", "Sync 2"])
+        self.assertEqual(body['deleted'], [])
+        self.assertFalse(body['has_more'])
+
+    def test_sync_returns_only_changes(self):
+        """Test that a cursor only yields rows changed after it"""
+        cursor = self.sync()['cursor']
+        self.assertEqual(self.sync(cursor)['changed'], [])
+        self.client.post(reverse('todo_toggle', args=[self.todos[1].pk]))
+        body = self.sync(cursor)
+        self.assertEqual([row['id'] for row in body['changed']], [self.todos[1].pk])
+
+    def test_delete_view_records_tombstone(self):
+        """Test that deleting through TodoDeleteView shows up as a tombstone"""
+        cursor = self.sync()['cursor']
+        self.client.post(reverse('todo_delete', args=[self.todos[0].pk]))
+        self.assertTrue(TodoTombstone.objects.filter(todo_id=self.todos[0].pk).exists())
+        body = self.sync(cursor)
+        self.assertEqual(body['deleted'], [self.todos[0].pk])
+        self.assertEqual(self.sync(body['cursor'])['deleted'], [])
+
+    def test_bulk_delete_records_tombstones(self):
+        """Test that set-based deletes are tombstoned too"""
+        Todo.objects.filter(pk__in=[t.pk for t in self.todos[:2]]).delete()
+        self.assertEqual(TodoTombstone.objects.count(), 2)
+
+    def test_sync_pages_through_large_change_sets(self):
+        """Test that has_more and the cursor page through ties on updated_at"""
+        Todo.objects.update(updated_at=timezone.now())
+        seen, cursor = [], None
+        while True:
+            body = self.sync(cursor, page_size=2, fields='id')
+            seen += [row['id'] for row in body['changed']]
+            cursor = body['cursor']
+            if not body['has_more']:
+                break
+        self.assertEqual(sorted(seen), [t.pk for t in self.todos])
+
+    def test_settle_window_resends_recent_rows(self):
+        """Test that the cursor stays behind writes that may still be committing"""
+        with self.settings(TODO_SYNC_SETTLE_SECONDS=60):
+            cursor = self.sync()['cursor']
+            self.assertEqual(len(self.sync(cursor)['changed']), 3)
+
+    def test_sync_queries_use_indexes(self):
+        """Test that both change streams are index seeks"""
+        from .sync import _after
+        position = (timezone.now(), 1)
+        for queryset, field, pk_field in (
+            (Todo.objects.all(), 'updated_at', 'id'),
+            (TodoTombstone.objects.all(), 'deleted_at', 'todo_id'),
+        ):
+            plan = explain_query_plan(_after(queryset, field, pk_field, position).order_by(field, pk_field))
+            self.assertTrue(any(step.startswith('SEARCH') for step in plan), plan)
+            self.assertFalse(any('TEMP B-TREE' in step for step in plan), plan)
+
+    def test_invalid_cursor(self):
+        """Test that a garbage cursor is a 400"""
+        response = self.client.get(self.url, {'cursor': 'garbage'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_wrongly_shaped_cursor(self):
+        """Test that well-formed JSON of the wrong shape is a 400 too"""
+        for payload in [{}, [], [1, 2, 3], [[1, 2], None], [['2030-01-01T00:00:00+00:00', '1'], None]]:
+            with self.subTest(payload=payload):
+                token = base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+                response = self.client.get(self.url, {'cursor': token})
+                self.assertEqual(response.status_code, 400)
+
+
+# ========================================
+# EXPORT TESTS
+# ========================================
+
+class TodoExportTest(TestCase):
+    """Test cases for the streaming export view and command"""
+
+    def setUp(self):
+        """Create test fixtures"""
+        today = timezone.now().date()
+        self.open = Todo.objects.create(title="Open, with comma", due_date=today)
+        self.done = Todo.objects.create(title="Done", is_resolved=True, due_date=today + timedelta(days=10))
+        self.url = reverse('todo_export')
+
+    def read(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_export(self):
+        """Test that the view streams a CSV attachment"""
+        response = self.client.get(self.url)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.DictReader(io.StringIO(self.read(response))))
+        self.assertEqual([row['title'] for row in rows], ["Open, with comma", "Done"])
+
+    def test_ndjson_export_with_filters(self):
+        """Test NDJSON output and the is_resolved / due date filters"""
+        response = self.client.get(self.url, {'format': 'ndjson', 'is_resolved': 'false'})
+        lines = self.read(response).splitlines()
+        self.assertEqual([json.loads(line)['id'] for line in lines], [self.open.pk])
+        response = self.client.get(self.url, {'format': 'ndjson', 'due_from': str(self.done.due_date)})
+        self.assertEqual([json.loads(line)['id'] for line in self.read(response).splitlines()], [self.done.pk])
+
+    async def test_asgi_export_streams_async(self):
+        """Test that ASGI gets an async iterator, which it streams unbuffered"""
+        response = await self.async_client.get(self.url, {'format': 'ndjson'})
+        self.assertTrue(response.is_async)
+        lines = b''.join([chunk async for chunk in response.streaming_content]).decode().splitlines()
+        self.assertEqual([json.loads(line)['title'] for line in lines], ["Open, with comma", "Done"])
+
+    def test_invalid_filters(self):
+        """Test that bad filter values are rejected"""
+        response = self.client.get(self.url, {'due_from': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_export_command(self):
+        """Test that manage.py export_todos writes a file"""
+        with tempfile.TemporaryDirectory() as workdir:
+            path = os.path.join(workdir, 'todos.ndjson')
+            call_command('export_todos', format='ndjson', output=path, is_resolved=True)
+            with open(path) as output:
+                self.assertEqual([json.loads(line)['title'] for line in output], ["Done"])
+
+    def peak_memory(self, rows):
+        Todo.objects.all().delete()
+        Todo.objects.bulk_create(Todo(title=f"Export {i}", description="x" * 100) for i in range(rows))
+        tracemalloc.start()
+        try:
+            for _ in self.client.get(self.url).streaming_content:
+                pass
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    def test_peak_memory_is_flat(self):
+        """Test that peak memory does not grow with the number of exported rows"""
+        small = self.peak_memory(2000)
+        large = self.peak_memory(20000)
+        self.assertLess(large, small * 2, (small, large))
+
+
+# ========================================
+# IMPORT TESTS
+# ========================================
+
+class TodoImportCommandTest(TestCase):
+    """Test cases for manage.py import_todos"""
+
+    def setUp(self):
+        """Create a scratch directory for input and reject files"""
+        self.workdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.workdir.cleanup)
+
+    def write(self, name, content):
+        path = os.path.join(self.workdir.name, name)
+        with open(path, 'w', newline='') as output:
+            output.write(content)
+        return path
+
+    def run_import(self, path, **options):
+        stdout, stderr = io.StringIO(), io.StringIO()
+        call_command('import_todos', path, stdout=stdout, stderr=stderr, **options)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_import_csv(self):
+        """Test that CSV rows are imported with parsed types"""
+        path = self.write('todos.csv', (
+            'title,description,due_date,is_resolved\n'
+            'Pay bills,Electricity,2030-05-01,False\n'
+            'Old task,,,True\n'
+        ))
+        stdout, _ = self.run_import(path)
+        self.assertIn('Imported 2 todos', stdout)
+        bills = Todo.objects.get(title="Pay bills")
+        self.assertEqual(str(bills.due_date), '2030-05-01')
+        self.assertFalse(bills.is_resolved)
+        self.assertTrue(Todo.objects.get(title="Old task").is_resolved)
+        self.assertIsNotNone(bills.created_at)
+
+    def test_import_ndjson_with_rejects(self):
+        """Test that invalid rows go to the side file and valid ones are kept"""
+        path = self.write('todos.ndjson', '\n'.join([
+            json.dumps({'title': "Good", 'due_date': '2030-01-01'}),
+            json.dumps({'title': ''}),
+            'not json',
+            json.dumps({'title': "Bad date", 'due_date': '2030-02-30'}),
+            json.dumps({'title': 'x' * 201}),
+        ]) + '\n')
+        stdout, _ = self.run_import(path, batch_size=2, transaction_size=3)
+        self.assertEqual(list(Todo.objects.values_list('title', flat=True)), ["Good"])
+        self.assertIn('Rejected 4 rows', stdout)
+        with open(path + '.rejects.ndjson') as rejects:
+            rejected = [json.loads(line) for line in rejects]
+        self.assertEqual([r['line'] for r in rejected], [2, 3, 4, 5])
+        self.assertIn('title', rejected[0]['errors'])
+        self.assertIn('due_date', rejected[2]['errors'])
+
+    def test_import_ndjson_with_wrongly_typed_values(self):
+        """Test that numbers, lists and objects reject their row and the import carries on"""
+        path = self.write('todos.ndjson', '\n'.join([
+            json.dumps({'title': "Good", 'is_resolved': True}),
+            json.dumps({'title': "Number date", 'due_date': 20250101}),
+            json.dumps({'title': ["list"]}),
+            json.dumps({'title': {'a': 1}}),
+            json.dumps({'title': "Also good", 'due_date': None}),
+        ]) + '\n')
+        stdout, _ = self.run_import(path)
+        self.assertEqual(sorted(Todo.objects.values_list('title', 'is_resolved')), [("Also good", False), ("Good", True)])
+        with open(path + '.rejects.ndjson') as rejects:
+            rejected = [json.loads(line) for line in rejects]
+        self.assertEqual([(r['line'], list(r['errors'])) for r in rejected], [(2, ['due_date']), (3, ['title']), (4, ['title'])])
+
+    def test_imported_rows_are_searchable(self):
+        """Test that the deferred FTS indexing covers imported rows and restores the trigger"""
+        path = self.write('todos.ndjson', json.dumps({'title': "Imported zebra"}) + '\n')
+        self.run_import(path)
+        self.assertEqual(Todo.objects.search("zebra").count(), 1)
+        Todo.objects.create(title="Created giraffe")
+        self.assertEqual(Todo.objects.search("giraffe").count(), 1)
+
+    def test_failed_block_keeps_search_trigger(self):
+        """Test that the trigger drop is rolled back with a failing block"""
+        with self.assertRaises(ZeroDivisionError):
+            with deferred_search_index():
+                1 / 0
+        Todo.objects.create(title="Created giraffe")
+        self.assertEqual(Todo.objects.search("giraffe").count(), 1)
+
+    @override_settings(TODO_EVENTS_BACKEND='sqlite')
+    def test_import_announces_created_rows(self):
+        """Test that with the sqlite event backend each committed chunk sends todos_changed with its new ids"""
+        Todo.objects.create(title="Existing")
+        path = self.write('todos.ndjson', ''.join(json.dumps({'title': f"T{i}"}) + '\n' for i in range(3)))
+        received = []
+
+        def receiver(sender, action, pks, **kwargs):
+            received.append((action, pks))
+
+        todos_changed.connect(receiver)
+        self.addCleanup(todos_changed.disconnect, receiver)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.run_import(path, transaction_size=2)
+        titles = [Todo.objects.filter(pk__in=pks).order_by('pk').values_list('title', flat=True) for _, pks in received]
+        self.assertEqual([action for action, _ in received], ['created', 'created'])
+        self.assertEqual([list(chunk) for chunk in titles], [["T0", "T1"], ["T2"]])
+
+    def test_import_skips_announcement_with_memory_backend(self):
+        """Test that without a cross-process event backend no new ids are looked up"""
+        path = self.write('todos.ndjson', ''.join(json.dumps({'title': f"T{i}"}) + '\n' for i in range(3)))
+        with CaptureQueriesContext(connection) as queries:
+            self.run_import(path, transaction_size=2)
+        self.assertFalse([q for q in queries if '"last_id"' in q['sql'] or '"todos_todo"."id" >' in q['sql']])
+        self.assertEqual(Todo.objects.count(), 3)
+
+    def test_progress_is_reported(self):
+        """Test that rows/sec progress goes to stderr"""
+        path = self.write('todos.ndjson', ''.join(json.dumps({'title': f"T{i}"}) + '\n' for i in range(5)))
+        _, stderr = self.run_import(path, transaction_size=2, progress_every=2)
+        self.assertIn('rows/s', stderr)
+        self.assertEqual(Todo.objects.count(), 5)
+
+    def test_row_validator_matches_todo_form(self):
+        """Test that the fast validator accepts and rejects the same rows as TodoForm"""
+        validator = TodoRowValidator()
+        rows = [
+            {'title': "Fine", 'description': "", 'due_date': '2030-01-01', 'is_resolved': 'false'},
+            {'title': "  padded  ", 'due_date': '', 'is_resolved': 'True'},
+            {'title': ""},
+            {'title': 'x' * 201},
+            {'title': "Date", 'due_date': '2030-13-01'},
+            {'title': "Date", 'due_date': '01/02/2030'},
+            {'title': "Nul \x00 byte"},
+        ]
+        for row in rows:
+            form = TodoForm(row)
+            cleaned, errors = validator.clean(row)
+            self.assertEqual(form.is_valid(), not errors, row)
+            if not errors:
+                self.assertEqual(cleaned, form.cleaned_data, row)
+
+
+# ========================================
+# PAGINATION TESTS
+# ========================================
+
+class KeysetPaginationTest(TestCase):
+    """Test cases for cursor pagination of the todo list"""
+
+    def setUp(self):
+        """Create todos with null due dates and created_at ties"""
+        today = timezone.now().date()
+        Todo.objects.bulk_create(
+            Todo(
+                title=f"Todo {i}",
+                is_resolved=i % 4 == 0,
+                due_date=None if i % 5 == 0 else today + timedelta(days=i % 3),
+            )
+            for i in range(37)
+        )
+        tied = Todo.objects.filter(pk__in=Todo.objects.values('pk')[:12])
+        tied.update(created_at=timezone.now())
+        self.expected = list(Todo.objects.order_by(*FORWARD_ORDERING).values_list('pk', flat=True))
+
+    def walk_forward(self, per_page):
+        paginator = KeysetPaginator(Todo.objects.all(), per_page)
+        pages = [paginator.page()]
+        while pages[-1].has_next():
+            pages.append(paginator.page(pages[-1].next_cursor))
+        return paginator, pages
+
+    def test_forward_walk_matches_ordering(self):
+        """Test that following next cursors visits every todo once in order"""
+        _, pages = self.walk_forward(5)
+        seen = [todo.pk for page in pages for todo in page]
+        self.assertEqual(seen, self.expected)
+
+    def test_backward_walk_matches_ordering(self):
+        """Test that following previous cursors from the last page returns the same pages"""
+        paginator, pages = self.walk_forward(5)
+        page = pages[-1]
+        for expected_page in reversed(pages[:-1]):
+            page = paginator.page(page.previous_cursor)
+            self.assertEqual([t.pk for t in page], [t.pk for t in expected_page])
+        self.assertFalse(page.has_previous())
+
+    def test_deep_page_query_count(self):
+        """Test that a deep page costs a bounded number of queries"""
+        _, pages = self.walk_forward(5)
+        paginator = KeysetPaginator(Todo.objects.all(), 5)
+        with self.assertNumQueries(1):
+            paginator.page()
+        with CaptureQueriesContext(connection) as queries:
+            paginator.page(pages[-2].next_cursor)
+        self.assertLessEqual(len(queries), 4)
+
+    def test_list_view_paginates(self):
+        """Test that the list view honours page_size and exposes cursors"""
+        response = self.client.get(reverse('todo_list'), {'page_size': 10})
+        self.assertEqual(len(response.context['todos']), 10)
+        next_cursor = response.context['page_obj'].next_cursor
+        self.assertContains(response, f'?cursor={next_cursor}')
+        response = self.client.get(reverse('todo_list'), {'page_size': 10, 'cursor': next_cursor})
+        self.assertEqual([t.pk for t in response.context['todos']], self.expected[10:20])
+
+    def test_list_view_invalid_cursor(self):
+        """Test that a garbage cursor returns 404"""
+        response = self.client.get(reverse('todo_list'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+
+# ========================================
+# DATABASE TESTS
+# ========================================
+
+class SqlitePragmaTest(TestCase):
+    """Test that SQLite connections are tuned on creation"""
+
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_applied_to_connection(self):
+        """Test that the configured pragmas are active on the test connection"""
+        self.assertEqual(self.pragma('busy_timeout'), 5000)
+        self.assertEqual(self.pragma('synchronous'), 1)  # NORMAL
+        self.assertEqual(self.pragma('temp_store'), 2)  # MEMORY
+        self.assertEqual(self.pragma('cache_size'), -20000)
+
+    @override_settings(SQLITE_PRAGMAS={'busy_timeout': 1234, 'cache_size': -4321})
+    def test_pragmas_follow_settings(self):
+        """Test that SQLITE_PRAGMAS controls what is applied"""
+        configure_sqlite_connection(sender=None, connection=connection)
+        self.assertEqual(self.pragma('busy_timeout'), 1234)
+        self.assertEqual(self.pragma('cache_size'), -4321)
+
+
+# ========================================
+# QUERY PLAN TESTS
+# ========================================
+
+def explain_query_plan(queryset):
+    """Return the detail column of SQLite's EXPLAIN QUERY PLAN for a queryset"""
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def list_view_queryset(**params):
+    """Return the queryset TodoListView would run for a GET with ``params``"""
+    view = TodoListView()
+    view.setup(RequestFactory().get(reverse('todo_list'), params))
+    return view.get_queryset()
+
+
+class TodoListQueryPlanTest(TestCase):
+    """Test that the list query is served by the ordering index"""
+
+    def setUp(self):
+        """Create test fixtures"""
+        today = timezone.now().date()
+        Todo.objects.bulk_create(
+            Todo(title=f"Todo {i}", is_resolved=i % 3 == 0, due_date=today + timedelta(days=i % 7))
+            for i in range(50)
+        )
+
+    def test_list_query_does_not_sort_in_temp_btree(self):
+        """Test that ORDER BY is satisfied by an index, not a temp B-tree"""
+        plan = explain_query_plan(_first_page_queryset(list_view_queryset(), 50))
+        self.assertFalse(
+            any('USE TEMP B-TREE FOR ORDER BY' in step for step in plan),
+            plan,
+        )
+
+    def test_list_query_uses_ordering_index(self):
+        """Test that the planner picks the composite ordering index"""
+        plan = explain_query_plan(_first_page_queryset(list_view_queryset(), 50))
+        self.assertTrue(any('todo_list_ordering_idx' in step for step in plan), plan)
+
+    def test_cursor_segments_seek_an_index(self):
+        """Test that every keyset segment is an index search with no sort step"""
+        for is_resolved in (False, True):
+            todo = Todo.objects.filter(is_resolved=is_resolved).exclude(due_date=None).first()
+            key = (todo.is_resolved, todo.due_date, todo.created_at, todo.pk)
+            for direction in (NEXT, PREVIOUS):
+                for segment in _seek_segments(key, direction)[:2]:
+                    plan = explain_query_plan(_segment_queryset(Todo.objects.all(), segment, direction))
+                    self.assertFalse(any('TEMP B-TREE' in step for step in plan), plan)
+                    self.assertTrue(any(step.startswith('SEARCH') for step in plan), plan)
+
+    def test_open_cursor_segments_use_partial_index(self):
+        """Test that paging through open todos seeks todo_open_due_idx"""
+        todo = Todo.objects.filter(is_resolved=False).exclude(due_date=None).first()
+        key = (todo.is_resolved, todo.due_date, todo.created_at, todo.pk)
+        for direction in (NEXT, PREVIOUS):
+            for segment in _seek_segments(key, direction)[:2]:
+                plan = explain_query_plan(_segment_queryset(Todo.objects.all(), segment, direction))
+                self.assertTrue(any(step.startswith('SEARCH') and 'todo_open_due_idx' in step for step in plan), plan)
+
+    def test_overdue_uses_partial_index(self):
+        """Test that overdue todos are a range search on todo_open_due_idx"""
+        plan = explain_query_plan(Todo.objects.overdue())
+        self.assertIn('SEARCH todos_todo USING INDEX todo_open_due_idx (due_date<?)', plan)
+        self.assertFalse(any('TEMP B-TREE' in step for step in plan), plan)
+
+    def test_overdue_gauge_uses_partial_index(self):
+        """Test that the overdue gauge counts through todo_open_due_idx"""
+        from .metrics import compute_todo_stats
+        with CaptureQueriesContext(connection) as queries:
+            stats = compute_todo_stats()
+        self.assertEqual(stats['overdue'], Todo.objects.overdue().count())
+        sql = next(query['sql'] for query in queries if '"due_date" <' in query['sql'])
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            plan = [row[-1] for row in cursor.fetchall()]
+        self.assertTrue(any('todo_open_due_idx (due_date<?)' in step for step in plan), plan)
+
+    def test_search_uses_fts_index(self):
+        """Test that search looks rows up by rowid from the FTS index"""
+        plan = explain_query_plan(Todo.objects.search("todo"))
+        self.assertTrue(any('VIRTUAL TABLE INDEX' in step for step in plan), plan)
+        self.assertFalse(any(step == 'SCAN todos_todo' for step in plan), plan)
+
+    def test_ranked_search_materializes_hits(self):
+        """Test that ranking runs the MATCH once instead of once per row"""
+        plan = explain_query_plan(Todo.objects.ranked_search("todo"))
+        self.assertIn('MATERIALIZE hits', plan)
+        self.assertTrue(any(step.startswith('SEARCH hits') for step in plan), plan)
+
+
+class TodoAdminSearchTest(TestCase):
+    """Test that the admin changelist search goes through FTS"""
+
+    def setUp(self):
+        """Create test fixtures"""
+        from django.contrib.auth.models import User
+        user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(user)
+        Todo.objects.create(title="Renew passport")
+        Todo.objects.create(title="Pay rent")
+
+    def test_admin_search(self):
+        """Test that admin search returns FTS matches without LIKE"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('admin:todos_todo_changelist'), {'q': 'passport'})
+        self.assertContains(response, "Renew passport")
+        self.assertNotContains(response, "Pay rent")
+        self.assertFalse(any('LIKE' in q['sql'] for q in queries))
+
+
+# ========================================
+# QUERY BUDGET TESTS
+# ========================================
+
+class QueryBudgetTest(TestCase):
+    """Test the assert_query_budget helper"""
+
+    def setUp(self):
+        """Create test fixtures"""
+        self.todos = [Todo.objects.create(title=f"Todo {i}") for i in range(3)]
+
+    def test_within_budget_passes(self):
+        """Test that a block within its budget passes and reports its queries"""
+        with assert_query_budget(queries=1) as recorder:
+            list(Todo.objects.all())
+        self.assertEqual(len(recorder), 1)
+
+    def test_too_many_queries_fail(self):
+        """Test that exceeding the query count raises"""
+        with self.assertRaisesMessage(QueryBudgetExceeded, '2 queries, budget is 1'):
+            with assert_query_budget(queries=1):
+                Todo.objects.count()
+                Todo.objects.exists()
+
+    def test_writes_are_budgeted_separately(self):
+        """Test that writes are counted on their own"""
+        with self.assertRaisesMessage(QueryBudgetExceeded, '2 writes, budget is 1'):
+            with assert_query_budget(queries=3, writes=1):
+                Todo.objects.create(title="One")
+                Todo.objects.create(title="Two")
+
+    def test_repeated_statement_fails(self):
+        """Test that the same statement run per row (N+1) is reported"""
+        with self.assertRaisesMessage(QueryBudgetExceeded, 'ran 3 times'):
+            with assert_query_budget():
+                for todo in self.todos:
+                    Todo.objects.get(pk=todo.pk)
+
+    def test_repeated_statement_can_be_allowed(self):
+        """Test that allow_duplicates turns the duplicate check off"""
+        with assert_query_budget(queries=3, allow_duplicates=True):
+            for todo in self.todos:
+                Todo.objects.get(pk=todo.pk)
+
+    def test_transaction_control_is_not_counted(self):
+        """Test that savepoints do not use up the budget"""
+        from django.db import transaction
+        with assert_query_budget(queries=1, writes=1):
+            with transaction.atomic():
+                Todo.objects.filter(pk=self.todos[0].pk).update(title="Renamed")
+
+
+class ViewQueryBudgetTest(TestCase):
+    """Test that every view stays within its declared query budget"""
+
+    def setUp(self):
+        """Create test fixtures"""
+        today = timezone.now().date()
+        Todo.objects.bulk_create(
+            Todo(title=f"Todo {i}", is_resolved=i % 3 == 0, due_date=today + timedelta(days=i % 4))
+            for i in range(30)
+        )
+        self.todo = Todo.objects.first()
+
+    def assertWithinViewBudget(self, method, path, data=None):
+        """Request ``path`` and check it against the resolved view's budget"""
+        budget = view_budget(resolve(path.split('?')[0]).func)
+        self.assertIsNotNone(budget, path)
+        with assert_query_budget(budget.queries, budget.writes, budget.allow_duplicates) as recorder:
+            response = getattr(self.client, method)(path, data)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertLess(response.status_code, 400)
+        return recorder
+
+    def test_list(self):
+        """Test that the first page is one query plus the conditional GET validator"""
+        with assert_query_budget(queries=2, writes=0):
+            response = self.client.get(reverse('todo_list'))
+        self.assertEqual(response.status_code, 200)
+
+    # journal_mode and synchronous cannot change inside the test transaction.
+    @override_settings(SQLITE_PRAGMAS={'busy_timeout': 5000, 'cache_size': -20000, 'temp_store': 'MEMORY'})
+    def test_list_on_fresh_connection(self):
+        """Test that PRAGMAs run on a newly opened connection are not counted"""
+        from django.db.backends.signals import connection_created
+        ensure_connection = connection.ensure_connection
+        opened = []
+
+        def reconnect():
+            ensure_connection()
+            if not opened:
+                opened.append(connection)
+                connection_created.send(sender=type(connection), connection=connection)
+
+        with mock.patch.object(connection, 'ensure_connection', reconnect):
+            with assert_query_budget(queries=2, writes=0):
+                self.client.get(reverse('todo_list'))
+        self.assertEqual(opened, [connection])
+
+    def test_list_with_cursor(self):
+        """Test that a cursor page stays within the list budget"""
+        response = self.client.get(reverse('todo_list'), {'page_size': 10})
+        self.assertWithinViewBudget('get', f"{reverse('todo_list')}?cursor={response.context['page_obj'].next_cursor}&page_size=10")
+
+    def test_list_search(self):
+        """Test that search mode stays within the list budget"""
+        self.assertWithinViewBudget('get', reverse('todo_list'), {'q': 'todo'})
+
+    def test_create(self):
+        """Test that creating a todo is a single INSERT"""
+        with assert_query_budget(queries=1, writes=1):
+            self.client.post(reverse('todo_create'), {'title': 'New'})
+        self.assertWithinViewBudget('get', reverse('todo_create'))
+
+    def test_toggle(self):
+        """Test that toggling is a single UPDATE"""
+        with assert_query_budget(queries=1, writes=1):
+            self.client.post(reverse('todo_toggle', args=[self.todo.pk]))
+
+    def test_update(self):
+        """Test that the edit form reads the row once despite the conditional GET"""
+        for method in ('get', 'head'):
+            with assert_query_budget(queries=1, writes=0):
+                getattr(self.client, method)(reverse('todo_update', args=[self.todo.pk]))
+        self.assertWithinViewBudget('post', reverse('todo_update', args=[self.todo.pk]), {'title': 'Edited'})
+
+    def test_delete(self):
+        """Test the delete confirmation and delete budgets"""
+        self.assertWithinViewBudget('get', reverse('todo_delete', args=[self.todo.pk]))
+        self.assertWithinViewBudget('post', reverse('todo_delete', args=[self.todo.pk]))
+
+    def test_bulk_action(self):
+        """Test that a bulk action is one set-based write"""
+        pks = list(Todo.objects.values_list('pk', flat=True)[:10])
+        self.assertWithinViewBudget('post', reverse('todo_bulk'), {'action': 'resolve', 'pks': pks})
+
+    def test_export(self):
+        """Test that an export streams from a single query"""
+        self.assertWithinViewBudget('get', reverse('todo_export'))
+
+    def test_admin_changelist(self):
+        """Test that the changelist is session, user, count and page"""
+        from django.contrib.auth.models import User
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        with assert_query_budget(queries=4, writes=0):
+            response = self.client.get(reverse('admin:todos_todo_changelist'))
+        self.assertEqual(response.status_code, 200)
+        with assert_query_budget(queries=4, writes=0):
+            self.client.get(reverse('admin:todos_todo_changelist'), {'q': 'todo'})
+
+
+@override_settings(DEBUG=True)
+class QueryBudgetMiddlewareTest(TestCase):
+    """Test the development query budget middleware"""
+
+    def setUp(self):
+        """Create test fixtures"""
+        self.todos = [Todo.objects.create(title=f"Todo {i}") for i in range(3)]
+
+    def run_view(self, view):
+        """Send one request for ``view`` through the middleware"""
+        def get_response(request):
+            middleware.process_view(request, view, (), {})
+            return view(request)
+        middleware = QueryBudgetMiddleware(get_response)
+        return middleware(RequestFactory().get('/'))
+
+    def test_over_budget_is_logged(self):
+        """Test that a request over its view's budget logs a warning"""
+        @query_budget(queries=1)
+        def view(request):
+            Todo.objects.count()
+            Todo.objects.exists()
+            return HttpResponse()
+
+        with self.assertLogs('todos.middleware', 'WARNING') as logs:
+            response = self.run_view(view)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('2 queries, budget is 1', logs.output[0])
+
+    def test_duplicates_are_reported_without_a_budget(self):
+        """Test that repeated statements are reported for any view"""
+        def view(request):
+            for todo in self.todos:
+                Todo.objects.get(pk=todo.pk)
+            return HttpResponse()
+
+        with self.assertLogs('todos.middleware', 'WARNING') as logs:
+            self.run_view(view)
+        self.assertIn('ran 3 times', logs.output[0])
+
+    @override_settings(TODO_QUERY_BUDGET_ACTION='raise')
+    def test_raise_mode(self):
+        """Test that raise mode turns an overrun into an error"""
+        view = query_budget(queries=0)(lambda request: HttpResponse(str(Todo.objects.count())))
+        with self.assertRaises(QueryBudgetExceeded):
+            self.run_view(view)
+
+    def test_within_budget_is_silent(self):
+        """Test that a request within its budget logs nothing"""
+        view = query_budget(queries=1)(lambda request: HttpResponse(str(Todo.objects.count())))
+        with self.assertNoLogs('todos.middleware', 'WARNING'):
+            self.run_view(view)
+
+    @override_settings(DEBUG=False)
+    def test_disabled_without_debug(self):
+        """Test that the middleware removes itself outside DEBUG"""
+        with self.assertRaises(MiddlewareNotUsed):
+            QueryBudgetMiddleware(lambda request: HttpResponse())
+
+
+# ========================================
+# TIMING TESTS
+# ========================================
+
+class ServerTimingMiddlewareTest(TestCase):
+    """Test the Server-Timing header, timing log line and profile sampling"""
+
+    def setUp(self):
+        """Create test fixtures"""
+        Todo.objects.create(title="Timed todo")
+
+    def test_server_timing_header(self):
+        """Test that db, template and total durations are reported"""
+        response = self.client.get(reverse('todo_list'))
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'db;dur=[0-9.]+;desc="2 queries"')
+        self.assertRegex(timing, r'template;dur=[0-9.]+')
+        self.assertRegex(timing, r'total;dur=[0-9.]+')
+        template = float(re.search(r'template;dur=([0-9.]+)', timing).group(1))
+        self.assertGreater(template, 0)
+
+    def test_structured_log_line(self):
+        """Test that each request logs its timings as key=value pairs"""
+        with self.assertLogs('todos.timing', 'INFO') as logs:
+            self.client.get(reverse('todo_list'))
+        self.assertIn('view=todo_list', logs.output[0])
+        self.assertIn('status=200', logs.output[0])
+        self.assertIn('queries=2', logs.output[0])
+        self.assertEqual(logs.records[0].timing['queries'], 2)
+
+    def test_profile_sampling(self):
+        """Test that one request in N is profiled to the configured directory"""
+        import pstats
+        with tempfile.TemporaryDirectory() as profile_dir:
+            with override_settings(TODO_PROFILE_SAMPLE_RATE=2, TODO_PROFILE_DIR=profile_dir):
+                client = Client()
+                for _ in range(4):
+                    client.get(reverse('todo_list'))
+            dumps = sorted(os.listdir(profile_dir))
+            self.assertEqual(len(dumps), 2)
+            self.assertTrue(dumps[0].endswith('-GET-root.prof'))
+            stats = pstats.Stats(os.path.join(profile_dir, dumps[0]))
+            self.assertGreater(stats.total_calls, 0)
+
+    def test_no_profiles_by_default(self):
+        """Test that sampling is off unless configured"""
+        middleware = ServerTimingMiddleware(lambda request: HttpResponse())
+        self.assertIsNone(middleware.start_profiler())
+
+
+# ========================================
+# METRICS TESTS
+# ========================================
+
+class MetricsStoreTest(TestCase):
+    """Test the per-process memory-mapped metric files"""
+
+    def setUp(self):
+        """Create a scratch metrics directory"""
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def test_values_survive_reopen_and_growth(self):
+        """Test that a store grows past its initial size and reads back"""
+        from .metrics import MmapedDict
+        path = os.path.join(self.directory.name, 'process_1.db')
+        store = MmapedDict(path, initial_size=64)
+        for i in range(500):
+            store.increment(f'key-{i}', i)
+        store.increment('key-7', 0.5)
+        store.close()
+        reopened = MmapedDict(path)
+        reopened.increment('key-7')
+        reopened.close()
+        with override_settings(TODO_METRICS_DIR=self.directory.name):
+            from .metrics import collect
+            totals = collect()
+        self.assertEqual(len(totals), 500)
+        self.assertEqual(totals['key-7'], 8.5)
+        self.assertEqual(totals['key-499'], 499)
+
+    def test_collect_sums_processes(self):
+        """Test that samples from every worker's file are added together"""
+        from .metrics import MmapedDict, collect
+        for pid, amount in ((101, 2), (102, 3)):
+            store = MmapedDict(os.path.join(self.directory.name, f'process_{pid}.db'))
+            store.increment('requests', amount)
+            store.close()
+        with override_settings(TODO_METRICS_DIR=self.directory.name):
+            self.assertEqual(collect()['requests'], 5)
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Test that rendered buckets accumulate and end in +Inf"""
+        from .metrics import Histogram, collect
+        histogram = Histogram('test_seconds', 'Test.', [0.1, 1])
+        with override_settings(TODO_METRICS_DIR=self.directory.name):
+            for value in (0.05, 0.5, 0.5, 5):
+                histogram.observe(value, view='todo_list')
+            lines = histogram.render(collect())
+        self.assertIn('test_seconds_bucket{le="0.1",view="todo_list"} 1.0', lines)
+        self.assertIn('test_seconds_bucket{le="1.0",view="todo_list"} 3.0', lines)
+        self.assertIn('test_seconds_bucket{le="+Inf",view="todo_list"} 4.0', lines)
+        self.assertIn('test_seconds_count{view="todo_list"} 4.0', lines)
+        self.assertIn('test_seconds_sum{view="todo_list"} 6.05', lines)
+
+    def test_exited_processes_are_folded(self):
+        """Test that a starting worker folds files of exited pids into one"""
+        import subprocess
+        import sys
+        from .metrics import EXITED_FILE, MmapedDict, _entries, collect, process_store
+        child = subprocess.run([sys.executable, '-c', 'import os; print(os.getpid())'],
+                               capture_output=True, text=True, check=True)
+        # A dead worker, a leftover file from an earlier process with this
+        # pid, and a worker that is still running.
+        pids = {int(child.stdout): 2, os.getpid(): 3, os.getppid(): 5}
+        for pid, amount in pids.items():
+            store = MmapedDict(os.path.join(self.directory.name, f'process_{pid}.db'))
+            store.increment('requests', amount)
+            store.close()
+        with override_settings(TODO_METRICS_DIR=self.directory.name):
+            process_store()
+            self.assertEqual(collect()['requests'], 10)
+        self.assertEqual(
+            sorted(name for name in os.listdir(self.directory.name) if name.endswith('.db')),
+            sorted([EXITED_FILE, f'process_{os.getpid()}.db', f'process_{os.getppid()}.db']),
+        )
+        with open(os.path.join(self.directory.name, EXITED_FILE), 'rb') as exited:
+            self.assertEqual([value for _, value, _ in _entries(exited.read())], [5])
+
+
+class MetricsEndpointTest(TestCase):
+    """Test the /metrics endpoint"""
+
+    def setUp(self):
+        """Create test fixtures and a scratch metrics directory"""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        override = override_settings(TODO_METRICS_DIR=directory.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        today = timezone.now().date()
+        Todo.objects.create(title="Open")
+        Todo.objects.create(title="Late", due_date=today - timedelta(days=1))
+        Todo.objects.create(title="Done", is_resolved=True)
+
+    def test_request_histograms_per_url_name(self):
+        """Test latency and query histograms labelled by URL name"""
+        self.client.get(reverse('todo_list'))
+        self.client.get(reverse('todo_list'))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        body = response.content.decode()
+        self.assertIn('# TYPE todo_http_request_duration_seconds histogram', body)
+        self.assertIn('todo_http_request_duration_seconds_count{method="GET",view="todo_list"} 2.0', body)
+        self.assertIn('todo_db_queries_per_request_bucket{le="2.0",method="GET",view="todo_list"} 2.0', body)
+        self.assertIn('todo_db_duration_seconds_count{method="GET",view="todo_list"} 2.0', body)
+
+    def test_url(self):
+        """Test that the endpoint has a trailing slash like every other URL"""
+        self.assertEqual(reverse('metrics'), '/metrics/')
+
+    def test_todo_gauges(self):
+        """Test the open, resolved and overdue gauges"""
+        body = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn('todo_todos{state="open"} 2.0', body)
+        self.assertIn('todo_todos{state="resolved"} 1.0', body)
+        self.assertIn('todo_todos{state="overdue"} 1.0', body)
+
+    def test_gauges_are_cached_between_scrapes(self):
+        """Test that a scrape within the interval runs no query"""
+        self.client.get(reverse('metrics'))
+        Todo.objects.create(title="Another")
+        with self.assertNumQueries(0):
+            body = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn('todo_todos{state="open"} 2.0', body)
+
+    @override_settings(TODO_METRICS_STATS_INTERVAL=0)
+    def test_stale_gauges_refresh_in_background(self):
+        """Test that a stale aggregate is served while a thread refreshes it"""
+        from . import metrics
+        self.client.get(reverse('metrics'))
+        with mock.patch.object(metrics.threading, 'Thread') as thread:
+            with self.assertNumQueries(0):
+                self.client.get(reverse('metrics'))
+        thread.return_value.start.assert_called_once_with()
+        metrics._refreshing.release()
+        Todo.objects.create(title="Another")
+        metrics.refresh_todo_stats()
+        self.assertEqual(json.loads(metrics._stats_path().read_text())['open'], 3)
+
+
+# ========================================
+# ARCHIVE TESTS
+# ========================================
+
+class ArchiveTodosTest(TestCase):
+    """Test cases for moving resolved todos into the archive"""
+
+    def setUp(self):
+        """Create resolved todos last updated 40 days ago, plus recent and open ones"""
+        self.old = timezone.now() - timedelta(days=40)
+        for i in range(5):
+            Todo.objects.create(title=f"Old done {i}", description="Filed", is_resolved=True,
+                                due_date=self.old.date())
+        Todo.objects.create(title="Old open")
+        Todo.objects.update(updated_at=self.old)
+        Todo.objects.create(title="Recent done", is_resolved=True)
+
+    def run_archive(self, *args):
+        stdout = io.StringIO()
+        call_command('archive_todos', *args, stdout=stdout)
+        return stdout.getvalue()
+
+    def test_moves_only_old_resolved_todos(self):
+        """Test that old resolved todos move and everything else stays"""
+        output = self.run_archive('--older-than', '30', '--pause', '0')
+        self.assertIn('Archived 5 todos', output)
+        self.assertEqual(
+            sorted(Todo.objects.values_list('title', flat=True)), ["Old open", "Recent done"],
+        )
+        self.assertEqual(ArchivedTodo.objects.count(), 5)
+
+    def test_archived_rows_keep_ids_and_fields(self):
+        """Test that the archive copy matches the original row"""
+        todo = Todo.objects.get(title="Old done 0")
+        self.run_archive('--older-than', '30', '--pause', '0')
+        archived = ArchivedTodo.objects.get(pk=todo.pk)
+        self.assertEqual(archived.title, todo.title)
+        self.assertEqual(archived.description, "Filed")
+        self.assertEqual(archived.due_date, todo.due_date)
+        self.assertEqual(archived.created_at, todo.created_at)
+        self.assertEqual(archived.updated_at, todo.updated_at)
+        self.assertIsNotNone(archived.archived_at)
+
+    def test_moves_in_batches(self):
+        """Test that each batch is its own short transaction"""
+        progress = list(archive_todos(timedelta(days=30), batch_size=2))
+        self.assertEqual(progress, [2, 4, 5])
+
+    def test_batch_skips_rows_reopened_since_selection(self):
+        """Test that a todo reopened after being picked is left in place"""
+        todo = Todo.objects.get(title="Old done 0")
+        Todo.objects.filter(pk=todo.pk).update(is_resolved=False)
+        moved = archive_batch([todo.pk], timezone.now() - timedelta(days=30))
+        self.assertEqual(moved, 0)
+        self.assertTrue(Todo.objects.filter(pk=todo.pk).exists())
+        self.assertFalse(ArchivedTodo.objects.exists())
+
+    def test_batch_announces_only_moved_rows(self):
+        """Test that a candidate reopened after selection is not announced as deleted"""
+        kept, moved = Todo.objects.filter(title__in=["Old done 0", "Old done 1"]).order_by('title')
+        Todo.objects.filter(pk=kept.pk).update(is_resolved=False)
+        received = []
+
+        def receiver(sender, action, pks, **kwargs):
+            received.append((action, pks))
+
+        todos_changed.connect(receiver)
+        self.addCleanup(todos_changed.disconnect, receiver)
+        self.assertEqual(archive_batch([kept.pk, moved.pk], timezone.now() - timedelta(days=30)), 1)
+        self.assertEqual(received, [('deleted', [moved.pk])])
+
+    def test_archived_todos_leave_search_and_sync(self):
+        """Test that archiving drops rows from FTS and tombstones them for sync clients"""
+        pks = list(Todo.objects.filter(is_resolved=True, updated_at=self.old).values_list('pk', flat=True))
+        self.run_archive('--older-than', '30', '--pause', '0')
+        self.assertFalse(Todo.objects.search("filed").exists())
+        self.assertEqual(sorted(TodoTombstone.objects.values_list('todo_id', flat=True)), sorted(pks))
+
+    def test_dry_run(self):
+        """Test that --dry-run counts without moving anything"""
+        output = self.run_archive('--older-than', '30', '--dry-run')
+        self.assertIn('5 todos would be archived', output)
+        self.assertEqual(Todo.objects.count(), 7)
+        self.assertFalse(ArchivedTodo.objects.exists())
+
+    def test_rejects_bad_options(self):
+        """Test that invalid option values raise CommandError"""
+        with self.assertRaises(CommandError):
+            self.run_archive('--older-than', '30', '--batch-size', '0')
+        with self.assertRaises(CommandError):
+            self.run_archive('--older-than', '-1')
+
+
+class ArchivedTodoViewsTest(TestCase):
+    """Test the archived listing in the list view and the admin"""
+
+    def setUp(self):
+        """Archive one todo and keep one active"""
+        Todo.objects.create(title="Filed taxes", is_resolved=True)
+        Todo.objects.update(updated_at=timezone.now() - timedelta(days=40))
+        Todo.objects.create(title="Active task")
+        list(archive_todos(timedelta(days=30)))
+
+    def test_list_hides_archived_by_default(self):
+        """Test that the default list shows only the hot table"""
+        response = self.client.get(reverse('todo_list'))
+        self.assertContains(response, "Active task")
+        self.assertNotContains(response, "Filed taxes")
+        self.assertContains(response, '?archived=1')
+
+    def test_list_shows_archived(self):
+        """Test that ?archived=1 lists archived todos without edit actions"""
+        archived = ArchivedTodo.objects.get()
+        response = self.client.get(reverse('todo_list'), {'archived': '1'})
+        self.assertContains(response, "Filed taxes")
+        self.assertNotContains(response, "Active task")
+        self.assertNotContains(response, reverse('todo_update', args=[archived.pk]))
+        self.assertNotContains(response, 'id="bulk-form"')
+
+    def test_archived_search(self):
+        """Test that searching in archived mode matches archived titles"""
+        response = self.client.get(reverse('todo_list'), {'archived': '1', 'q': 'tax'})
+        self.assertContains(response, "Filed taxes")
+        response = self.client.get(reverse('todo_list'), {'archived': '1', 'q': 'nothing'})
+        self.assertNotContains(response, "Filed taxes")
+
+    def test_archived_list_within_budget(self):
+        """Test that an archive page is one query plus the conditional GET validator"""
+        with assert_query_budget(queries=2):
+            self.client.get(reverse('todo_list'), {'archived': '1'})
+
+    def test_archived_pages_follow_cursors(self):
+        """Test that the archive pages forwards and back as one segment"""
+        today = timezone.now().date()
+        for days in (1, 2):
+            Todo.objects.create(title=f"Filed {days}", is_resolved=True, due_date=today + timedelta(days=days))
+        Todo.objects.filter(is_resolved=True).update(updated_at=timezone.now() - timedelta(days=40))
+        list(archive_todos(timedelta(days=30)))
+        titles, cursor = [], None
+        while True:
+            params = {'archived': '1', 'page_size': 1, **({'cursor': cursor} if cursor else {})}
+            page = self.client.get(reverse('todo_list'), params).context['page_obj']
+            titles += [todo.title for todo in page]
+            if not page.has_next():
+                break
+            cursor = page.next_cursor
+        self.assertEqual(titles, ["Filed taxes", "Filed 1", "Filed 2"])
+        response = self.client.get(reverse('todo_list'), {'archived': '1', 'page_size': 1, 'cursor': page.previous_cursor})
+        self.assertEqual([todo.title for todo in response.context['todos']], ["Filed 1"])
+
+    def test_archived_pages_seek_ordering_index(self):
+        """Test that archive pages walk the ordering index without sorting"""
+        paginator = ArchiveKeysetPaginator(ArchivedTodo.objects.all(), 50)
+        plan = explain_query_plan(paginator.first_page_queryset())
+        self.assertTrue(any('archived_todo_ordering_idx' in step for step in plan), plan)
+        self.assertFalse(any('TEMP B-TREE' in step for step in plan), plan)
+        key = (True, timezone.now().date(), timezone.now(), 1)
+        for direction in (NEXT, PREVIOUS):
+            for segment in paginator.seek_segments(key, direction):
+                plan = explain_query_plan(_segment_queryset(ArchivedTodo.objects.all(), segment, direction))
+                self.assertTrue(any(step.startswith('SEARCH') for step in plan), plan)
+                self.assertFalse(any('TEMP B-TREE' in step for step in plan), plan)
+
+    def test_admin_archive_is_read_only(self):
+        """Test that the archive changelist renders and cannot add or delete rows"""
+        from django.contrib.auth.models import User
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        response = self.client.get(reverse('admin:todos_archivedtodo_changelist'))
+        self.assertContains(response, "Filed taxes")
+        response = self.client.get(reverse('admin:todos_archivedtodo_add'))
+        self.assertEqual(response.status_code, 403)
+        archived = ArchivedTodo.objects.get(title="Filed taxes")
+        response = self.client.post(reverse('admin:todos_archivedtodo_delete', args=[archived.pk]), {'post': 'yes'})
+        self.assertEqual(response.status_code, 403)
+        self.assertTrue(ArchivedTodo.objects.filter(pk=archived.pk).exists())
+
+
+# ========================================
+# ASYNC VIEW TESTS
+# ========================================
+
+@override_settings(ROOT_URLCONF='todos.async_urls')
+class AsyncTodoViewsTest(TestCase):
+    """Test the async list, create, update, delete and toggle views"""
+
+    def setUp(self):
+        """Create test fixtures"""
+        self.todo = Todo.objects.create(title="Async todo", due_date=timezone.now().date())
+
+    def test_urls_use_async_views(self):
+        """Test that the async URLconf serves coroutine views under the same names"""
+        from asgiref.sync import iscoroutinefunction
+        for name, args in [('todo_list', []), ('todo_create', []), ('todo_update', [1]),
+                           ('todo_delete', [1]), ('todo_toggle', [1])]:
+            self.assertTrue(iscoroutinefunction(resolve(reverse(name, args=args)).func), name)
+        self.assertFalse(iscoroutinefunction(resolve(reverse('todo_bulk')).func))
+
+    async def test_list(self):
+        """Test that the async list renders todos and pages with cursors"""
+        tomorrow = timezone.now().date() + timedelta(days=1)
+        await Todo.objects.abulk_create(Todo(title=f"Extra {i}", due_date=tomorrow) for i in range(3))
+        response = await self.async_client.get(reverse('todo_list'), {'page_size': 2})
+        self.assertContains(response, "Async todo")
+        self.assertTrue(response.context['is_paginated'])
+        cursor = response.context['page_obj'].next_cursor
+        response = await self.async_client.get(reverse('todo_list'), {'page_size': 2, 'cursor': cursor})
+        self.assertEqual(len(response.context['todos']), 2)
+        self.assertNotContains(response, "Async todo")
+
+    async def test_list_search_and_invalid_cursor(self):
+        """Test search mode and the 404 for a malformed cursor"""
+        response = await self.async_client.get(reverse('todo_list'), {'q': 'async'})
+        self.assertContains(response, "Async todo")
+        response = await self.async_client.get(reverse('todo_list'), {'cursor': 'garbage'})
+        self.assertEqual(response.status_code, 404)
+
+    async def test_list_conditional_get(self):
+        """Test that the async list answers 304 for a matching ETag"""
+        response = await self.async_client.get(reverse('todo_list'))
+        response = await self.async_client.get(reverse('todo_list'), headers={'if-none-match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+    async def test_create(self):
+        """Test creating a todo, and re-rendering an invalid form"""
+        response = await self.async_client.post(reverse('todo_create'), {'title': 'Made async'})
+        self.assertRedirects(response, reverse('todo_list'), fetch_redirect_response=False)
+        self.assertTrue(await Todo.objects.filter(title='Made async').aexists())
+        response = await self.async_client.post(reverse('todo_create'), {'title': ''})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['form'].errors)
+
+    async def test_update(self):
+        """Test the edit form, its validators and saving it"""
+        url = reverse('todo_update', args=[self.todo.pk])
+        response = await self.async_client.get(url)
+        self.assertContains(response, 'value="Async todo"')
+        self.assertIn('Last-Modified', response)
+        response = await self.async_client.get(url, headers={'if-none-match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+        response = await self.async_client.post(url, {'title': 'Renamed'})
+        self.assertEqual(response.status_code, 302)
+        await self.todo.arefresh_from_db()
+        self.assertEqual(self.todo.title, 'Renamed')
+        response = await self.async_client.get(reverse('todo_update', args=[99999]))
+        self.assertEqual(response.status_code, 404)
+
+    async def test_delete(self):
+        """Test the confirmation page and deleting"""
+        url = reverse('todo_delete', args=[self.todo.pk])
+        response = await self.async_client.get(url)
+        self.assertContains(response, 'Async todo')
+        response = await self.async_client.post(url)
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(await Todo.objects.filter(pk=self.todo.pk).aexists())
+        response = await self.async_client.post(url)
+        self.assertEqual(response.status_code, 404)
+
+    async def test_toggle(self):
+        """Test that toggling flips the state, 404s for a missing todo and needs POST"""
+        response = await self.async_client.post(reverse('todo_toggle', args=[self.todo.pk]))
+        self.assertEqual(response.status_code, 302)
+        await self.todo.arefresh_from_db()
+        self.assertTrue(self.todo.is_resolved)
+        response = await self.async_client.post(reverse('todo_toggle', args=[99999]))
+        self.assertEqual(response.status_code, 404)
+        response = await self.async_client.get(reverse('todo_toggle', args=[self.todo.pk]))
+        self.assertEqual(response.status_code, 405)
+
+    async def test_fragments(self):
+        """Test that toggle, create and update answer fragment requests with one row"""
+        headers = {'X-Fragment': '1'}
+        response = await self.async_client.post(reverse('todo_toggle', args=[self.todo.pk]), headers=headers)
+        self.assertContains(response, f'id="todo-{self.todo.pk}"')
+        self.assertContains(response, "Mark Pending")
+        response = await self.async_client.post(
+            reverse('todo_toggle', args=[self.todo.pk]), headers={'Prefer': 'return=minimal'},
+        )
+        self.assertEqual(response.status_code, 204)
+        response = await self.async_client.post(reverse('todo_create'), {'title': 'Inline'}, headers=headers)
+        self.assertEqual(response.status_code, 201)
+        response = await self.async_client.post(reverse('todo_create'), {'title': ''}, headers=headers)
+        self.assertEqual(response.status_code, 400)
+        self.assertTemplateNotUsed(response, 'todos/base.html')
+        url = reverse('todo_update', args=[self.todo.pk])
+        response = await self.async_client.get(url, headers=headers)
+        self.assertTemplateUsed(response, 'todos/_todo_form.html')
+        self.assertTemplateNotUsed(response, 'todos/base.html')
+        response = await self.async_client.post(url, {'title': 'Edited inline'}, headers=headers)
+        self.assertContains(response, "Edited inline")
+
+    async def test_within_query_budgets(self):
+        """Test that async ORM queries are counted and stay within the view budgets"""
+        with assert_query_budget(queries=4) as recorder:
+            await self.async_client.get(reverse('todo_list'))
+        self.assertGreater(len(recorder), 0)
+        with assert_query_budget(queries=2, writes=1):
+            await self.async_client.post(reverse('todo_update', args=[self.todo.pk]), {'title': 'Budget'})
+        with assert_query_budget(queries=1, writes=1):
+            await self.async_client.post(reverse('todo_toggle', args=[self.todo.pk]))
+
+    async def test_server_timing_counts_async_queries(self):
+        """Test that queries run by the async ORM show up in Server-Timing"""
+        response = await self.async_client.post(reverse('todo_toggle', args=[self.todo.pk]))
+        self.assertIn('desc="1 queries"', response['Server-Timing'])
+
+    def test_middleware_is_async_capable(self):
+        """Test that the project middleware runs natively in an async stack"""
+        from asgiref.sync import iscoroutinefunction
+
+        async def get_response(request):
+            return HttpResponse()
+
+        for middleware_class in (MetricsMiddleware, ServerTimingMiddleware):
+            self.assertTrue(iscoroutinefunction(middleware_class(get_response)))
+            self.assertFalse(iscoroutinefunction(middleware_class(lambda request: HttpResponse())))
+        with override_settings(DEBUG=True):
+            self.assertTrue(iscoroutinefunction(QueryBudgetMiddleware(get_response)))
+
+
+# ========================================
+# LIVE UPDATE TESTS
+# ========================================
+
+class TodoEventsTest(TestCase):
+    """Test the Server-Sent Events stream and the writes that feed it"""
+
+    def setUp(self):
+        """Create test fixtures"""
+        self.todo = Todo.objects.create(title="Live todo")
+        self.sent = []
+        todos_changed.connect(self.record)
+        self.addCleanup(todos_changed.disconnect, self.record)
+        # The test client keeps a response's stream alive past the test.
+        self.addCleanup(setattr, events.broadcaster, 'subscribers', set())
+
+    def record(self, sender, action, pks, **kwargs):
+        self.sent.append((action, list(pks)))
+
+    async def next_message(self, messages):
+        return await asyncio.wait_for(anext(messages), 5)
+
+    def test_wsgi_falls_back_to_no_content(self):
+        """Test that the endpoint answers 204 outside ASGI"""
+        response = self.client.get(reverse('todo_events'))
+        self.assertEqual(response.status_code, 204)
+
+    def test_list_rows_are_addressable(self):
+        """Test that rows carry ids and the page points at the stream"""
+        response = self.client.get(reverse('todo_list'))
+        self.assertContains(response, f'id="todo-{self.todo.pk}"')
+        self.assertContains(response, f'data-live-url="{reverse("todo_events")}"')
+        self.assertContains(response, 'data-live-url="/events/" data-live-insert>')
+        response = self.client.get(reverse('todo_list'), {'q': 'live'})
+        self.assertContains(response, 'data-live-url="/events/">')
+
+    async def test_stream_response(self):
+        """Test the stream's headers and its reconnect delay"""
+        response = await self.async_client.get(reverse('todo_events'))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        messages = aiter(response.streaming_content)
+        self.assertEqual(await self.next_message(messages), b'retry: 5000\n\n')
+
+    async def test_stream_delivers_rendered_rows(self):
+        """Test that a committed write reaches an open stream as rendered rows"""
+        messages = events.stream()
+        await self.next_message(messages)
+
+        @sync_to_async
+        def create():
+            with self.captureOnCommitCallbacks(execute=True):
+                return Todo.objects.create(title="Pushed todo")
+
+        todo = await create()
+        text = await self.next_message(messages)
+        self.assertTrue(text.startswith('event: created\n'))
+        payload = json.loads(text.split('data: ', 1)[1])
+        self.assertEqual(payload['rows'][0]['id'], todo.pk)
+        self.assertIn(f'id="todo-{todo.pk}"', payload['rows'][0]['html'])
+
+        events.publish('deleted', [todo.pk])
+        self.assertEqual(await self.next_message(messages), events.message('deleted', {'ids': [todo.pk]}))
+        await messages.aclose()
+        self.assertFalse(events.broadcaster.subscribers)
+
+    async def test_stalled_stream_is_told_to_reload(self):
+        """Test that a stream whose queue fills up is dropped with a reload event"""
+        messages = events.stream()
+        await self.next_message(messages)
+        for _ in range(events.QUEUE_SIZE + 1):
+            events.broadcaster.send(': filler\n\n')
+        self.assertFalse(events.broadcaster.subscribers)
+        self.assertEqual(await self.next_message(messages), events.message('reload', {}))
+        with self.assertRaises(StopAsyncIteration):
+            await anext(messages)
+
+    def test_publish_is_free_without_listeners(self):
+        """Test that writes queue no commit callbacks while nobody listens"""
+        with self.captureOnCommitCallbacks() as callbacks:
+            Todo.objects.create(title="Unheard")
+        self.assertEqual(callbacks, [])
+
+    async def test_sqlite_backend_sends_each_change_once(self):
+        """Test that re-read change feed rows are not sent twice"""
+        queue = events.broadcaster.subscribe()
+        try:
+            row = await Todo.objects.values(*events.FEED_FIELDS, 'updated_at').aget(pk=self.todo.pk)
+            sent = {}
+            since = self.todo.created_at - timedelta(seconds=1)
+            events.broadcaster.send_feed([row], [99], since, sent)
+            events.broadcaster.send_feed([row], [99], since, sent)
+            self.assertEqual(queue.qsize(), 2)
+            self.assertTrue(queue.get_nowait().startswith('event: created\n'))
+            self.assertEqual(queue.get_nowait(), events.message('deleted', {'ids': [99]}))
+        finally:
+            events.broadcaster.unsubscribe(queue)
+
+    def test_writes_bypassing_post_save_send_todos_changed(self):
+        """Test that toggle, bulk, delete and API writes announce themselves"""
+        other = Todo.objects.create(title="Other")
+        self.client.post(reverse('todo_toggle', args=[self.todo.pk]))
+        self.client.post(reverse('todo_bulk'), {'action': 'unresolve', 'pks': [self.todo.pk, other.pk]})
+        self.client.post(reverse('todo_delete', args=[other.pk]))
+        self.client.delete(reverse('api_todo_detail', args=[self.todo.pk]))
+        self.assertEqual(self.sent, [
+            ('toggled', [self.todo.pk]),
+            # ``other`` was already open.
+            ('toggled', [self.todo.pk]),
+            ('deleted', [other.pk]),
+            ('deleted', [self.todo.pk]),
+        ])
+
+    def test_bulk_writes_announce_only_existing_rows(self):
+        """Test that ids of missing rows are not broadcast"""
+        missing = self.todo.pk + 100
+        self.client.post(reverse('todo_bulk'), {'action': 'delete', 'pks': [self.todo.pk, missing]})
+        other = Todo.objects.create(title="Other")
+        self.client.post(reverse('api_todo_batch'), {'delete': [other.pk, missing]}, content_type='application/json')
+        self.assertEqual(self.sent, [('deleted', [self.todo.pk]), ('deleted', [other.pk])])
+
+
+# ========================================
+# TEMPLATE TESTS
+# ========================================
+
+class PrecompileTemplatesTest(TestCase):
+    """Test compiling and checking the templates ahead of requests"""
+
+    def broken_engine(self, templates):
+        """A template backend over a directory holding ``templates``"""
+        from django.template.backends.django import DjangoTemplates
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        for name, source in templates.items():
+            with open(os.path.join(directory.name, name), 'w') as template:
+                template.write(source)
+        return DjangoTemplates({'NAME': 'broken', 'DIRS': [directory.name], 'APP_DIRS': False, 'OPTIONS': {}})
+
+    def test_app_templates_compile(self):
+        """Test that every shipped template compiles and its references exist"""
+        from .precompile import compile_templates, template_names
+        names = template_names()
+        self.assertIn('todos/todo_list.html', names)
+        self.assertIn('todos/_todo_row.html', names)
+        self.assertEqual(compile_templates(names), [])
+
+    def test_problems_are_reported(self):
+        """Test that syntax errors and missing extends/include targets are found"""
+        from .precompile import compile_templates
+        engine = self.broken_engine({
+            'ok.html': '{% include "ok_part.html" %}',
+            'ok_part.html': 'fine',
+            'syntax.html': '{% if %}',
+            'missing.html': '{% extends "nowhere.html" %}',
+            'dynamic.html': '{% include name %}',
+        })
+        problems = compile_templates(['ok.html', 'ok_part.html', 'syntax.html', 'missing.html', 'dynamic.html'], engine)
+        self.assertEqual([name for name, _ in problems], ['syntax.html', 'missing.html'])
+        self.assertIn('nowhere.html', str(problems[1][1]))
+
+    def test_command(self):
+        """Test the command's summary and that problems fail it"""
+        out = io.StringIO()
+        call_command('precompile_templates', stdout=out)
+        self.assertRegex(out.getvalue(), r'Compiled \d+ templates in')
+        err = io.StringIO()
+        with mock.patch('todos.management.commands.precompile_templates.compile_templates',
+                        return_value=[('todos/base.html', 'boom')]):
+            with self.assertRaisesMessage(CommandError, '1 template problem(s) found.'):
+                call_command('precompile_templates', stdout=io.StringIO(), stderr=err)
+        self.assertIn('todos/base.html: boom', err.getvalue())
+
+    def test_preload_fills_the_cached_loader(self):
+        """Test that TODO_PRELOAD_TEMPLATES compiles in the entry points, not in ready()"""
+        from django.apps import apps
+        from django.template import engines
+        from .precompile import preload_templates
+        cache = engines['django'].engine.template_loaders[0]
+        cache.reset()
+        with override_settings(TODO_PRELOAD_TEMPLATES=True):
+            apps.get_app_config('todos').ready()
+            self.assertNotIn('todos/todo_list.html', cache.get_template_cache)
+            preload_templates()
+        self.assertIn('todos/todo_list.html', cache.get_template_cache)
+
+    def test_production_settings(self):
+        """Test that the production profile turns DEBUG off and spells out the cached loader"""
+        import importlib
+        with mock.patch.dict(os.environ, {'DJANGO_SECRET_KEY': 'production', 'DJANGO_ALLOWED_HOSTS': 'todo.example'}):
+            production = importlib.import_module('todoproject.settings_production')
+        self.assertFalse(production.DEBUG)
+        self.assertEqual(production.ALLOWED_HOSTS, ['todo.example'])
+        self.assertTrue(production.TODO_PRELOAD_TEMPLATES)
+        options = production.TEMPLATES[0]['OPTIONS']
+        self.assertEqual(options['loaders'][0][0], 'django.template.loaders.cached.Loader')
+        self.assertFalse(options['debug'])
+        self.assertFalse(production.TEMPLATES[0]['APP_DIRS'])
+
+
+# ========================================
+# BENCHMARK TESTS
+# ========================================
+
+class BenchmarkSuiteTest(TestCase):
+    """Test the manage.py benchmark scenarios and regression check"""
+
+    def setUp(self):
+        """Create test fixtures"""
+        today = timezone.now().date()
+        Todo.objects.bulk_create(
+            Todo(title=f"Synthetic todo {i}", is_resolved=i % 4 == 0, due_date=today + timedelta(days=i % 5))
+            for i in range(40)
+        )
+
+    def test_every_url_has_a_scenario(self):
+        """Test that each todos URL and the admin changelist is benchmarked"""
+        from benchmarks.suite import SCENARIOS
+        from .urls import urlpatterns
+        covered = {scenario.url_name for scenario in SCENARIOS}
+        self.assertLessEqual({pattern.name for pattern in urlpatterns}, covered)
+        self.assertIn('admin:todos_todo_changelist', covered)
+
+    def test_scenarios_run_and_report(self):
+        """Test that every scenario succeeds and reports latency, queries and allocations"""
+        from benchmarks.suite import SCENARIOS, build_context, run_scenario
+        metrics_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(metrics_dir.cleanup)
+        override = override_settings(TODO_METRICS_DIR=metrics_dir.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        client = Client()
+        context = build_context(client, victims=5)
+        results = {}
+        for scenario in SCENARIOS:
+            results[scenario.name] = run_scenario(client, scenario, context, repeat=2, warmup=0)
+            for key in ('p50', 'p95', 'p99', 'queries', 'alloc_peak_kib'):
+                self.assertIn(key, results[scenario.name], scenario.name)
+        self.assertEqual(results['todo_list']['queries'], 2)
+        self.assertEqual(results['todo_toggle']['queries'], 1)
+
+    def test_compare_flags_regressions(self):
+        """Test that slower, hungrier or chattier scenarios are reported"""
+        from benchmarks.suite import compare
+        stats = {'p50': 10.0, 'alloc_peak_kib': 100.0, 'queries': 2}
+        baseline = {'results': {'1000': {'todo_list': stats, 'todo_toggle': stats}}}
+        current = {'results': {'1000': {
+            'todo_list': {'p50': 11.0, 'alloc_peak_kib': 100.0, 'queries': 2},
+            'todo_toggle': {'p50': 20.0, 'alloc_peak_kib': 300.0, 'queries': 3},
+            'todo_export:csv': {'p50': 50.0, 'alloc_peak_kib': 1.0, 'queries': 1},
+        }}}
+        regressions = compare(baseline, current, threshold=0.2)
+        self.assertEqual(len(regressions), 3)
+        self.assertTrue(all(line.startswith('todo_toggle @ 1000 rows') for line in regressions))
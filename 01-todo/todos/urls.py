@@ -3,7 +3,7 @@
 # ========================================
 
 from django.urls import path
-from . import views
+from . import api, views
 
 urlpatterns = [
     path('', views.TodoListView.as_view(), name='todo_list'),
@@ -11,4 +11,12 @@ urlpatterns = [
     path('edit/<int:pk>/', views.TodoUpdateView.as_view(), name='todo_update'),
     path('delete/<int:pk>/', views.TodoDeleteView.as_view(), name='todo_delete'),
     path('toggle/<int:pk>/', views.toggle_resolve, name='todo_toggle'),
+    path('bulk/', views.bulk_action, name='todo_bulk'),
+    path('export/', views.export_todos, name='todo_export'),
+    path('metrics/', views.prometheus_metrics, name='metrics'),
+    path('events/', views.todo_events, name='todo_events'),
+    path('api/todos/', api.TodoCollectionAPIView.as_view(), name='api_todo_list'),
+    path('api/todos/batch/', api.TodoBatchAPIView.as_view(), name='api_todo_batch'),
+    path('api/todos/sync/', api.TodoSyncAPIView.as_view(), name='api_todo_sync'),
+    path('api/todos/<int:pk>/', api.TodoDetailAPIView.as_view(), name='api_todo_detail'),
 ]
\ No newline at end of file
@@ -2,36 +2,253 @@
 # FILE: todos/views.py
 # ========================================
 
-from django.shortcuts import render, redirect, get_object_or_404
+from django.conf import settings
+from django.contrib import messages
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.db.models import Case, Q, Value, When
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.shortcuts import redirect
 from django.views.generic import ListView, CreateView, UpdateView, DeleteView
 from django.urls import reverse_lazy
-from .models import Todo
-from .forms import TodoForm
+from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition, require_POST
+from django.views.decorators.vary import vary_on_headers
+from . import events, fragments, metrics
+from .budgets import query_budget
+from .conditional import get_todo, list_etag, todo_etag, todo_last_modified
+from .models import ArchivedTodo, Todo
+from .export import FORMATS, aiter_export, export_queryset, iter_export
+from .forms import TodoForm, TodoBulkForm, TodoExportForm
+from .fragments import is_fragment, render_row, row_context, toggled_response, wants_no_content
+from .pagination import ArchiveKeysetPaginator, InvalidCursor, KeysetPaginator
+from .signals import todos_changed
 
+# The conditional GET validator plus the page: one query for the first page,
+# up to one per keyset segment (three) when following a cursor.
+@query_budget(queries=4)
+@method_decorator(condition(etag_func=list_etag), name='get')
 class TodoListView(ListView):
     model = Todo
     template_name = 'todos/todo_list.html'
     context_object_name = 'todos'
+    page_kwarg = 'cursor'
 
-class TodoCreateView(CreateView):
+    def get_queryset(self):
+        self.today = timezone.now().date()
+        self.search_query = self.request.GET.get('q', '').strip()
+        self.archived = self.request.GET.get('archived') == '1'
+        if self.archived:
+            return self.get_archived_queryset()
+        queryset = Todo.objects.with_overdue(today=self.today)
+        if self.search_query:
+            # Search results are ranked by relevance, which the keyset
+            # cursor cannot follow, so search mode shows the best page only.
+            return queryset.ranked_search(self.search_query)[:self.get_page_size()]
+        return queryset
+
+    def get_archived_queryset(self):
+        # Archived todos are resolved, so never overdue. They are not in
+        # the FTS index; searching the archive is a scan of the cold table.
+        queryset = ArchivedTodo.objects.annotate(is_resolved=Value(True), overdue=Value(False))
+        if self.search_query:
+            matches = Q(title__icontains=self.search_query) | Q(description__icontains=self.search_query)
+            return queryset.filter(matches)[:self.get_page_size()]
+        return queryset
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context.update(self.get_list_context())
+        return context
+
+    def get_list_context(self):
+        """Context besides the page itself; shared with the async list view"""
+        return {
+            'bulk_form': TodoBulkForm(),
+            'search_query': self.search_query,
+            'archived': self.archived,
+            **row_context(self.today),
+        }
+
+    def get_paginate_by(self, queryset):
+        if self.search_query:
+            return None
+        return self.get_page_size()
+
+    def get_page_size(self):
+        page_size = getattr(settings, 'TODO_PAGE_SIZE', 50)
+        max_page_size = getattr(settings, 'TODO_MAX_PAGE_SIZE', 500)
+        try:
+            page_size = int(self.request.GET.get('page_size', page_size))
+        except ValueError:
+            pass
+        return max(1, min(page_size, max_page_size))
+
+    def get_paginator(self, queryset, per_page, **kwargs):
+        paginator_class = ArchiveKeysetPaginator if self.archived else KeysetPaginator
+        return paginator_class(queryset, per_page)
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = self.get_paginator(queryset, page_size)
+        try:
+            page = paginator.page(self.request.GET.get(self.page_kwarg))
+        except InvalidCursor:
+            raise Http404('Invalid cursor.')
+        return (paginator, page, page.object_list, page.has_other_pages())
+
+class FragmentFormMixin:
+    """Answer fragment requests with the bare form, or the saved row"""
+    fragment_status = 200
+
+    def get_template_names(self):
+        if is_fragment(self.request):
+            return [fragments.FORM_TEMPLATE]
+        return super().get_template_names()
+
+    def form_valid(self, form):
+        if not is_fragment(self.request):
+            return super().form_valid(form)
+        self.object = form.save()
+        return render_row(self.request, self.object, status=self.fragment_status)
+
+    def form_invalid(self, form):
+        response = super().form_invalid(form)
+        if is_fragment(self.request):
+            response.status_code = 400
+        return response
+
+@query_budget(queries=1, writes=1)
+@method_decorator(vary_on_headers(fragments.HEADER), name='dispatch')
+class TodoCreateView(FragmentFormMixin, CreateView):
     model = Todo
     form_class = TodoForm
     template_name = 'todos/todo_form.html'
     success_url = reverse_lazy('todo_list')
+    fragment_status = 201
 
-class TodoUpdateView(UpdateView):
+@query_budget(queries=2, writes=1)
+@method_decorator(condition(etag_func=todo_etag, last_modified_func=todo_last_modified), name='get')
+@method_decorator(vary_on_headers(fragments.HEADER), name='dispatch')
+class TodoUpdateView(FragmentFormMixin, UpdateView):
     model = Todo
     form_class = TodoForm
     template_name = 'todos/todo_form.html'
     success_url = reverse_lazy('todo_list')
 
+    def get_object(self, queryset=None):
+        if self.request.method not in ('GET', 'HEAD'):
+            return super().get_object(queryset)
+        todo = get_todo(self.request, self.kwargs['pk'])
+        if todo is None:
+            raise Http404('No Todo matches the given query.')
+        return todo
+
+@query_budget(queries=2, writes=1)
 class TodoDeleteView(DeleteView):
     model = Todo
     template_name = 'todos/todo_confirm_delete.html'
     success_url = reverse_lazy('todo_list')
 
+    def form_valid(self, form):
+        pk = self.object.pk
+        response = super().form_valid(form)
+        todos_changed.send(sender=Todo, action='deleted', pks=[pk])
+        return response
+
+# One more query reads the row back for a fragment or the 204's state.
+@query_budget(queries=2, writes=1)
+@vary_on_headers(fragments.HEADER)
+@require_POST
 def toggle_resolve(request, pk):
-    todo = get_object_or_404(Todo, pk=pk)
-    todo.is_resolved = not todo.is_resolved
-    todo.save()
+    # One conditional UPDATE: the flip happens in SQL, so concurrent toggles
+    # cannot lose each other and a missing row shows up as zero rows updated.
+    updated = Todo.objects.filter(pk=pk).update(
+        is_resolved=Case(When(is_resolved=True, then=Value(False)), default=Value(True)),
+        updated_at=timezone.now(),
+    )
+    if not updated:
+        raise Http404('No Todo matches the given query.')
+    todos_changed.send(sender=Todo, action='toggled', pks=[pk])
+    if is_fragment(request) or wants_no_content(request):
+        return toggled_response(request, Todo.objects.with_overdue().get(pk=pk))
     return redirect('todo_list')
+
+
+# The todos_changed action each bulk action announces.
+BULK_EVENTS = {'resolve': 'toggled', 'unresolve': 'toggled', 'set_due_date': 'updated', 'delete': 'deleted'}
+
+
+@query_budget(queries=1, writes=1)
+@require_POST
+def bulk_action(request):
+    form = TodoBulkForm(request.POST)
+    wants_json = request.get_preferred_type(['text/html', 'application/json']) == 'application/json'
+    if not form.is_valid():
+        if wants_json:
+            return JsonResponse({'errors': form.errors}, status=400)
+        messages.error(request, 'Bulk action failed: select at least one TODO and a valid action.')
+        return redirect('todo_list')
+
+    action = form.cleaned_data['action']
+    todos = Todo.objects.filter(pk__in=form.cleaned_data['pks'])
+    now = timezone.now()
+    # Each action is a single set-based statement; the filters skip rows
+    # that are already in the target state so the count, and the event,
+    # cover only rows that really changed.
+    with transaction.atomic():
+        if action == 'resolve':
+            pks = todos.filter(is_resolved=False).update_returning_pks(is_resolved=True, updated_at=now)
+        elif action == 'unresolve':
+            pks = todos.filter(is_resolved=True).update_returning_pks(is_resolved=False, updated_at=now)
+        elif action == 'set_due_date':
+            due_date = form.cleaned_data['due_date']
+            pks = todos.exclude(due_date=due_date).update_returning_pks(due_date=due_date, updated_at=now)
+        else:
+            pks = todos.delete_returning_pks()
+        if pks:
+            todos_changed.send(sender=Todo, action=BULK_EVENTS[action], pks=pks)
+    count = len(pks)
+
+    if wants_json:
+        return JsonResponse({'action': action, 'count': count})
+    messages.success(request, f'{dict(TodoBulkForm.ACTION_CHOICES)[action]}: {count} TODO(s).')
+    return redirect('todo_list')
+
+
+@query_budget(queries=1)
+def export_todos(request):
+    form = TodoExportForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
+    data = form.cleaned_data
+    export_format = data['format'] or 'csv'
+    queryset = export_queryset(data['is_resolved'], data['due_from'], data['due_to'])
+    if isinstance(request, ASGIRequest):
+        content = aiter_export(queryset, export_format)
+    else:
+        content = iter_export(queryset, export_format)
+    response = StreamingHttpResponse(content, content_type=FORMATS[export_format])
+    response['Content-Disposition'] = f'attachment; filename="todos.{export_format}"'
+    return response
+
+
+# Only the first scrape queries, filling the todo gauge cache.
+@query_budget(queries=1)
+def prometheus_metrics(request):
+    return HttpResponse(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+
+# No queries: the stream only relays messages the broadcaster renders.
+@query_budget(queries=0)
+async def todo_events(request):
+    """Server-Sent Events with live changes for the list page"""
+    if not isinstance(request, ASGIRequest):
+        # A WSGI server would have to buffer the endless stream. 204 tells
+        # EventSource to stop reconnecting; the page works as before.
+        return HttpResponse(status=204)
+    response = StreamingHttpResponse(events.stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream.
+    response['X-Accel-Buffering'] = 'no'
+    return response